@@ -0,0 +1,88 @@
+"""Per-letter pdflatex compile time, one fresh process per letter vs. the format-backed pool.
+
+Run from the repository root on a machine with TeX installed:
+
+    python -m benchmarks.latex_benchmark
+
+'direct' is what compile_pdf did before the compile pool: one plain pdflatex
+run per letter. 'pool' uses LatexCompiler with its format file already built;
+the one-off format build is reported separately.
+"""
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from generators.latex_compiler import LatexCompiler, split_static_preamble
+
+TEMPLATE = Path('templates/cover_letter_template.tex')
+
+
+def letter(index: int) -> str:
+    replacements = {
+        '{{TITLE}}': 'Cover Letter',
+        '{{SENDER_NAME}}': 'Jane Doe',
+        '{{DATE}}': 'January 1, 2025',
+        '{{LETTER_CONTENT}}': f"I am writing to apply for position number {index}. " * 40,
+        '{{CLOSING_SALUTATION}}': 'Sincerely,',
+    }
+    text = TEMPLATE.read_text(encoding='utf-8')
+    for placeholder, value in replacements.items():
+        text = text.replace(placeholder, value)
+    return text
+
+
+def direct(source: str, workdir: Path):
+    tex_path = workdir / 'letter.tex'
+    tex_path.write_text(source, encoding='utf-8')
+    subprocess.run(['pdflatex', '-interaction=nonstopmode', '-output-directory', str(workdir), str(tex_path)],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark pdflatex compile paths')
+    arg_parser.add_argument('--letters', type=int, default=20)
+    arg_parser.add_argument('--workers', type=int, default=2)
+    args = arg_parser.parse_args()
+
+    if shutil.which('pdflatex') is None:
+        sys.exit('pdflatex not found on PATH')
+
+    sources = [letter(i) for i in range(args.letters)]
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        start = time.perf_counter()
+        for source in sources:
+            direct(source, workdir)
+        direct_elapsed = (time.perf_counter() - start) / len(sources)
+
+        compiler = LatexCompiler(workers=1, format_dir=str(workdir / 'formats'))
+        start = time.perf_counter()
+        compiler.format_for(split_static_preamble(sources[0])[0])
+        format_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i, source in enumerate(sources):
+            compiler.compile(source, workdir / f"pool_{i}.pdf")
+        pool_elapsed = (time.perf_counter() - start) / len(sources)
+        compiler.shutdown()
+
+        parallel = LatexCompiler(workers=args.workers, format_dir=str(workdir / 'formats'))
+        parallel.format_for(split_static_preamble(sources[0])[0])
+        start = time.perf_counter()
+        for future in [parallel.submit(source, workdir / f"parallel_{i}.pdf") for i, source in enumerate(sources)]:
+            future.result()
+        parallel_elapsed = (time.perf_counter() - start) / len(sources)
+        parallel.shutdown()
+
+    print(f"{'path':<24}{'ms/letter':>10}")
+    print(f"{'direct':<24}{direct_elapsed * 1000:>10.1f}")
+    print(f"{'pool, 1 worker':<24}{pool_elapsed * 1000:>10.1f}")
+    print(f"{f'pool, {args.workers} workers':<24}{parallel_elapsed * 1000:>10.1f}")
+    print(f"format build (once): {format_elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
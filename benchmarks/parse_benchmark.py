@@ -0,0 +1,87 @@
+"""Per-page parse time and peak memory for each parser backend.
+
+Run from the repository root:
+
+    python -m benchmarks.parse_benchmark
+
+Each case runs in a fresh process. 'py KiB' is the tracemalloc peak, which
+only sees Python allocations; 'rss KiB' is how far the process's peak RSS
+grew while parsing, which also covers libxml2's native memory.
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from monitoring.parser_backends import BACKENDS
+from monitoring.web_parser import WebPageParser
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+SITE_CONFIG = {
+    'entry_site': {
+        'url': 'https://careers.example.se/',
+        'entry_selector': 'a.career-card',
+        'selectors': {
+            'title': '.career-card__title',
+            'organization': '.career-card__data .organization',
+            'location': '.career-card__data .location',
+            'deadline': '.deadline u',
+        },
+        'links': {'url': 'a.career-card'},
+    },
+}
+
+CASES = [
+    ('career_listing.html', 'parse_listings', None),
+    ('career_listing.html', 'parse_listings', 'entries'),
+    ('large_career_page.html', 'parse_listings', None),
+    ('large_career_page.html', 'parse_listings', 'entries'),
+    ('job_detail.html', 'parse_job_description', None),
+]
+
+
+def measure(backend: str, page_name: str, method: str, scope, repeat: int):
+    config = dict(SITE_CONFIG, parser_backend=backend, parse_scope=scope)
+    parse = getattr(WebPageParser(config, fetcher=object()), method)
+    page = (FIXTURES / page_name).read_text(encoding='utf-8')
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    result = parse(page)
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(page)
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed, py_peak, rss_growth, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark parser backends on fixture pages')
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    print(f"{'backend':<13}{'page':<24}{'scope':<9}{'ms/page':>9}{'py KiB':>9}{'rss KiB':>9}{'items':>7}")
+    reference = {}
+    context = multiprocessing.get_context('spawn')
+    for backend in BACKENDS:
+        for page_name, method, scope in CASES:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                elapsed, py_peak, rss_growth, result = executor.submit(
+                    measure, backend, page_name, method, scope, args.repeat
+                ).result()
+            same = reference.setdefault(page_name, result) == result
+            print(
+                f"{backend:<13}{page_name:<24}{scope or 'page':<9}{elapsed * 1000:>9.2f}"
+                f"{py_peak / 1024:>9.0f}{rss_growth:>9}{len(result):>7}{'' if same else '  differs'}"
+            )
+
+
+if __name__ == '__main__':
+    main()
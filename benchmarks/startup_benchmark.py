@@ -0,0 +1,74 @@
+"""Wall-clock startup time of the CLI paths, each in a fresh interpreter.
+
+Run from the repository root:
+
+    python -m benchmarks.startup_benchmark
+
+Every case runs in a temporary working directory with a minimal config.json
+and one site config. 'heavy' lists the slow-to-import packages the case
+ended up loading. Use `python -X importtime -c "import main"` to see where
+the rest of the time goes.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ['anthropic', 'flask', 'bs4', 'lxml', 'requests', 'aiohttp', 'reportlab']
+
+CONFIG = {
+    'email': {'sender': 'a@example.com', 'recipient': 'b@example.com', 'smtp_url': 'smtp.example.com', 'app_password': 'x'},
+    'anthropic_api_key': 'test-key',
+}
+# send_starting_entries keeps SiteMonitor from fetching the listing on init, so no case touches the network
+SITE_CONFIG = {'entry_site': {'url': 'https://careers.example.se/', 'entry_selector': 'a', 'selectors': {'title': 'h3'}, 'links': {'url': 'a'}}, 'send_starting_entries': True}
+
+REPORT = f"import sys; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules), file=sys.stderr)"
+
+CASES = [
+    ('import main', f"import main; {REPORT}"),
+    ('main.py --list', f"import runpy; sys.argv = ['main.py', '--list']\ntry:\n    runpy.run_path({str(ROOT / 'main.py')!r}, run_name='__main__')\nexcept SystemExit:\n    pass\n{REPORT}"),
+    ('site monitor, default mode', f"import main; from config.config_manager import ConfigManager; m = ConfigManager(); main.init_site_monitor(m.site_configs[0], m.config); {REPORT}"),
+    ('site monitor, AI mode', f"import main; from config.config_manager import ConfigManager; m = ConfigManager(); s = dict(m.site_configs[0], cover_letter_mode='AI'); main.init_site_monitor(s, m.config).content_generator.client; {REPORT}"),
+]
+
+
+def run_case(code: str, workdir: Path):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', f"import sys; sys.path.insert(0, {str(ROOT)!r})\n{code}"],
+        cwd=workdir, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ''
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmark CLI startup time')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    baseline, _ = run_case('pass', ROOT)
+    print(f"bare interpreter: {baseline * 1000:.0f} ms")
+    print(f"{'case':<30}{'median ms':>10}{'min ms':>9}  heavy")
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        (workdir / 'config.json').write_text(json.dumps(CONFIG))
+        (workdir / 'config' / 'site_configs').mkdir(parents=True)
+        (workdir / 'config' / 'site_configs' / 'example.json').write_text(json.dumps(SITE_CONFIG))
+        (workdir / 'templates').symlink_to(ROOT / 'templates')
+        for name, code in CASES:
+            timings = []
+            for _ in range(args.repeat):
+                elapsed, heavy = run_case(code, workdir)
+                timings.append(elapsed)
+            print(f"{name:<30}{statistics.median(timings) * 1000:>10.0f}{min(timings) * 1000:>9.0f}  {heavy or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,46 @@
 import json
 import logging
+import threading
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, List, Tuple
+
+from config.site_config import FrozenDict, SiteConfig, validate_app_config
+
+SITE_CONFIG_DIR = 'config/site_configs'
+
 
 class ConfigManager:
-    def __init__(self, config_path: str = 'config.json'):
+    """Loads config.json and the site configs, validated and read-only.
+
+    Files are only parsed again when their modification time changes, so
+    ``reload`` is cheap enough to poll; ``watch`` does that in the background
+    and reports new site config lists. A file that fails to parse or validate
+    is logged and its last good version kept.
+    """
+
+    def __init__(self, config_path: str = 'config.json', site_config_dir: str = SITE_CONFIG_DIR):
         self.config_path = config_path
+        self.site_config_dir = Path(site_config_dir)
+        self._config_mtime = None
+        self._site_files: Dict[Path, Tuple[int, SiteConfig]] = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
         self.config = self.load_config()
         # load site configs
         self.site_configs = self.load_site_configs()
 
-    def load_config(self) -> dict:
+    def load_config(self) -> FrozenDict:
         try:
+            self._config_mtime = Path(self.config_path).stat().st_mtime_ns
             with open(self.config_path, 'r') as f:
-                return json.load(f)
+                return validate_app_config(json.load(f))
         except FileNotFoundError:
             logging.error(f"Config file not found: {self.config_path}")
             config = self.create_default_config()
             self.save_config(config)
-            return config
+            self._config_mtime = Path(self.config_path).stat().st_mtime_ns
+            return validate_app_config(config)
 
     def create_default_config(self) -> dict:
         return {
@@ -41,12 +63,65 @@ class ConfigManager:
         with open(self.config_path, 'w') as f:
             json.dump(config, f, indent=4)
 
-    def load_site_configs(self) -> list:
-        site_configs = []
-        for site_config_path in Path('config/site_configs').glob('*.json'):
-            with open(site_config_path, 'r') as f:
-                # Add Anthropic API key to the config
-                site_configs.append(json.load(f))
-                # TODO: use environment variable?
-                site_configs[-1]['anthropic_api_key'] = self.config['anthropic_api_key']
-        return site_configs
+    def _load_site_config(self, path: Path) -> SiteConfig:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            # Add Anthropic API key to the config
+            # TODO: use environment variable?
+            data['anthropic_api_key'] = self.config.get('anthropic_api_key')
+        return SiteConfig(data, source=str(path))
+
+    def load_site_configs(self) -> List[SiteConfig]:
+        site_files = {}
+        for path in sorted(self.site_config_dir.glob('*.json')):
+            try:
+                mtime = path.stat().st_mtime_ns
+                previous = self._site_files.get(path)
+                if previous is not None and previous[0] == mtime:
+                    site_files[path] = previous
+                    continue
+                site_files[path] = (mtime, self._load_site_config(path))
+            except (OSError, ValueError) as e:
+                # ConfigError and json.JSONDecodeError are both ValueErrors
+                logging.error(f"Invalid site config {path}: {e}")
+                if path in self._site_files:
+                    site_files[path] = self._site_files[path]
+        self._site_files = site_files
+        return [site_config for _, site_config in site_files.values()]
+
+    def reload(self) -> bool:
+        """Pick up changed files; returns whether the site configs changed."""
+        with self._lock:
+            try:
+                if Path(self.config_path).stat().st_mtime_ns != self._config_mtime:
+                    self.config = self.load_config()
+                    # Site configs carry values from config.json
+                    self._site_files.clear()
+            except (OSError, ValueError) as e:
+                logging.error(f"Invalid config {self.config_path}, keeping the previous one: {e}")
+            previous = self.site_configs
+            self.site_configs = self.load_site_configs()
+            return [id(site_config) for site_config in self.site_configs] != [id(site_config) for site_config in previous]
+
+    def watch(self, on_change: Callable[[List[SiteConfig]], None], poll_interval: float = 5):
+        """Call ``on_change`` with the new site configs whenever the config files change."""
+        def run():
+            while not self._stop_watching.wait(poll_interval):
+                try:
+                    if self.reload():
+                        logging.info(f"Site configs changed, now monitoring {len(self.site_configs)} sites")
+                        on_change(self.site_configs)
+                except Exception as e:
+                    logging.error(f"Error reloading configs: {e}")
+
+        if self._watcher is None:
+            self._stop_watching.clear()
+            self._watcher = threading.Thread(target=run, name='config-watcher', daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
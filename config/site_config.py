@@ -0,0 +1,213 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+COVER_LETTER_MODES = ('default', 'AI', 'none')
+
+# Keys that must be positive numbers when present
+SITE_NUMBERS = ('check_interval', 'known_entries_ttl_days', 'known_entries_max', 'llm_concurrency', 'compile_concurrency', 'llm_batch_min_size')
+APP_NUMBERS = ('check_interval', 'max_concurrent_sites', 'max_concurrent_per_host', 'config_poll_interval')
+
+
+class ConfigError(ValueError):
+    pass
+
+
+class FrozenDict(dict):
+    """dict that cannot be changed after construction.
+
+    Still a dict, so it serializes to JSON and can be passed to code that
+    reads plain dicts; ``dict(frozen, key=value)`` gives a mutable copy.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+class FrozenList(list):
+    """list that cannot be changed after construction.
+
+    Unlike a tuple it compares equal to and prints like the JSON array it
+    came from, so values interpolated into prompts and logs read as before.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return FrozenList, (list(self),)
+
+
+def freeze(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def _term_trie_pattern(terms: List[str]) -> str:
+    """Regex matching any of ``terms``, with shared prefixes factored out.
+
+    A trie-shaped pattern lets the regex engine reject most positions after
+    one character instead of trying every term in turn.
+    """
+    root: Dict[str, dict] = {}
+    for term in terms:
+        node = root
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def pattern(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+
+    return pattern(root)
+
+
+@dataclass(frozen=True)
+class EntryFilter:
+    """Matches an entry field against any of a set of terms in one regex search.
+
+    Case-insensitive filters casefold the field once and search it with a
+    pattern built from casefolded terms. Whole-word filters only match terms
+    that are not part of a longer word.
+    """
+    key: str
+    terms: Tuple[str, ...]
+    case_sensitive: bool = True
+    whole_words: bool = False
+    pattern: re.Pattern = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        terms = self.terms if self.case_sensitive else tuple(term.casefold() for term in self.terms)
+        pattern = _term_trie_pattern(sorted(set(terms)))
+        if self.whole_words:
+            pattern = rf"(?<!\w)(?:{pattern})(?!\w)"
+        object.__setattr__(self, 'pattern', re.compile(pattern))
+
+    def matches(self, entry: Mapping) -> bool:
+        value = str(entry.get(self.key) or '')
+        if not self.case_sensitive:
+            value = value.casefold()
+        return self.pattern.search(value) is not None
+
+
+def compile_filter(key: str, spec: Any) -> EntryFilter:
+    """Build a filter from a config value.
+
+    ``spec`` is a term, a list of terms, or a mapping with ``terms`` and the
+    optional ``case_sensitive`` (default true) and ``whole_words`` (default
+    false) flags. A plain term keeps the old substring behaviour.
+    """
+    options = {}
+    if isinstance(spec, Mapping):
+        options = {name: spec[name] for name in ('case_sensitive', 'whole_words') if name in spec}
+        if not all(isinstance(value, bool) for value in options.values()):
+            raise ConfigError(f"case_sensitive and whole_words of filter '{key}' must be true or false")
+        spec = spec.get('terms')
+    terms = [spec] if isinstance(spec, str) else spec
+    if not isinstance(terms, (list, tuple)) or not terms or not all(isinstance(term, str) and term for term in terms):
+        raise ConfigError(f"Filter '{key}' needs a non-empty term or list of non-empty terms")
+    return EntryFilter(key, tuple(terms), **options)
+
+
+def compile_filters(filters: Any, name: str) -> Tuple[EntryFilter, ...]:
+    if filters is None:
+        return ()
+    if not isinstance(filters, Mapping):
+        raise ConfigError(f"'{name}' must map entry fields to filter terms")
+    return tuple(compile_filter(key, spec) for key, spec in filters.items())
+
+
+def _check_numbers(data: Mapping, keys: Tuple[str, ...]):
+    for key in keys:
+        value = data.get(key)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0):
+            raise ConfigError(f"'{key}' must be a positive number, got {value!r}")
+
+
+class SiteConfig(FrozenDict):
+    """Validated, read-only site config.
+
+    Reads like the JSON it was loaded from, and adds typed attributes for the
+    values the monitor uses on every run, including the compiled filters.
+    """
+    url: str
+    check_interval: Optional[float]
+    include_filters: Tuple[EntryFilter, ...]
+    exclude_filters: Tuple[EntryFilter, ...]
+    source: Optional[str]
+
+    def __init__(self, data: Mapping, source: Optional[str] = None):
+        if not isinstance(data, Mapping):
+            raise ConfigError("A site config must be a JSON object")
+        entry_site = data.get('entry_site')
+        url = entry_site.get('url') if isinstance(entry_site, Mapping) else None
+        if not isinstance(url, str) or not re.match(r'https?://', url):
+            raise ConfigError("'entry_site.url' must be an http(s) url")
+        _check_numbers(data, SITE_NUMBERS)
+        mode = data.get('cover_letter_mode', 'default')
+        if mode not in COVER_LETTER_MODES:
+            raise ConfigError(f"'cover_letter_mode' must be one of {', '.join(COVER_LETTER_MODES)}, got {mode!r}")
+        include_filters = compile_filters(data.get('include_filters'), 'include_filters')
+        exclude_filters = compile_filters(data.get('exclude_filters'), 'exclude_filters')
+
+        super().__init__(freeze(data))
+        self.url = url
+        self.check_interval = data.get('check_interval')
+        self.include_filters = include_filters
+        self.exclude_filters = exclude_filters
+        self.source = source
+
+    def __reduce__(self):
+        return SiteConfig, (dict(self), self.source)
+
+    def select(self, entries: List[Dict]) -> List[Dict]:
+        """Entries matching every include filter and no exclude filter."""
+        return [
+            entry for entry in entries
+            if all(entry_filter.matches(entry) for entry_filter in self.include_filters)
+            and not any(entry_filter.matches(entry) for entry_filter in self.exclude_filters)
+        ]
+
+
+def validate_app_config(data: Any) -> FrozenDict:
+    if not isinstance(data, Mapping):
+        raise ConfigError("config.json must be a JSON object")
+    _check_numbers(data, APP_NUMBERS)
+    jitter = data.get('schedule_jitter', 0)
+    spacing = data.get('host_spacing', 0)
+    if not isinstance(jitter, (int, float)) or not 0 <= jitter <= 1:
+        raise ConfigError(f"'schedule_jitter' must be between 0 and 1, got {jitter!r}")
+    if not isinstance(spacing, (int, float)) or spacing < 0:
+        raise ConfigError(f"'host_spacing' must be zero or more seconds, got {spacing!r}")
+    for key in ('email', 'fetch'):
+        if key in data and not isinstance(data[key], Mapping):
+            raise ConfigError(f"'{key}' must be a JSON object")
+    return freeze(data)
@@ -1,23 +1,49 @@
-from anthropic import Anthropic
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Tuple, Union
+import asyncio
 import logging
+import threading
 from datetime import datetime
+from functools import cached_property
 import os
+from utils.cached_file import CachedFile
+from generators.letter_cache import fingerprint, normalize_text
+
+PROMPT_TEMPLATE_PATH = 'templates/prompt_cover_letter_latex.txt'
+MODEL = "claude-3-opus-20240229"
+USAGE_FIELDS = ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens')
 
 class ContentGenerator:
-    def __init__(self, api_key: str, user_profile: dict, default_cover_letter_path: str, cover_letter_mode: str = 'default'):
+    def __init__(self, api_key: str, user_profile: dict, default_cover_letter_path: str, cover_letter_mode: str = 'default', client=None, batch_poll_interval: float = 30, prompt_template_path: str = PROMPT_TEMPLATE_PATH, letter_cache=None):
         self.api_key = api_key
         self.user_profile = user_profile
         self.default_cover_letter_path = default_cover_letter_path
         self.cover_letter_mode = cover_letter_mode
-        self.client = Anthropic(api_key=self.api_key)
+        # The Anthropic SDK is slow to import, so the real client is only created on first use
+        self._client = client
+        self._client_lock = threading.Lock()
+        self.batch_poll_interval = batch_poll_interval
+        # Templates are read once and re-read only when the file changes on disk
+        self.prompt_template = CachedFile(prompt_template_path)
+        self.default_cover_letter = CachedFile(default_cover_letter_path)
+        self.letter_cache = letter_cache
+        self._usage_lock = threading.Lock()
+        self.reset_usage()
 
-    def generate_cover_letter(self, job_info: Dict, job_description: str) -> str:
-        with open('templates/prompt_cover_letter_latex.txt', 'r') as file:
-            prompt_template = file.read()
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                from anthropic import Anthropic
+                self._client = Anthropic(api_key=self.api_key)
+            return self._client
 
-        prompt = prompt_template.replace('{{JOB_DESCRIPTION}}', job_description)
-        prompt = prompt.replace('{{APPLICANT_INFO}}', f"""
+    @cached_property
+    def applicant_info(self) -> str:
+        # Only AI mode needs it, and only AI mode requires a full user profile
+        return self.format_applicant_info()
+
+    def format_applicant_info(self) -> str:
+        return f"""
         - Name: {self.user_profile['name']}
         - Skills: {', '.join(self.user_profile['skills'])}
         - Background: {', '.join(self.user_profile['background'])}
@@ -25,28 +51,95 @@ class ContentGenerator:
         - Key Achievements: {self.user_profile['achievements']}
         - Personal Traits: {', '.join(self.user_profile['personal_traits'])}
         - Interests: {', '.join(self.user_profile['interests'])}
-        """)
+        """
+
+    def prompt_parts(self, job_description: str) -> Tuple[str, str]:
+        """Split the prompt into the part shared by every job and the part that varies.
+
+        Everything before {{JOB_DESCRIPTION}} is identical across jobs, so it
+        can be served from the prompt cache.
+        """
+        static_prefix, _, rest = self.prompt_template.read().partition('{{JOB_DESCRIPTION}}')
+        static_prefix = static_prefix.replace('{{APPLICANT_INFO}}', self.applicant_info)
+        rest = rest.replace('{{APPLICANT_INFO}}', self.applicant_info)
+        return static_prefix, job_description + rest
+
+    def build_prompt(self, job_description: str) -> str:
+        return ''.join(self.prompt_parts(job_description))
+
+    def message_params(self, job_description: str) -> Dict:
+        static_prefix, variable_part = self.prompt_parts(job_description)
+        content = [{"type": "text", "text": variable_part}]
+        if static_prefix.strip():
+            content.insert(0, {"type": "text", "text": static_prefix, "cache_control": {"type": "ephemeral"}})
+        return {
+            'model': MODEL,
+            'max_tokens': 1500,
+            'temperature': 0.7,
+            'messages': [{"role": "user", "content": content}]
+        }
+
+    def reset_usage(self):
+        with self._usage_lock:
+            self._usage = dict.fromkeys(('requests', 'cache_hits', 'letter_cache_hits') + USAGE_FIELDS, 0)
+
+    def record_usage(self, usage):
+        if usage is None:
+            return
+        with self._usage_lock:
+            self._usage['requests'] += 1
+            for field in USAGE_FIELDS:
+                self._usage[field] += getattr(usage, field, None) or 0
+            if getattr(usage, 'cache_read_input_tokens', None):
+                self._usage['cache_hits'] += 1
+
+    def count_letter_cache_hit(self):
+        with self._usage_lock:
+            self._usage['letter_cache_hits'] += 1
+
+    def letter_key(self, job_description: str) -> str:
+        """Cache key for the letter the LLM would write for ``job_description``."""
+        params = self.message_params('')
+        del params['messages']
+        return fingerprint('letter', normalize_text(job_description), self.user_profile, self.prompt_template.read(), params)
+
+    def cached_letter(self, job_description: str):
+        if self.letter_cache is None:
+            return None
+        letter = self.letter_cache.get_letter(self.letter_key(job_description))
+        if letter is not None:
+            self.count_letter_cache_hit()
+        return letter
+
+    def cache_letter(self, job_description: str, letter: str):
+        if self.letter_cache is not None:
+            self.letter_cache.store_letter(self.letter_key(job_description), letter)
+
+    def usage(self) -> Dict[str, int]:
+        """Token usage and prompt cache hits since the last reset."""
+        with self._usage_lock:
+            return dict(self._usage)
+
+    def finish_letter(self, letter_text: str) -> str:
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        return letter_text.replace('<DateInsertLater>', current_date)
+
+    def generate_cover_letter(self, job_info: Dict, job_description: str) -> str:
         try:
             # todo fail?
             # Check the cover letter mode
             cover_letter_mode = self.cover_letter_mode
             if cover_letter_mode == 'default':
                 # Default behavior
-                with open(self.default_cover_letter_path, 'r') as file:
-                    default_cover_letter = file.read()
-                return default_cover_letter
+                return self.default_cover_letter.read()
             elif cover_letter_mode == 'AI':
-                response = self.client.messages.create(
-                    model="claude-3-opus-20240229",
-                    max_tokens=1500,
-                    temperature=0.7,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                
-                letter_text = response.content[0].text
-                current_date = datetime.now().strftime("%Y-%m-%d")
-                letter_text = letter_text.replace('<DateInsertLater>', current_date)
-                return letter_text
+                letter = self.cached_letter(job_description)
+                if letter is None:
+                    response = self.client.messages.create(**self.message_params(job_description))
+                    self.record_usage(getattr(response, 'usage', None))
+                    letter = response.content[0].text
+                    self.cache_letter(job_description, letter)
+                return self.finish_letter(letter)
             elif cover_letter_mode == 'none':
                 pass
             else:
@@ -54,3 +147,45 @@ class ContentGenerator:
         except Exception as e:
             logging.error(f"Error generating cover letter content: {e}")
             raise
+
+    def _batches(self):
+        # Message Batches moved out of the beta namespace in later SDK releases
+        messages = self.client.messages
+        return messages.batches if hasattr(messages, 'batches') else self.client.beta.messages.batches
+
+    async def generate_cover_letters_batch(self, jobs: List[Tuple[str, Dict, str]]) -> AsyncIterator[Tuple[str, Union[str, Exception]]]:
+        """Generate letters for (custom_id, job_info, job_description) jobs as one message batch.
+
+        Polls the batch without blocking the event loop and yields
+        (custom_id, letter) pairs as the results stream in. A job that did
+        not succeed yields an exception instead of a letter. Letters already
+        in the letter cache are yielded first and left out of the batch.
+        """
+        descriptions = {}
+        for custom_id, _, job_description in jobs:
+            letter = self.cached_letter(job_description)
+            if letter is not None:
+                yield custom_id, self.finish_letter(letter)
+            else:
+                descriptions[custom_id] = job_description
+        if not descriptions:
+            return
+
+        batches = self._batches()
+        requests = [{'custom_id': custom_id, 'params': self.message_params(job_description)} for custom_id, job_description in descriptions.items()]
+        batch = await asyncio.to_thread(batches.create, requests=requests)
+        logging.info(f"Submitted message batch {batch.id} with {len(requests)} cover letters")
+
+        while batch.processing_status != 'ended':
+            await asyncio.sleep(self.batch_poll_interval)
+            batch = await asyncio.to_thread(batches.retrieve, batch.id)
+
+        results = iter(await asyncio.to_thread(batches.results, batch.id))
+        while (result := await asyncio.to_thread(next, results, None)) is not None:
+            if result.result.type == 'succeeded':
+                self.record_usage(getattr(result.result.message, 'usage', None))
+                letter = result.result.message.content[0].text
+                self.cache_letter(descriptions[result.custom_id], letter)
+                yield result.custom_id, self.finish_letter(letter)
+            else:
+                yield result.custom_id, RuntimeError(f"Batch request {result.result.type}")
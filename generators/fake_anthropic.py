@@ -0,0 +1,107 @@
+import itertools
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Set
+
+FAKE_LETTER = """<latex_cover_letter>
+\\documentclass{{article}}
+\\usepackage[utf8]{{inputenc}}
+\\title{{Cover Letter}}
+\\date{{<DateInsertLater>}}
+\\begin{{document}}
+\\maketitle
+Greetings,
+
+\\bigskip
+\\noindent
+I am writing to apply for the position described as: {summary}
+
+\\bigskip
+\\noindent
+Sincerely,
+\\end{{document}}
+</latex_cover_letter>"""
+
+
+def _cached_prefix(content) -> str:
+    if not isinstance(content, list):
+        return ''
+    breakpoints = [i for i, block in enumerate(content) if block.get('cache_control')]
+    if not breakpoints:
+        return ''
+    return ''.join(block.get('text', '') for block in content[:breakpoints[-1] + 1])
+
+
+def _fake_message(params: Dict, prompt_cache: Set[str]) -> SimpleNamespace:
+    content = params['messages'][0]['content']
+    prompt = ''.join(block.get('text', '') for block in content) if isinstance(content, list) else content
+    cached_prefix = _cached_prefix(content)
+    cached_tokens = len(cached_prefix) // 4
+    cache_hit = cached_prefix in prompt_cache
+    if cached_prefix:
+        prompt_cache.add(cached_prefix)
+    start = prompt.rfind('<job_description>')
+    end = prompt.rfind('</job_description>')
+    description = prompt[start + len('<job_description>'):end].strip() if start != -1 and end != -1 else prompt
+    summary = ' '.join(description.split())[:120]
+    return SimpleNamespace(
+        content=[SimpleNamespace(type='text', text=FAKE_LETTER.format(summary=summary))],
+        usage=SimpleNamespace(
+            input_tokens=len(prompt) // 4 - cached_tokens,
+            output_tokens=120,
+            cache_creation_input_tokens=0 if cache_hit else cached_tokens,
+            cache_read_input_tokens=cached_tokens if cache_hit else 0
+        )
+    )
+
+
+class FakeBatches:
+    def __init__(self, latency: float, prompt_cache: Set[str]):
+        self.latency = latency
+        self.prompt_cache = prompt_cache
+        self._ids = itertools.count(1)
+        self._batches = {}
+
+    def create(self, requests: Iterable[Dict]) -> SimpleNamespace:
+        batch_id = f"msgbatch_fake_{next(self._ids)}"
+        self._batches[batch_id] = (time.monotonic() + self.latency, list(requests))
+        return self.retrieve(batch_id)
+
+    def retrieve(self, batch_id: str) -> SimpleNamespace:
+        ready_at, _ = self._batches[batch_id]
+        status = 'ended' if time.monotonic() >= ready_at else 'in_progress'
+        return SimpleNamespace(id=batch_id, processing_status=status)
+
+    def results(self, batch_id: str) -> List[SimpleNamespace]:
+        _, requests = self._batches[batch_id]
+        return [
+            SimpleNamespace(custom_id=request['custom_id'], result=SimpleNamespace(type='succeeded', message=_fake_message(request['params'], self.prompt_cache)))
+            for request in requests
+        ]
+
+
+class FakeMessages:
+    def __init__(self, latency: float, batch_latency: float):
+        self.latency = latency
+        self.prompt_cache = set()
+        self.batches = FakeBatches(batch_latency, self.prompt_cache)
+        self.calls = []
+
+    def create(self, **params) -> SimpleNamespace:
+        self.calls.append(params)
+        time.sleep(self.latency)
+        return _fake_message(params, self.prompt_cache)
+
+
+class FakeAnthropic:
+    """Offline stand-in for the Anthropic client.
+
+    Answers messages.create and the message batches calls with a small
+    LaTeX letter built from the job description, after a configurable delay.
+    Prompt prefixes marked with cache_control are remembered, so repeated
+    prefixes report cache reads in the usage like the real API.
+    Select it for a site with "llm_client": "fake".
+    """
+
+    def __init__(self, api_key: str = None, latency: float = 0.0, batch_latency: float = 0.0):
+        self.messages = FakeMessages(latency, batch_latency)
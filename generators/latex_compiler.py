@@ -0,0 +1,141 @@
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from generators.letter_cache import fingerprint
+
+# Preamble lines that only load the class and packages, and so can be dumped into a format
+STATIC_PREAMBLE_LINE = re.compile(r'^\s*(?:\\documentclass\b|\\usepackage\b|\\RequirePackage\b|%|$)')
+
+
+class LatexCompileError(RuntimeError):
+    pass
+
+
+def split_static_preamble(source: str) -> Tuple[str, str]:
+    """Split ``source`` into its leading \\documentclass/\\usepackage lines and the rest.
+
+    Returns an empty prefix when the document does not start with a class.
+    """
+    lines = source.splitlines(keepends=True)
+    count = 0
+    while count < len(lines) and STATIC_PREAMBLE_LINE.match(lines[count]):
+        count += 1
+    prefix = ''.join(lines[:count])
+    if '\\documentclass' not in prefix:
+        return '', source
+    return prefix, ''.join(lines[count:])
+
+
+class LatexCompiler:
+    """Compiles LaTeX to PDF on a fixed pool of workers shared by all sites.
+
+    The class and package lines at the top of a document are compiled once
+    into a pdflatex format file, so each letter only pays for its own body
+    instead of TeX startup plus package loading. Every job runs in its own
+    temporary directory and only the finished PDF is moved into place.
+    """
+
+    def __init__(self, workers: int = 2, format_dir: str = 'data/latex_formats', timeout: float = 60, pdflatex: str = 'pdflatex'):
+        self.format_dir = Path(format_dir).resolve()
+        self.timeout = timeout
+        self.pdflatex = pdflatex
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdflatex')
+        self._formats: Dict[str, Optional[str]] = {}
+        self._format_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self.format_dir.mkdir(parents=True, exist_ok=True)
+
+    def _tex_version(self) -> str:
+        # Format files only load in the engine build that dumped them
+        if self._version is None:
+            result = subprocess.run([self.pdflatex, '--version'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=self.timeout)
+            self._version = result.stdout.decode(errors='replace').split('\n', 1)[0]
+        return self._version
+
+    def _run(self, args, cwd: Path, env=None):
+        try:
+            subprocess.run(args, cwd=cwd, env=env, check=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=self.timeout)
+        except subprocess.CalledProcessError as e:
+            raise LatexCompileError(e.stdout.decode(errors='replace')[-2000:]) from e
+        except subprocess.TimeoutExpired as e:
+            raise LatexCompileError(f"pdflatex timed out after {self.timeout}s") from e
+
+    def format_for(self, preamble: str) -> Optional[str]:
+        """Name of the format file holding ``preamble``, building it on first use.
+
+        Returns None when the preamble cannot be dumped; those documents are
+        compiled from scratch.
+        """
+        key = f"letter-{fingerprint('fmt', self._tex_version(), preamble)}"
+        with self._lock:
+            if key in self._formats:
+                return self._formats[key]
+            lock = self._format_locks.setdefault(key, threading.Lock())
+
+        with lock:
+            with self._lock:
+                if key in self._formats:
+                    return self._formats[key]
+            name = key
+            if not (self.format_dir / f"{key}.fmt").exists():
+                try:
+                    (self.format_dir / f"{key}.tex").write_text(preamble + '\\dump\n', encoding='utf-8')
+                    self._run([self.pdflatex, '-ini', '-interaction=nonstopmode', '-halt-on-error', f"-jobname={key}", '&pdflatex', f"{key}.tex"], cwd=self.format_dir)
+                    logging.info(f"Built LaTeX format {key}")
+                except (OSError, LatexCompileError) as e:
+                    logging.warning(f"Could not build LaTeX format, compiling without it: {e}")
+                    name = None
+            with self._lock:
+                self._formats[key] = name
+                return name
+
+    def _compile(self, source: str, pdf_output_path: Path):
+        preamble, body = split_static_preamble(source)
+        format_name = self.format_for(preamble) if preamble else None
+
+        with tempfile.TemporaryDirectory(prefix='letter-') as job_dir:
+            job_dir = Path(job_dir)
+            if format_name is not None:
+                try:
+                    (job_dir / 'letter.tex').write_text(body, encoding='utf-8')
+                    env = dict(os.environ, TEXFORMATS=f"{self.format_dir}{os.pathsep}")
+                    self._run([self.pdflatex, '-interaction=nonstopmode', '-halt-on-error', f"-fmt={format_name}", 'letter.tex'], cwd=job_dir, env=env)
+                except LatexCompileError as e:
+                    logging.warning(f"Compile with format {format_name} failed, retrying without it: {e}")
+                    format_name = None
+            if format_name is None:
+                (job_dir / 'letter.tex').write_text(source, encoding='utf-8')
+                self._run([self.pdflatex, '-interaction=nonstopmode', '-halt-on-error', 'letter.tex'], cwd=job_dir)
+
+            pdf_output_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(job_dir / 'letter.pdf'), str(pdf_output_path))
+
+    def submit(self, source: str, pdf_output_path: Path) -> Future:
+        return self._executor.submit(self._compile, source, Path(pdf_output_path))
+
+    def compile(self, source: str, pdf_output_path: Path):
+        """Compile ``source`` to ``pdf_output_path``, raising LatexCompileError on failure."""
+        self.submit(source, pdf_output_path).result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_default_compiler = None
+_default_compiler_lock = threading.Lock()
+
+
+def get_default_latex_compiler() -> LatexCompiler:
+    global _default_compiler
+    with _default_compiler_lock:
+        if _default_compiler is None:
+            _default_compiler = LatexCompiler()
+        return _default_compiler
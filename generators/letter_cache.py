@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+LETTER_FILE = 'letter.txt'
+PDF_FILE = 'cover_letter.pdf'
+TEX_FILE = 'cover_letter.tex'
+
+
+def normalize_text(text: str) -> str:
+    return ' '.join(text.split())
+
+
+def fingerprint(*parts) -> str:
+    """Stable hex key for JSON-serializable ``parts``."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class LetterCache:
+    """Content-addressed on-disk cache of generated letters and compiled PDFs.
+
+    Each key is a directory holding the cached files. Raw LLM letters are
+    keyed on what went into the prompt, compiled PDFs on the exact LaTeX that
+    was compiled. Keys are evicted least-recently-used first once the cache
+    grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory: str = 'data/letter_cache', max_bytes: int = 200 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: OrderedDict = OrderedDict()
+        self._total_bytes = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        # Oldest access first, so the index starts out in LRU order
+        entries = [path for path in self.directory.iterdir() if path.is_dir() and '.tmp' not in path.name]
+        for path in sorted(entries, key=lambda path: path.stat().st_mtime):
+            size = self._dir_size(path)
+            self._index[path.name] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        return sum(file.stat().st_size for file in path.iterdir() if file.is_file())
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key
+
+    def _lookup(self, key: str) -> Optional[Path]:
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except OSError:
+            self.invalidate(key)
+            return None
+        return path
+
+    def store(self, key: str, files: Dict[str, Union[str, Path]]):
+        """Store ``files`` under ``key``; str values are written as text, Path values copied."""
+        path = self._path(key)
+        tmp_path = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        try:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            tmp_path.mkdir()
+            for name, content in files.items():
+                if isinstance(content, Path):
+                    shutil.copyfile(content, tmp_path / name)
+                else:
+                    (tmp_path / name).write_text(content, encoding='utf-8')
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not cache letter {key}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return
+
+        size = self._dir_size(path)
+        with self._lock:
+            self._total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self._evict()
+
+    def get_letter(self, key: str) -> Optional[str]:
+        path = self._lookup(key)
+        if path is None:
+            return None
+        try:
+            return (path / LETTER_FILE).read_text(encoding='utf-8')
+        except OSError as e:
+            logging.warning(f"Dropping unreadable cached letter {key}: {e}")
+            self.invalidate(key)
+            return None
+
+    def store_letter(self, key: str, letter: str):
+        self.store(key, {LETTER_FILE: letter})
+
+    def restore_artifacts(self, key: str, pdf_output_path: Path, tex_output_path: Path) -> bool:
+        """Copy the cached PDF and LaTeX for ``key`` to the given paths."""
+        path = self._lookup(key)
+        if path is None:
+            return False
+        try:
+            shutil.copyfile(path / PDF_FILE, pdf_output_path)
+            shutil.copyfile(path / TEX_FILE, tex_output_path)
+            return True
+        except OSError as e:
+            logging.warning(f"Dropping unreadable cached PDF {key}: {e}")
+            self.invalidate(key)
+            return False
+
+    def store_artifacts(self, key: str, pdf_output_path: Path, tex_output_path: Path):
+        self.store(key, {PDF_FILE: Path(pdf_output_path), TEX_FILE: Path(tex_output_path)})
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            logging.info(f"Evicted cached letter {key}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_letter_cache() -> LetterCache:
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LetterCache()
+        return _default_cache
@@ -0,0 +1,87 @@
+import re
+from pathlib import Path
+from typing import Dict, List
+from xml.sax.saxutils import escape
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+# Closings the renderer adds itself, so a letter's own closing is dropped
+CLOSINGS = ('Sincerely', 'Best regards', 'Kind regards', 'Med vänliga hälsningar', 'Vänliga hälsningar')
+
+PARAGRAPH_BREAK = re.compile(r'\\(?:bigskip|medskip|smallskip|par)\b|\\vspace\*?\{[^}]*\}')
+ENVIRONMENT = re.compile(r'\\(?:begin|end)\{[^}]*\}')
+FORMATTING = {'textbf': 'b', 'textit': 'i', 'emph': 'i', 'underline': 'u'}
+COMMAND_WITH_ARGUMENT = re.compile(r'\\[A-Za-z]+\*?(?:\[[^\]]*\])?\{([^{}]*)\}')
+BARE_COMMAND = re.compile(r'\\[A-Za-z]+\*?\s?')
+SPECIAL_CHARACTERS = {r'\&amp;': '&amp;', r'\%': '%', r'\$': '$', r'\#': '#', r'\_': '_', r'\{': '{', r'\}': '}'}
+TYPOGRAPHY = {'---': '\u2014', '--': '\u2013', '``': '\u201c', "''": '\u201d', '~': '\u00a0'}
+
+BODY = ParagraphStyle('body', fontName='Helvetica', fontSize=11, leading=15, spaceAfter=8)
+HEADER = ParagraphStyle('header', parent=BODY, spaceAfter=0)
+TITLE = ParagraphStyle('title', parent=BODY, fontName='Helvetica-Bold', fontSize=14, leading=18, spaceBefore=6, spaceAfter=12)
+
+
+def latex_to_paragraphs(content: str, closing_salutation: str = '') -> List[str]:
+    """Turn a LaTeX letter, or a plain-text one, into reportlab paragraph markup.
+
+    Only the document body is kept. The renderer prints its own title, date
+    and closing, so a closing found near the end of the letter is cut off.
+    """
+    begin, end = content.find('\\begin{document}'), content.find('\\end{document}')
+    if begin != -1:
+        content = content[begin + len('\\begin{document}'):end if end != -1 else None]
+    content = re.sub(r'(?<!\\)%.*', '', content)
+    content = escape(content)
+
+    content = ENVIRONMENT.sub('', content)
+    content = PARAGRAPH_BREAK.sub('\n\n', content)
+    content = content.replace('\\\\', '<br/>').replace('\\newline', '<br/>')
+    for command, tag in FORMATTING.items():
+        content = re.sub(rf'\\{command}\{{([^{{}}]*)\}}', rf'<{tag}>\1</{tag}>', content)
+    previous = None
+    while previous != content:
+        previous, content = content, COMMAND_WITH_ARGUMENT.sub(r'\1', content)
+    for latex, text in SPECIAL_CHARACTERS.items():
+        content = content.replace(latex, text)
+    content = BARE_COMMAND.sub('', content)
+    for latex, text in TYPOGRAPHY.items():
+        content = content.replace(latex, text)
+
+    paragraphs = [' '.join(paragraph.split()) for paragraph in re.split(r'\n\s*\n', content)]
+    paragraphs = [paragraph for paragraph in paragraphs if paragraph and paragraph != '<br/>']
+
+    closings = tuple(closing.rstrip(',') for closing in CLOSINGS + (closing_salutation,) if closing)
+    for index in range(max(len(paragraphs) - 3, 0), len(paragraphs)):
+        if re.sub(r'<[^>]+>', '', paragraphs[index]).startswith(closings):
+            return paragraphs[:index]
+    return paragraphs
+
+
+def _paragraph(markup: str, style: ParagraphStyle) -> Paragraph:
+    try:
+        return Paragraph(markup, style)
+    except ValueError:
+        # Tags left unbalanced by odd LaTeX; fall back to the plain text
+        return Paragraph(escape(re.sub(r'<[^>]+>', '', markup)), style)
+
+
+def render_letter(fields: Dict[str, str], paragraphs: List[str], pdf_output_path: Path):
+    """Lay out a cover letter on A4 from the fields of PDFGenerator.letter_fields."""
+    sender = [fields['SENDER_NAME'], fields['SENDER_ADDRESS'], fields['SENDER_CITY'], fields['SENDER_EMAIL']]
+    recipient = [fields['RECIPIENT_NAME'], fields['organization_NAME']]
+    title = f"{fields['TITLE']}: {fields['JOB_TITLE']}" if fields['JOB_TITLE'] else fields['TITLE']
+
+    story = [Paragraph(escape(line), HEADER) for line in sender if line]
+    story += [Spacer(1, 8 * mm), Paragraph(escape(fields['DATE']), HEADER), Spacer(1, 8 * mm)]
+    story += [Paragraph(escape(line), HEADER) for line in recipient if line]
+    story += [Spacer(1, 6 * mm), Paragraph(escape(title), TITLE)]
+    story += [_paragraph(paragraph, BODY) for paragraph in paragraphs]
+    story += [Spacer(1, 4 * mm), Paragraph(escape(fields['CLOSING_SALUTATION']), HEADER), Spacer(1, 10 * mm), Paragraph(escape(fields['SENDER_NAME']), HEADER)]
+
+    document = SimpleDocTemplate(
+        str(pdf_output_path), pagesize=A4, leftMargin=25 * mm, rightMargin=25 * mm, topMargin=20 * mm, bottomMargin=20 * mm,
+        title=title, author=fields['SENDER_NAME']
+    )
+    document.build(story)
@@ -1,57 +1,62 @@
 from datetime import datetime
 from pathlib import Path
-import subprocess
 from typing import Dict
 import logging
-from pylatex import Document
-from pylatex.utils import NoEscape
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 import re
+from generators.latex_compiler import LatexCompileError, get_default_latex_compiler
+from generators.letter_cache import fingerprint
+
+SWEDISH_MONTHS = ['januari', 'februari', 'mars', 'april', 'maj', 'juni', 'juli', 'augusti', 'september', 'oktober', 'november', 'december']
 
 class PDFGenerator:
-    def __init__(self, latex_template_path: str, user_profile: Dict):
+    def __init__(self, latex_template_path: str, user_profile: Dict, letter_cache=None, latex_compiler=None):
         self.latex_template_path = latex_template_path
         self.user_profile = user_profile
+        self.letter_cache = letter_cache
+        # pdflatex jobs from all sites share one worker pool and its format files
+        self.latex_compiler = latex_compiler or get_default_latex_compiler()
 
-    def substitute_template(self, content: str, job_info: Dict) -> str:
-        # TODO Use for Default Template
-        # Move to content generator
-        # latex
-        with open(self.latex_template_path, 'r', encoding='utf-8') as file:
-            template = file.read()
-
+    def letter_fields(self, content: str, job_info: Dict) -> Dict[str, str]:
         # Determine the language
         language = job_info.get('language', 'eng')
+        now = datetime.now()
 
-        if language == 'eng':
-            title = 'Cover Letter'
-            closing_salutation = 'Sincerely,'
-            # Thank you for considering my application.
-        elif language == 'sve':
+        if language == 'sve':
             title = 'Personligt Brev'
             closing_salutation = 'Med vänliga hälsningar,'
+            recipient_name = 'Rekryteringsansvarig'
+            date = f"{now.day} {SWEDISH_MONTHS[now.month - 1]} {now.year}"
         else:
             title = 'Cover Letter'
+            closing_salutation = 'Sincerely,'
+            # Thank you for considering my application.
+            recipient_name = 'Hiring Manager'
+            date = now.strftime('%B %d, %Y')
 
-        
-        replacements = {
-            '{{DATE}}': datetime.now().strftime('%B %d, %Y'),
-            '{{organization_NAME}}': job_info['organization'],
-            '{{JOB_TITLE}}': job_info['title'],
-            '{{RECIPIENT_NAME}}': 'Hiring Manager',
-            '{{SENDER_NAME}}': self.user_profile['name'],
-            '{{SENDER_ADDRESS}}': self.user_profile['address'],
-            '{{SENDER_CITY}}': self.user_profile['city'],
-            '{{SENDER_EMAIL}}': self.user_profile['email'],
-            '{{LETTER_CONTENT}}': content,
-            '{{TITLE}}': title,
-            '{{LANGUAGE}}': language,
-            '{{CLOSING_SALUTATION}}': closing_salutation
+        return {
+            'DATE': date,
+            'organization_NAME': job_info.get('organization', ''),
+            'JOB_TITLE': job_info.get('title', ''),
+            'RECIPIENT_NAME': recipient_name,
+            'SENDER_NAME': self.user_profile.get('name', ''),
+            'SENDER_ADDRESS': self.user_profile.get('address', ''),
+            'SENDER_CITY': self.user_profile.get('city', ''),
+            'SENDER_EMAIL': self.user_profile.get('email', ''),
+            'LETTER_CONTENT': content,
+            'TITLE': title,
+            'LANGUAGE': language,
+            'CLOSING_SALUTATION': closing_salutation
         }
-        
-        for placeholder, value in replacements.items():
-            template = template.replace(placeholder, value)
+
+    def substitute_template(self, content: str, job_info: Dict) -> str:
+        # TODO Use for Default Template
+        # Move to content generator
+        # latex
+        with open(self.latex_template_path, 'r', encoding='utf-8') as file:
+            template = file.read()
+
+        for field, value in self.letter_fields(content, job_info).items():
+            template = template.replace(f"{{{{{field}}}}}", value)
         
         return template
 
@@ -81,41 +86,45 @@ class PDFGenerator:
             logging.error(f"Error during LaTeX compilation check: {e}")
             return self._escape_latex(latex_content)
 
-    def compile_pdf(self, latex_content: str, job_info: Dict, method: str = 'latex') -> str:
+    def output_paths(self, job_info: Dict):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         organization_name = ''.join(c for c in job_info['organization'] if c.isalnum())
-        pdf_output_path = Path('cover_letters') / f"Cover_Letter_{organization_name}_{timestamp}.pdf"
-        tex_output_path = pdf_output_path.with_suffix('.tex')
+        # The entry id keeps letters compiled in parallel for one organization apart
+        entry_suffix = ''.join(c for c in str(job_info.get('id', '')) if c.isalnum())[:8]
+        pdf_output_path = Path('cover_letters') / f"Cover_Letter_{organization_name}_{timestamp}_{entry_suffix}.pdf"
+        return pdf_output_path, pdf_output_path.with_suffix('.tex')
 
+    def compile_pdf(self, latex_content: str, job_info: Dict, method: str = 'latex') -> str:
+        pdf_output_path, tex_output_path = self.output_paths(job_info)
         pdf_output_path.parent.mkdir(exist_ok=True)
 
+        # Identical LaTeX compiles to the same PDF, so reuse an earlier compile.
+        # The reportlab layout also prints the job and sender fields.
+        fields = self.letter_fields(latex_content, job_info)
+        layout_fields = {field: value for field, value in fields.items() if field != 'LETTER_CONTENT'} if method == 'reportlab' else None
+        cache_key = fingerprint('pdf', method, latex_content, layout_fields)
+        if self.letter_cache is not None and self.letter_cache.restore_artifacts(cache_key, pdf_output_path, tex_output_path):
+            logging.info(f"Reusing cached PDF for {job_info.get('title')}")
+            return str(pdf_output_path), str(tex_output_path)
+
         if method == 'latex':
             try:
                 logging.info(f"Writing latex content to {tex_output_path}")
                 tex_output_path.write_text(latex_content, encoding='utf-8')                
                 try:
-                    subprocess.run(
-                        ['pdflatex', '-output-directory', str(pdf_output_path.parent), str(tex_output_path)],
-                        check=True,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        timeout=60
-                    )
-                except subprocess.CalledProcessError as e:
-                    logging.error(f"Failed to compile LaTeX to PDF: {e.stderr.decode()}")
+                    self.latex_compiler.compile(latex_content, pdf_output_path)
+                except LatexCompileError as e:
+                    logging.error(f"Failed to compile LaTeX to PDF: {e}")
                     return str(tex_output_path)
             except Exception as e:
                 logging.error(f"Failed to compile LaTeX to PDF: {e}")
                 return str(tex_output_path)
         elif method == 'reportlab':
-            # Generate a PDF using reportlab with A4 page size
-            c = canvas.Canvas(str(pdf_output_path), pagesize=A4)
-            width, height = A4
-
-            # Add content to the PDF
-            c.drawString(100, height - 100, latex_content.split('\n')[0])
-
-            # Save the PDF
-            c.save()
+            # Lay the letter out in-process, without TeX; reportlab is only loaded for this renderer
+            from generators.letter_renderer import latex_to_paragraphs, render_letter
+            tex_output_path.write_text(latex_content, encoding='utf-8')
+            render_letter(fields, latex_to_paragraphs(latex_content, fields['CLOSING_SALUTATION']), pdf_output_path)
 
+        if self.letter_cache is not None and pdf_output_path.exists() and tex_output_path.exists():
+            self.letter_cache.store_artifacts(cache_key, pdf_output_path, tex_output_path)
         return str(pdf_output_path), str(tex_output_path)
\ No newline at end of file
@@ -2,19 +2,14 @@ import sys
 import logging
 from pathlib import Path
 from config.config_manager import ConfigManager
-from generators.content_generator import ContentGenerator
-from generators.pdf_generator import PDFGenerator
-from monitoring.web_parser import WebPageParser
-from monitoring.site_monitor import SiteMonitor
-from utils.email_sender import EmailSender
 from utils.logger import setup_logger
 import os
-from flask import Flask
-import schedule
-import time
-from datetime import datetime
-from datetime import timedelta
 import argparse
+import threading
+
+# Parsers, HTTP clients, the LLM SDK, PDF renderers and Flask are imported in
+# the functions that use them, so `--list` and short runs start quickly.
+# `python -m benchmarks.startup_benchmark` measures it.
 
 
 def create_directory_structure():
@@ -27,8 +22,16 @@ def create_directory_structure():
     for directory in directories:
         Path(directory).mkdir(exist_ok=True)
 
-def init_site_monitor(site_config, config):
+def init_site_monitor(site_config, config, outbox=None):
     """Initialize the application and its components."""
+    from generators.content_generator import ContentGenerator
+    from generators.letter_cache import get_default_letter_cache
+    from generators.pdf_generator import PDFGenerator
+    from monitoring.fetcher import get_default_fetcher
+    from monitoring.site_monitor import SiteMonitor
+    from monitoring.web_parser import WebPageParser
+    from utils.email_sender import EmailSender
+
     try:
         create_directory_structure()
 
@@ -46,22 +49,36 @@ def init_site_monitor(site_config, config):
         # Provide a default latex template path if 'latex_template_path' key is not present
         latex_template_path = site_config.get('latex_template_path', 'templates/default_template.tex')
 
-        # Initialize content generator
+        # Repeated postings reuse letters and PDFs from the shared letter cache
+        letter_cache = get_default_letter_cache() if site_config.get('letter_cache', True) else None
+
+        # Initialize content generator, optionally against the offline fake client
+        llm_client = None
+        if site_config.get('llm_client') == 'fake':
+            from generators.fake_anthropic import FakeAnthropic
+            llm_client = FakeAnthropic()
         content_generator = ContentGenerator(
             api_key=site_config['anthropic_api_key'],
             user_profile=user_profile,
             default_cover_letter_path=latex_template_path,
-            cover_letter_mode=site_config.get('cover_letter_mode', 'default')
+            cover_letter_mode=site_config.get('cover_letter_mode', 'default'),
+            client=llm_client,
+            batch_poll_interval=site_config.get('llm_batch_poll_interval', 30),
+            letter_cache=letter_cache
         )
 
         # Initialize PDF generator
         latex_generator = PDFGenerator(
             latex_template_path=latex_template_path,
-            user_profile=user_profile
+            user_profile=user_profile,
+            letter_cache=letter_cache
         )
 
+        # All monitors share one pooled fetcher
+        fetcher = get_default_fetcher()
+
         # Initialize site parser
-        site_parser = WebPageParser(site_config)
+        site_parser = WebPageParser(site_config, fetcher=fetcher)
 
         # Initialize email sender
         email_config = config['email']
@@ -72,30 +89,72 @@ def init_site_monitor(site_config, config):
             parser=site_parser,
             email_sender=email_sender,
             content_generator=content_generator,
-            pdf_generator=latex_generator
+            pdf_generator=latex_generator,
+            fetcher=fetcher,
+            outbox=outbox
         )
 
     except Exception as e:
         logging.error(f"Error initializing application: {e}")
         raise
 
-def run_monitor_instance(site_config, config):
+def run_monitor_instance(site_config, config, outbox=None):
     print(f"Running monitor instance for {site_config['entry_site']['url']}")
-    monitor = init_site_monitor(site_config, config)
-    monitor.run()
+    monitor = init_site_monitor(site_config, config, outbox)
+    summary = monitor.run()
     print(f"Finished running monitor instance for {site_config['entry_site']['url']}")
-
-def schedule_monitors():
-    config_manager = ConfigManager()
-    config = config_manager.load_config()
-    site_configs = config_manager.load_site_configs()
+    return summary
+
+def create_outbox(config):
+    # Monitors queue their notifications; one worker delivers them with retries
+    from monitoring.outbox import NotificationOutbox
+    from monitoring.state_store import get_default_state_store
+    from utils.email_sender import EmailSender
+
+    email_config = config['email']
+    return NotificationOutbox(
+        get_default_state_store(),
+        EmailSender(email_config),
+        poll_interval=email_config.get('outbox_poll_interval', 30),
+        max_attempts=email_config.get('outbox_max_attempts', 10)
+    )
+
+def configure_fetcher(config):
+    # Rate limits, retries and circuit breakers for every site share one fetcher
+    from monitoring.fetch_policy import FetchPolicy
+    from monitoring.fetcher import get_default_fetcher
+
+    get_default_fetcher(FetchPolicy.from_config(config.get('fetch', {})))
+
+def create_run_engine(config, outbox=None):
+    from monitoring.run_engine import RunEngine
+
+    return RunEngine(
+        run_site=lambda site_config: run_monitor_instance(site_config, config, outbox),
+        max_workers=config.get('max_concurrent_sites', 8),
+        max_per_host=config.get('max_concurrent_per_host', 2)
+    )
+
+def schedule_monitors(config, site_configs, outbox):
+    from monitoring.scheduler import MonitorScheduler
+    from monitoring.state_store import get_default_state_store
+
+    engine = create_run_engine(config, outbox)
+    scheduler = MonitorScheduler(
+        engine,
+        site_configs,
+        default_interval=config.get('check_interval', 3600),
+        jitter=config.get('schedule_jitter', 0.1),
+        host_spacing=config.get('host_spacing', 10),
+        state=get_default_state_store(),
+        # Digest notifications wait until no run is in progress
+        on_idle=outbox.wake
+    )
     print(f"Scheduling {len(site_configs)} site monitors")
     for site_config in site_configs:
-        #TODO shedule time and interval confiurable via config
-        schedule.every().day.at((datetime.now() + timedelta(minutes=1)).strftime("%H:%M")) \
-            .do(run_monitor_instance, site_config=site_config, config=config)
-        
-        logging.info(f"Scheduled monitor for {site_config['entry_site']['url']} at {datetime.now() + timedelta(minutes=1)}")
+        url = site_config['entry_site']['url']
+        logging.info(f"Scheduled monitor for {url} every {scheduler.interval(site_config)}s")
+    return scheduler
 
 def list_available_sites(site_configs):
     print("Available sites to monitor:")
@@ -109,9 +168,10 @@ def parse_arguments():
     return parser.parse_args()
 
 def main():
+    # ConfigManager reads config.json and the site configs once, on construction
     config_manager = ConfigManager()
-    config = config_manager.load_config()
-    site_configs = config_manager.load_site_configs()
+    config = config_manager.config
+    site_configs = config_manager.site_configs
 
     args = parse_arguments()
 
@@ -119,24 +179,35 @@ def main():
         list_available_sites(site_configs)
         sys.exit(0)
 
+    setup_logger()
+    configure_fetcher(config)
+    if config.get('tracing'):
+        from monitoring.metrics import get_default_metrics
+        get_default_metrics().enable_tracing()
+
     if args.site:
         selected_sites = [sc for sc in site_configs if sc['entry_site']['url'] in args.site]
         
         if selected_sites:
             for site_config in selected_sites:
                 print(f"Running monitor for site: {site_config['entry_site']['url']}")
-                run_monitor_instance(site_config, config)
+            outbox = create_outbox(config)
+            outbox.start()
+            create_run_engine(config, outbox).run_all(selected_sites)
+            outbox.close()
         else:
             print("No valid site configurations found for the specified URLs.")
             sys.exit(1)
     else:
         try:
             print("Initializing site monitor application")
-            schedule_monitors()
-            while True:
-                logging.info(f"Checking for new entries at {datetime.now()}")
-                schedule.run_pending()
-                time.sleep(10*60)
+            outbox = create_outbox(config)
+            outbox.start()
+            serve_app(int(os.environ.get("PORT", 8080)))
+            scheduler = schedule_monitors(config, site_configs, outbox)
+            # Edited, added and removed site configs apply without a restart
+            config_manager.watch(scheduler.update_sites, poll_interval=config.get('config_poll_interval', 5))
+            scheduler.run_forever()
         except KeyboardInterrupt:
             print("Application stopped by user")
             sys.exit(0)
@@ -144,13 +215,30 @@ def main():
             print(f"Application crashed: {e}")
             sys.exit(1)
 
-app = Flask(__name__)
+def create_app():
+    from flask import Flask, Response
+
+    app = Flask(__name__)
+
+    @app.route('/add_monitor')
+    def add_monitor():
+        return "TODO Implement!"
+
+    @app.route('/metrics')
+    def metrics():
+        from monitoring.metrics import get_default_metrics
+        return Response(get_default_metrics().render(), mimetype='text/plain; version=0.0.4')
+
+    return app
+
 
-@app.route('/add_monitor')
-def add_monitor():
-    return "TODO Implement!"
+def serve_app(port):
+    # The scheduler blocks the main thread, so the app is served beside it
+    thread = threading.Thread(target=create_app().run, kwargs={'host': '0.0.0.0', 'port': port}, name='app', daemon=True)
+    thread.start()
+    return thread
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
     main()
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+
+class EntryPipeline:
+    """Turns selected entries into cover letters in three overlapping stages.
+
+    Detail pages are fetched asynchronously, cover letters are generated on a
+    capped pool of LLM workers, and PDFs are compiled on a separate capped
+    pool. Stages are joined by bounded queues, so while one entry waits on
+    pdflatex the next ones are already being fetched and generated. A failing
+    entry is logged and dropped without affecting the others.
+
+    With ``generate_batch`` set, a run with at least ``batch_min_size``
+    entries submits all letters as one batch instead, and compiles each
+    letter as its result comes back. Smaller runs keep the per-request path.
+
+    pdflatex runs in its own process, so compile workers are threads that
+    wait on it rather than a process pool.
+
+    ``checkpoint(entry, stage, payload)`` is called as each entry finishes a
+    stage: 'fetched' with the job description, 'generated' with the letter
+    and 'compiled' with the file paths. ``resume`` maps entry ids to the last
+    (stage, payload) recorded for them, and those entries pick up after that
+    stage instead of starting over.
+    """
+
+    def __init__(
+        self,
+        fetcher,
+        parse_description: Callable[[str], str],
+        generate: Callable[[Dict, str], str],
+        compile: Callable[[Dict, str], Tuple[str, str]],
+        cached_page: Callable[[str], Optional[str]] = lambda url: None,
+        fetch_concurrency: int = 8,
+        llm_concurrency: int = 4,
+        compile_concurrency: int = 2,
+        queue_size: int = 8,
+        generate_batch: Optional[Callable[[List[Tuple[str, Dict, str]]], AsyncIterator[Tuple[str, Union[str, Exception]]]]] = None,
+        batch_min_size: int = 5,
+        checkpoint: Callable[[Dict, str, object], None] = lambda entry, stage, payload: None,
+        resume: Optional[Dict[str, Tuple[str, object]]] = None
+    ):
+        self.fetcher = fetcher
+        self.parse_description = parse_description
+        self.generate = generate
+        self.compile = compile
+        self.cached_page = cached_page
+        self.fetch_concurrency = fetch_concurrency
+        self.llm_concurrency = llm_concurrency
+        self.compile_concurrency = compile_concurrency
+        self.queue_size = queue_size
+        self.generate_batch = generate_batch
+        self.batch_min_size = batch_min_size
+        self.checkpoint = checkpoint
+        self.resume = resume or {}
+
+    def run(self, entries: List[Dict]) -> List[Tuple[Dict, List[str]]]:
+        if not entries:
+            return []
+        return asyncio.run(self._run(entries))
+
+    async def _run(self, entries: List[Dict]) -> List[Tuple[Dict, List[str]]]:
+        loop = asyncio.get_running_loop()
+        fetched = asyncio.Queue(maxsize=self.queue_size)
+        generated = asyncio.Queue(maxsize=self.queue_size)
+        results = {}
+
+        llm_executor = ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix='llm')
+        compile_executor = ThreadPoolExecutor(max_workers=self.compile_concurrency, thread_name_prefix='compile')
+        fetch_slots = asyncio.Semaphore(self.fetch_concurrency)
+
+        def record(entry: Dict, stage: str, payload):
+            try:
+                self.checkpoint(entry, stage, payload)
+            except Exception as e:
+                # Only costs a redo after a crash, so the entry carries on
+                logging.error(f"Error recording stage {stage} of entry {entry['title']}: {e}")
+
+        async def fetch(session, index: int, entry: Dict):
+            stage, payload = self.resume.get(entry['id'], (None, None))
+            if stage == 'compiled':
+                results[index] = (entry, payload)
+                return
+            if stage == 'generated':
+                await generated.put((index, entry, payload))
+                return
+            if stage == 'fetched':
+                await fetched.put((index, entry, payload))
+                return
+            try:
+                async with fetch_slots:
+                    page_content = self.cached_page(entry['url'])
+                    if page_content is None:
+                        page_content = await self.fetcher.fetch_async(session, entry['url'])
+                if not page_content:
+                    # fetch_async returns "" on errors and while the host's circuit is open
+                    raise ValueError(f"Could not fetch {entry['url']}")
+                job_description = self.parse_description(page_content)
+            except Exception as e:
+                logging.error(f"Error processing entry {entry['title']}: {e}")
+                return
+            record(entry, 'fetched', job_description)
+            await fetched.put((index, entry, job_description))
+
+        async def generate_one(index: int, entry: Dict, job_description: str):
+            try:
+                latex_content = await loop.run_in_executor(llm_executor, self.generate, entry, job_description)
+            except Exception as e:
+                logging.error(f"Error processing entry {entry['title']}: {e}")
+                return
+            record(entry, 'generated', latex_content)
+            await generated.put((index, entry, latex_content))
+
+        async def generate_worker():
+            while (item := await fetched.get()) is not None:
+                await generate_one(*item)
+
+        async def batch_worker():
+            items = []
+            while (item := await fetched.get()) is not None:
+                items.append(item)
+            if len(items) < self.batch_min_size:
+                await asyncio.gather(*(generate_one(*item) for item in items))
+                return
+
+            pending = {f"entry-{index}": (index, entry) for index, entry, _ in items}
+            try:
+                jobs = [(f"entry-{index}", entry, job_description) for index, entry, job_description in items]
+                async for custom_id, outcome in self.generate_batch(jobs):
+                    index, entry = pending.pop(custom_id)
+                    if isinstance(outcome, Exception):
+                        logging.error(f"Error processing entry {entry['title']}: {outcome}")
+                        continue
+                    record(entry, 'generated', outcome)
+                    await generated.put((index, entry, outcome))
+            except Exception as e:
+                logging.error(f"Message batch failed, generating {len(pending)} letters one by one: {e}")
+                await asyncio.gather(*(generate_one(*item) for item in items if f"entry-{item[0]}" in pending))
+
+        async def compile_worker():
+            while (item := await generated.get()) is not None:
+                index, entry, latex_content = item
+                try:
+                    pdf_path, latex_output_path = await loop.run_in_executor(compile_executor, self.compile, entry, latex_content)
+                    results[index] = (entry, [pdf_path, latex_output_path])
+                    record(entry, 'compiled', results[index][1])
+                except Exception as e:
+                    logging.error(f"Error processing entry {entry['title']}: {e}")
+
+        try:
+            if self.generate_batch:
+                generate_workers = [asyncio.create_task(batch_worker())]
+            else:
+                generate_workers = [asyncio.create_task(generate_worker()) for _ in range(self.llm_concurrency)]
+            compile_workers = [asyncio.create_task(compile_worker()) for _ in range(self.compile_concurrency)]
+
+            async with self.fetcher.async_session() as session:
+                await asyncio.gather(*(fetch(session, index, entry) for index, entry in enumerate(entries)))
+            for _ in generate_workers:
+                await fetched.put(None)
+            await asyncio.gather(*generate_workers)
+            for _ in compile_workers:
+                await generated.put(None)
+            await asyncio.gather(*compile_workers)
+        finally:
+            llm_executor.shutdown(wait=False)
+            compile_executor.shutdown(wait=False)
+
+        return [results[index] for index in sorted(results)]
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+# Answers worth another attempt: rate limited or a temporary server problem
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average and bursts of up to ``burst``.
+
+    ``reserve`` takes a token and returns how long to wait before using it,
+    so sync callers sleep and async callers await the same reservation.
+    Waiting callers queue up in the order they reserved.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """Stops requests to a host after ``failure_threshold`` failed fetches in a row.
+
+    Once ``cooldown`` seconds have passed, one trial request is let through:
+    success closes the circuit again, failure opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 300):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """Count a failed fetch; returns True if this opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            was_open = self._opened_at is not None
+            if was_open or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+            return not was_open and self._opened_at is not None
+
+
+class FetchPolicy:
+    """Per-host rate limits, retry backoff and circuit breakers shared by all fetches.
+
+    Failed attempts are retried up to ``max_retries`` times, waiting
+    ``backoff * 2**attempt`` seconds (capped at ``max_backoff``) or as long
+    as the server's Retry-After asks. A Retry-After longer than
+    ``max_backoff`` is not waited out; the fetch fails instead.
+    """
+
+    def __init__(self, requests_per_second: float = 2, burst: float = 10, max_retries: int = 3, backoff: float = 1,
+                 max_backoff: float = 60, failure_threshold: int = 5, cooldown: float = 300):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Mapping) -> 'FetchPolicy':
+        keys = ('requests_per_second', 'burst', 'max_retries', 'backoff', 'max_backoff', 'failure_threshold', 'cooldown')
+        return cls(**{key: config[key] for key in keys if key in config})
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+            return self._buckets[host]
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.cooldown)
+            return self._breakers[host]
+
+    def retry_delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before retry number ``attempt + 1``, or None to give up."""
+        if attempt >= self.max_retries:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+        return min(self.backoff * 2 ** attempt, self.max_backoff)
+
+    def record(self, host: str, success: bool):
+        breaker = self.breaker(host)
+        if success:
+            breaker.record_success()
+        elif breaker.record_failure():
+            logging.warning(f"Pausing requests to {host} for {self.cooldown}s after {breaker.failures} failed fetches")
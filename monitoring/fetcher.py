@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, Mapping, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from monitoring.fetch_policy import RETRY_STATUSES, FetchPolicy, parse_retry_after
+from monitoring.http_cache import HttpCache
+from monitoring.metrics import Metrics, get_default_metrics
+
+if TYPE_CHECKING:
+    import aiohttp
+
+USER_AGENT = 'Career Monitor Bot 1.0'
+
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (5, 30)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+@dataclass
+class FetchResult:
+    url: str
+    text: str
+    status: int
+    not_modified: bool = False
+    error: Optional[str] = None
+    # Response headers, for storing the validators of a fetch made with store=False
+    headers: Optional[Mapping[str, str]] = None
+
+
+class FetchError(Exception):
+    pass
+
+
+class PageFetcher:
+    """Fetches pages over pooled keep-alive connections.
+
+    One fetcher is shared by SiteMonitor and WebPageParser so listing and
+    detail pages on the same host reuse connections instead of paying a new
+    TCP+TLS handshake per request.
+
+    Every request, sync or async, goes through the fetch policy: it waits for
+    its host's rate limit, is retried with backoff on connection errors,
+    timeouts, 429 and 5xx answers, and is not sent at all while the host's
+    circuit breaker is open.
+    """
+
+    def __init__(self, timeout: Timeout = DEFAULT_TIMEOUT, pool_size: int = 20, max_in_flight: int = 10, max_in_flight_per_host: int = 6, cache: Optional[HttpCache] = None, policy: Optional[FetchPolicy] = None, metrics: Optional[Metrics] = None):
+        self.timeout = timeout
+        self.cache = cache
+        self.policy = policy or FetchPolicy()
+        self.metrics = metrics or get_default_metrics()
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_host = max_in_flight_per_host
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _record(self, host: str, status, body_size: int, seconds: float):
+        self.metrics.inc('sitemonitor_fetch_requests_total', host=host, status=status)
+        self.metrics.observe('sitemonitor_fetch_seconds', seconds, host=host)
+        if body_size:
+            self.metrics.inc('sitemonitor_fetch_bytes_total', body_size, host=host)
+
+    def _get(self, url: str, timeout: Timeout, headers: Optional[Dict] = None) -> requests.Response:
+        """GET a url under the fetch policy; the last answer is returned once retries run out."""
+        host = urlparse(url).netloc.lower()
+        if not self.policy.breaker(host).allow():
+            raise FetchError(f"Not fetching {url}, {host} is failing")
+        attempt = 0
+        while True:
+            time.sleep(self.policy.bucket(host).reserve())
+            response = retry_after = None
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=timeout)
+                self._record(host, response.status_code, len(response.content), time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES:
+                    # A 404 is the page's problem, not the host's
+                    self.policy.record(host, success=response.status_code < 500)
+                    return response
+                problem = f"HTTP {response.status_code}"
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(host, 'error', 0, time.perf_counter() - start)
+                problem = str(e)
+                if attempt >= self.policy.max_retries:
+                    self.policy.record(host, success=False)
+                    raise
+            except Exception:
+                # Not worth retrying, but it still counts against the host and ends a half-open trial
+                self._record(host, 'error', 0, time.perf_counter() - start)
+                self.policy.record(host, success=False)
+                raise
+            delay = self.policy.retry_delay(attempt, retry_after)
+            if delay is None:
+                self.policy.record(host, success=False)
+                return response
+            logging.warning(f"Retrying {url} in {delay:.1f}s after {problem}")
+            time.sleep(delay)
+            attempt += 1
+
+    def fetch(self, url: str, timeout: Optional[Timeout] = None, store: bool = True) -> FetchResult:
+        """Fetch a page, revalidating against the cache when one is set.
+
+        A 304 answer yields the cached body with ``not_modified`` set. Errors
+        yield an empty body with status 0 and the reason in ``error``. With
+        ``store=False`` the response is not cached; the caller stores it with
+        ``store_result`` once it has been handled, so a crash in between does
+        not leave validators behind that answer the next fetch with a 304.
+        """
+        timeout = timeout or self.timeout
+        try:
+            logging.info(f"Fetching page {url}")
+            headers = self.cache.conditional_headers(url) if self.cache else {}
+            response = self._get(url, timeout, headers)
+            if response.status_code == 304:
+                body = self.cache.get(url) if self.cache else None
+                if body is not None:
+                    logging.info(f"Page not modified {url}")
+                    return FetchResult(url=url, text=body, status=304, not_modified=True)
+                # Cached body was evicted in the meantime
+                response = self._get(url, timeout)
+            response.raise_for_status()
+            if self.cache and store:
+                self.cache.store(url, response.headers, response.text)
+            return FetchResult(url=url, text=response.text, status=response.status_code, headers=response.headers)
+        except (requests.RequestException, FetchError) as e:
+            logging.error(f"Error fetching page {url}: {e}")
+            return FetchResult(url=url, text="", status=0, error=str(e))
+
+    def store_result(self, result: FetchResult):
+        if self.cache and result.headers is not None and not result.error:
+            self.cache.store(result.url, result.headers, result.text)
+
+    def fetch_page(self, url: str, timeout: Optional[Timeout] = None) -> str:
+        return self.fetch(url, timeout).text
+
+    def _client_timeout(self, timeout: Optional[Timeout]) -> 'aiohttp.ClientTimeout':
+        import aiohttp
+
+        timeout = timeout or self.timeout
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=timeout)
+
+    def async_session(self, timeout: Optional[Timeout] = None) -> 'aiohttp.ClientSession':
+        """Session for fetch_async; create it inside the event loop that uses it."""
+        # aiohttp takes longer to import than the rest of the fetcher, and only detail page fetches need it
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight, limit_per_host=self.max_in_flight_per_host)
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers={'User-Agent': USER_AGENT},
+            timeout=self._client_timeout(timeout)
+        )
+
+    async def _get_async(self, session: 'aiohttp.ClientSession', url: str, headers: Optional[Dict] = None) -> Tuple[int, Mapping, str]:
+        """Async twin of _get; returns (status, headers, body) of the last answer."""
+        import aiohttp
+
+        host = urlparse(url).netloc.lower()
+        if not self.policy.breaker(host).allow():
+            raise FetchError(f"Not fetching {url}, {host} is failing")
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.policy.bucket(host).reserve())
+            answer = retry_after = None
+            start = time.perf_counter()
+            try:
+                async with session.get(url, headers=headers) as response:
+                    # text() decodes the body read() already buffered
+                    size = len(await response.read())
+                    answer = (response.status, response.headers, await response.text())
+                self._record(host, response.status, size, time.perf_counter() - start)
+                if response.status not in RETRY_STATUSES:
+                    self.policy.record(host, success=response.status < 500)
+                    return answer
+                problem = f"HTTP {response.status}"
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self._record(host, 'error', 0, time.perf_counter() - start)
+                problem = str(e) or type(e).__name__
+                if attempt >= self.policy.max_retries:
+                    self.policy.record(host, success=False)
+                    raise
+            except Exception:
+                self._record(host, 'error', 0, time.perf_counter() - start)
+                self.policy.record(host, success=False)
+                raise
+            delay = self.policy.retry_delay(attempt, retry_after)
+            if delay is None:
+                self.policy.record(host, success=False)
+                return answer
+            logging.warning(f"Retrying {url} in {delay:.1f}s after {problem}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def fetch_async(self, session: 'aiohttp.ClientSession', url: str) -> str:
+        import aiohttp
+
+        try:
+            logging.info(f"Fetching page {url}")
+            headers = self.cache.conditional_headers(url) if self.cache else {}
+            status, response_headers, body = await self._get_async(session, url, headers)
+            if status == 304:
+                body = self.cache.get(url) if self.cache else None
+                if body is None:
+                    # Cached body was evicted in the meantime
+                    status, response_headers, body = await self._get_async(session, url)
+            if status >= 400:
+                raise FetchError(f"HTTP {status} for {url}")
+            if status != 304 and self.cache:
+                self.cache.store(url, response_headers, body)
+            return body
+        except (aiohttp.ClientError, asyncio.TimeoutError, FetchError) as e:
+            logging.error(f"Error fetching page {url}: {e}")
+            return ""
+
+    async def fetch_pages_async(self, urls: Iterable[str], timeout: Optional[Timeout] = None) -> Dict[str, str]:
+        unique_urls = list(dict.fromkeys(url for url in urls if url))
+        async with self.async_session(timeout) as session:
+            pages = await asyncio.gather(*(self.fetch_async(session, url) for url in unique_urls))
+        return dict(zip(unique_urls, pages))
+
+    def fetch_pages(self, urls: Iterable[str], timeout: Optional[Timeout] = None) -> Dict[str, str]:
+        """Fetch many pages concurrently and return them keyed by url.
+
+        Each url is fetched once; failed fetches map to "" like fetch_page.
+        """
+        return asyncio.run(self.fetch_pages_async(urls, timeout))
+
+    def close(self):
+        self.session.close()
+
+
+_default_fetcher = None
+_default_fetcher_lock = threading.Lock()
+
+
+def get_default_fetcher(policy: Optional[FetchPolicy] = None) -> PageFetcher:
+    """The shared fetcher; ``policy`` only applies to the call that creates it."""
+    global _default_fetcher
+    with _default_fetcher_lock:
+        if _default_fetcher is None:
+            _default_fetcher = PageFetcher(cache=HttpCache(), policy=policy)
+        return _default_fetcher
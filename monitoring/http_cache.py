@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+
+class HttpCache:
+    """On-disk cache of response bodies and their HTTP validators.
+
+    Only responses carrying an ETag or Last-Modified header are stored, since
+    those are the ones a server can answer with 304 Not Modified. Entries are
+    evicted least-recently-used first once the cache grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory: str = 'data/http_cache', max_bytes: int = 100 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: OrderedDict = OrderedDict()
+        self._total_bytes = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        # Oldest access first, so the index starts out in LRU order
+        paths = sorted(self.directory.glob('*.json'), key=lambda path: path.stat().st_mtime)
+        for path in paths:
+            size = path.stat().st_size
+            self._index[path.stem] = size
+            self._total_bytes += size
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _read(self, url: str) -> Optional[Dict]:
+        key = self._key(url)
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            os.utime(path)
+            return record
+        except (OSError, ValueError) as e:
+            logging.warning(f"Dropping unreadable cache entry for {url}: {e}")
+            self.invalidate(url)
+            return None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        record = self._read(url)
+        if not record:
+            return {}
+        headers = {}
+        if record.get('etag'):
+            headers['If-None-Match'] = record['etag']
+        if record.get('last_modified'):
+            headers['If-Modified-Since'] = record['last_modified']
+        return headers
+
+    def get(self, url: str) -> Optional[str]:
+        record = self._read(url)
+        return record['body'] if record else None
+
+    def store(self, url: str, headers: Mapping[str, str], body: str):
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        key = self._key(url)
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        record = {'url': url, 'etag': etag, 'last_modified': last_modified, 'body': body}
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not cache response for {url}: {e}")
+            return
+
+        size = path.stat().st_size
+        with self._lock:
+            self._total_bytes += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self._evict()
+
+    def invalidate(self, url: str):
+        key = self._key(url)
+        with self._lock:
+            self._total_bytes -= self._index.pop(key, 0)
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self._path(key).unlink(missing_ok=True)
+            logging.info(f"Evicted cached response {key}")
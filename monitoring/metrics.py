@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+# Upper bounds in seconds of the stage duration histogram buckets
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Run summary fields counted per site
+SUMMARY_COUNTERS = {
+    'entries_found': 'sitemonitor_entries_seen_total',
+    'entries_selected': 'sitemonitor_entries_new_total',
+    'entries_generated': 'sitemonitor_letters_generated_total',
+    'entries_resumed': 'sitemonitor_entries_resumed_total',
+    'entries_failed': 'sitemonitor_entries_failed_total',
+    'emails_failed': 'sitemonitor_emails_failed_total',
+}
+
+HELP = {
+    'sitemonitor_runs_total': 'Site monitor runs by outcome',
+    'sitemonitor_run_seconds': 'Duration of whole site monitor runs',
+    'sitemonitor_stage_seconds': 'Time spent in each stage of a site monitor run',
+    'sitemonitor_entries_seen_total': 'Entries found on listing pages',
+    'sitemonitor_entries_new_total': 'Entries selected for processing',
+    'sitemonitor_letters_generated_total': 'Cover letters generated and compiled',
+    'sitemonitor_entries_resumed_total': 'Entries resumed from an interrupted run',
+    'sitemonitor_entries_failed_total': 'Entries whose detail page, letter or PDF failed',
+    'sitemonitor_emails_failed_total': 'Notifications that could not be sent',
+    'sitemonitor_llm_tokens_total': 'LLM tokens by kind',
+    'sitemonitor_llm_requests_total': 'LLM requests',
+    'sitemonitor_cache_hits_total': 'Prompt and letter cache hits',
+    'sitemonitor_fetch_requests_total': 'HTTP requests by host and status',
+    'sitemonitor_fetch_bytes_total': 'Bytes of page content fetched',
+    'sitemonitor_fetch_seconds': 'Time spent on HTTP requests',
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Mapping[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """In-process counters and duration histograms in the Prometheus text format.
+
+    ``stage`` times a block of work into ``sitemonitor_stage_seconds``. With
+    tracing enabled it also opens an OpenTelemetry span for the block, which
+    is exported by whatever SDK the process was started with.
+    """
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], List[float]] = {}
+        self._lock = threading.Lock()
+        self._tracer = None
+
+    def enable_tracing(self):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            logging.warning("Tracing needs the opentelemetry-api package, continuing without spans")
+            return
+        self._tracer = trace.get_tracer('sitemonitor')
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            # Per-bucket counts, then count and sum
+            buckets = self._histograms.setdefault(key, [0] * (len(DURATION_BUCKETS) + 2))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            buckets[-2] += 1
+            buckets[-1] += seconds
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[None]:
+        if self._tracer is None:
+            yield
+            return
+        with self._tracer.start_as_current_span(name, attributes={key: str(value) for key, value in attributes.items()}):
+            yield
+
+    def add_stage_time(self, site: str, stage: str, seconds: float, timings: Optional[Dict[str, float]] = None):
+        self.observe('sitemonitor_stage_seconds', seconds, site=site, stage=stage)
+        if timings is not None:
+            with self._lock:
+                timings[stage] = timings.get(stage, 0) + seconds
+
+    @contextmanager
+    def stage(self, site: str, stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+        """Time a stage of a run; the duration is also added to ``timings`` when given."""
+        start = time.perf_counter()
+        try:
+            with self.span(f"sitemonitor.{stage}", site=site):
+                yield
+        finally:
+            self.add_stage_time(site, stage, time.perf_counter() - start, timings)
+
+    def record_run(self, site: str, summary: Dict, seconds: float):
+        self.inc('sitemonitor_runs_total', site=site, status=summary.get('status', ''))
+        self.observe('sitemonitor_run_seconds', seconds, site=site)
+        for field, name in SUMMARY_COUNTERS.items():
+            if summary.get(field):
+                self.inc(name, summary[field], site=site)
+        usage = summary.get('llm_usage') or {}
+        for kind in ('input_tokens', 'output_tokens', 'cache_creation_input_tokens', 'cache_read_input_tokens'):
+            if usage.get(kind):
+                self.inc('sitemonitor_llm_tokens_total', usage[kind], site=site, kind=kind.replace('_tokens', ''))
+        if usage.get('requests'):
+            self.inc('sitemonitor_llm_requests_total', usage['requests'], site=site)
+        for field, cache in (('cache_hits', 'prompt'), ('letter_cache_hits', 'letter')):
+            if usage.get(field):
+                self.inc('sitemonitor_cache_hits_total', usage[field], site=site, cache=cache)
+
+    def render(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(buckets) for key, buckets in self._histograms.items()}
+
+        lines = []
+        described = set()
+
+        def describe(name: str, kind: str):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), buckets in sorted(histograms.items()):
+            describe(name, 'histogram')
+            for bound, count in zip(DURATION_BUCKETS, buckets):
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {buckets[-2]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {buckets[-2]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {buckets[-1]:.6f}")
+        return '\n'.join(lines) + '\n'
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_default_metrics() -> Metrics:
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+        return _default_metrics
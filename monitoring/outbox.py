@@ -0,0 +1,122 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+class NotificationOutbox:
+    """Durable queue of entry notifications, delivered by a background worker.
+
+    Monitors enqueue notifications into the state database and move on; the
+    worker sends everything that is due over one SMTP connection. Failed
+    notifications are retried with exponential backoff and given up on after
+    ``max_attempts``. Attachments are removed only once their email is out.
+
+    With a digest sender, everything due at once goes out as one email per
+    set of send props, so waking the worker after a sweep sends one digest
+    for the whole sweep. New notifications then wait for that wake-up or
+    ``close``; the timed poll only retries failed deliveries, so a sweep
+    longer than ``poll_interval`` is not split across several digests.
+    """
+
+    def __init__(self, state, email_sender, poll_interval: float = 30, base_delay: float = 60, max_delay: float = 3600, max_attempts: int = 10, batch_size: int = 100):
+        self.state = state
+        self.email_sender = email_sender
+        self.poll_interval = poll_interval
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.batch_size = batch_size
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._thread = None
+
+    def enqueue(self, site: str, notifications: List[Tuple[Dict, List[str]]], send_props: List[str]):
+        # Absolute paths, so the worker does not depend on the monitor's working directory
+        notifications = [(entry, [str(Path(path).resolve()) for path in file_paths if path]) for entry, file_paths in notifications]
+        self.state.enqueue_notifications(site, notifications, send_props)
+        logging.info(f"Queued {len(notifications)} notifications for {site}")
+        if not self.email_sender.digest:
+            self.wake()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _batches(self, due: List[Dict]) -> List[List[Dict]]:
+        if not self.email_sender.digest:
+            return [[notification] for notification in due]
+        groups = defaultdict(list)
+        for notification in due:
+            groups[json.dumps(notification['send_props'])].append(notification)
+        return list(groups.values())
+
+    def drain(self, retries_only: bool = False) -> int:
+        """Send every notification that is due; returns how many were delivered.
+
+        With ``retries_only``, notifications that were never tried are left queued.
+        """
+        delivered = 0
+        with self._drain_lock:
+            while True:
+                due = self.state.due_notifications(time.time(), limit=self.batch_size, retries_only=retries_only)
+                delivered_before = delivered
+                batches = self._batches(due)
+                messages = (
+                    self.email_sender.build_message([(n['entry'], n['file_paths']) for n in batch], batch[0]['send_props'])
+                    for batch in batches
+                )
+                for batch, error in zip(batches, self.email_sender.deliver(messages)):
+                    if error is None:
+                        self.state.remove_notifications([n['id'] for n in batch])
+                        self.email_sender.remove_files([path for n in batch for path in n['file_paths']])
+                        delivered += len(batch)
+                        continue
+                    for notification in batch:
+                        self._retry_later(notification, error)
+                # Stop once the queue is empty or nothing in this round went out
+                if len(due) < self.batch_size or delivered == delivered_before:
+                    break
+        if delivered:
+            logging.info(f"Delivered {delivered} notifications")
+        return delivered
+
+    def _retry_later(self, notification: Dict, error: Exception):
+        attempts = notification['attempts'] + 1
+        title = notification['entry'].get('title')
+        if attempts >= self.max_attempts:
+            logging.error(f"Giving up on notification for {title} after {attempts} attempts: {error}")
+            self.state.retry_notification(notification['id'], str(error), None)
+            return
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        logging.warning(f"Could not send notification for {title}, retrying in {delay:.0f}s: {error}")
+        self.state.retry_notification(notification['id'], str(error), time.time() + delay)
+
+    def _run(self):
+        retries_only = False
+        while not self._stopped.is_set():
+            try:
+                self.drain(retries_only=retries_only)
+            except Exception as e:
+                logging.error(f"Error draining notification outbox: {e}")
+            woken = self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            # A digest goes out when a sweep ends, not whenever the poll interval runs out mid-sweep
+            retries_only = self.email_sender.digest and not woken
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='outbox', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stop the worker after one last pass over what is due."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.drain()
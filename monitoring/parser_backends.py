@@ -0,0 +1,121 @@
+from typing import Any, List, Optional
+from bs4 import BeautifulSoup
+import soupsieve
+
+
+class SoupBackend:
+    """BeautifulSoup trees queried with pre-compiled soupsieve selectors.
+
+    ``features`` picks the tree builder: 'html.parser' is pure Python, 'lxml'
+    builds the same soup with the much faster libxml2 parser.
+    """
+
+    # Building a soup costs far more than streaming the page past a region filter
+    scoped_parsing = True
+
+    def __init__(self, features: str = 'html.parser'):
+        self.name = features
+        self.features = features
+
+    def parse(self, page_content: str) -> Any:
+        return BeautifulSoup(page_content, self.features)
+
+    def adopt(self, elements: List) -> Any:
+        """Build a tree holding only the given lxml elements."""
+        from lxml import etree
+        markup = ''.join(etree.tostring(element, encoding='unicode', method='html') for element in elements)
+        return self.parse(f"<html><body>{markup}</body></html>")
+
+    def compile(self, selector: str) -> Any:
+        return soupsieve.compile(selector)
+
+    def select(self, node, compiled) -> List:
+        return compiled.select(node)
+
+    def select_one(self, node, compiled) -> Optional[Any]:
+        return compiled.select_one(node)
+
+    def text(self, node) -> str:
+        return node.get_text(strip=True)
+
+    def raw_text(self, node) -> str:
+        return node.get_text()
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def markup(self, node) -> str:
+        return str(node)
+
+
+class LxmlBackend:
+    """lxml.html trees queried with CSS selectors compiled to XPath.
+
+    Text and attribute access follow BeautifulSoup's conventions, so entries
+    come out the same as with SoupBackend.
+    """
+
+    name = 'lxml-native'
+    # libxml2 builds the full tree faster than a Python-level region filter can skip it
+    scoped_parsing = False
+
+    def __init__(self):
+        # Imported here so lxml and cssselect are only needed when selected
+        import lxml.html
+        from lxml import etree
+        from lxml.cssselect import CSSSelector
+        self._html = lxml.html
+        self._etree = etree
+        self._css_selector = CSSSelector
+        # get_text skips comments and script/style contents
+        self._text_nodes = etree.XPath('.//text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+
+    def parse(self, page_content: str) -> Any:
+        if not page_content or not page_content.strip():
+            return self._html.fromstring('<html></html>')
+        return self._html.document_fromstring(page_content)
+
+    def adopt(self, elements: List) -> Any:
+        root = self._html.Element('html')
+        body = self._etree.SubElement(root, 'body')
+        body.extend(elements)
+        return root
+
+    def compile(self, selector: str) -> Any:
+        return self._css_selector(selector, translator='html')
+
+    def select(self, node, compiled) -> List:
+        # CSSSelector matches the node itself too; soupsieve only searches below it
+        return [element for element in compiled(node) if element is not node]
+
+    def select_one(self, node, compiled) -> Optional[Any]:
+        for element in compiled(node):
+            if element is not node:
+                return element
+        return None
+
+    def text(self, node) -> str:
+        return ''.join(part.strip() for part in self._text_nodes(node))
+
+    def raw_text(self, node) -> str:
+        return ''.join(self._text_nodes(node))
+
+    def attr(self, node, name: str) -> Optional[str]:
+        return node.get(name)
+
+    def markup(self, node) -> str:
+        return self._etree.tostring(node, encoding='unicode', with_tail=False)
+
+
+BACKENDS = {
+    'html.parser': lambda: SoupBackend('html.parser'),
+    'lxml': lambda: SoupBackend('lxml'),
+    'lxml-native': LxmlBackend,
+}
+
+
+def create_backend(name: str = 'html.parser'):
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown parser backend: {name}. Choose one of {', '.join(BACKENDS)}")
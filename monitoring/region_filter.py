@@ -0,0 +1,110 @@
+import logging
+import re
+from typing import Callable, List, Optional
+from lxml import etree
+
+# One simple selector compound: optional tag, then .class, #id and [attr] / [attr=value] parts
+COMPOUND = re.compile(r'^(?P<tag>[A-Za-z][\w-]*|\*)?(?P<parts>(?:\.[\w-]+|#[\w-]+|\[[^\]]+\])*)$')
+PART = re.compile(r'\.(?P<cls>[\w-]+)|#(?P<id>[\w-]+)|\[\s*(?P<attr>[\w-]+)\s*(?:=\s*(?P<quote>["\']?)(?P<value>.*?)(?P=quote))?\s*\]')
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _compound_matcher(compound: str) -> Optional[Callable]:
+    match = COMPOUND.match(compound)
+    if not match:
+        return None
+    tag = match.group('tag')
+    tag = tag.lower() if tag and tag != '*' else None
+    classes, element_id, attrs = [], None, []
+    for part in PART.finditer(match.group('parts')):
+        if part.group('cls'):
+            classes.append(part.group('cls'))
+        elif part.group('id'):
+            element_id = part.group('id')
+        else:
+            attrs.append((part.group('attr').lower(), part.group('value')))
+
+    def matches(element) -> bool:
+        if tag and element.tag != tag:
+            return False
+        if element_id and element.get('id') != element_id:
+            return False
+        if classes:
+            element_classes = element.get('class', '').split()
+            if not all(cls in element_classes for cls in classes):
+                return False
+        for name, value in attrs:
+            if element.get(name) is None or (value is not None and element.get(name) != value):
+                return False
+        return True
+
+    return matches
+
+
+class RegionFilter:
+    """Streams a page through lxml and keeps only the regions entries live in.
+
+    A region is an outermost element matching the first compound of the entry
+    selector, e.g. ``section.jobs`` for ``section.jobs li > a``. Everything
+    outside the regions is discarded while parsing, so neither the full tree
+    nor the full soup is ever built.
+    """
+
+    def __init__(self, matchers: List[Callable]):
+        self.matchers = matchers
+
+    @classmethod
+    def from_selector(cls, selector: str) -> Optional['RegionFilter']:
+        """Build a filter for ``selector``, or None when regions cannot be derived.
+
+        Sibling combinators and pseudo-classes can depend on nodes outside the
+        region, so those selectors keep parsing the whole page.
+        """
+        matchers = []
+        for alternative in selector.split(','):
+            alternative = alternative.strip()
+            if not alternative or re.search(r'[+~:]', alternative):
+                return None
+            first = re.split(r'\s*>\s*|\s+', alternative)[0]
+            matcher = _compound_matcher(first)
+            if matcher is None:
+                return None
+            matchers.append(matcher)
+        return cls(matchers)
+
+    def _matches(self, element) -> bool:
+        return isinstance(element.tag, str) and any(matcher(element) for matcher in self.matchers)
+
+    def extract(self, page_content: str) -> List:
+        """Return the outermost matching elements, detached from the page."""
+        parser = etree.HTMLPullParser(events=('start', 'end'))
+        regions = []
+        region_root = None
+
+        for offset in range(0, len(page_content), CHUNK_SIZE):
+            parser.feed(page_content[offset:offset + CHUNK_SIZE])
+            for event, element in parser.read_events():
+                if event == 'start':
+                    if region_root is None and self._matches(element):
+                        region_root = element
+                    continue
+                if element is region_root:
+                    element.tail = None
+                    if element.getparent() is not None:
+                        element.getparent().remove(element)
+                    regions.append(element)
+                    region_root = None
+                    continue
+                if region_root is None:
+                    # Drop finished subtrees outside any region to keep memory flat
+                    element.clear(keep_tail=False)
+                    parent = element.getparent()
+                    while parent is not None and element.getprevious() is not None:
+                        del parent[0]
+        try:
+            parser.close()
+        except etree.XMLSyntaxError as e:
+            logging.warning(f"Incomplete page while extracting entry regions: {e}")
+
+        return regions
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+# Run summary statuses for sites whose entry page had not changed
+SKIPPED_STATUSES = ('not_modified', 'unchanged')
+
+
+@dataclass
+class RunResult:
+    url: str
+    success: bool
+    duration: float
+    error: Optional[str] = None
+    summary: Dict = field(default_factory=dict)
+
+
+def site_host(site_config: dict) -> str:
+    return urlparse(site_config['entry_site']['url']).netloc.lower()
+
+
+class RunEngine:
+    """Runs many site monitors at once.
+
+    At most ``max_workers`` sites run at the same time, and at most
+    ``max_per_host`` of them against the same host. Sites waiting on a busy
+    host do not hold a worker, so other hosts keep making progress. Sites can
+    be handed over one at a time with ``submit`` or as a sweep with
+    ``run_all``; both share the same limits.
+    """
+
+    def __init__(self, run_site: Callable[[dict], Optional[Dict]], max_workers: int = 8, max_per_host: int = 2):
+        if max_workers < 1 or max_per_host < 1:
+            raise ValueError("max_workers and max_per_host must be at least 1")
+        self.run_site = run_site
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        # Queued sites per host, so a host at its limit never blocks the others
+        self._pending: Dict[str, deque] = defaultdict(deque)
+        self._in_flight = 0
+        self._in_flight_per_host: Dict[str, int] = defaultdict(int)
+        self._executor = None
+
+    def _run_one(self, site_config: dict) -> RunResult:
+        url = site_config['entry_site']['url']
+        start = time.monotonic()
+        try:
+            summary = self.run_site(site_config) or {}
+            return RunResult(url=url, success=True, duration=time.monotonic() - start, summary=summary)
+        except Exception as e:
+            logging.error(f"Error running monitor for {url}: {e}", exc_info=True)
+            return RunResult(url=url, success=False, duration=time.monotonic() - start, error=str(e))
+
+    def submit(self, site_config: dict) -> Future:
+        """Queue one site run; the future resolves to its RunResult."""
+        result = Future()
+        with self._lock:
+            self._pending[site_host(site_config)].append((site_config, result))
+            self._dispatch()
+        return result
+
+    def _dispatch(self):
+        # Called with the lock held
+        for host in list(self._pending):
+            queue = self._pending[host]
+            while queue and self._in_flight < self.max_workers and self._in_flight_per_host[host] < self.max_per_host:
+                site_config, result = queue.popleft()
+                self._in_flight += 1
+                self._in_flight_per_host[host] += 1
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='monitor')
+                self._executor.submit(self._run_and_release, site_config, host, result)
+            if not queue:
+                del self._pending[host]
+
+    def _run_and_release(self, site_config: dict, host: str, result: Future):
+        outcome = self._run_one(site_config)
+        with self._lock:
+            self._in_flight -= 1
+            self._in_flight_per_host[host] -= 1
+            self._dispatch()
+        result.set_result(outcome)
+
+    def run_all(self, site_configs: List[dict]) -> List[RunResult]:
+        if not site_configs:
+            return []
+
+        start = time.monotonic()
+        futures = [self.submit(site_config) for site_config in site_configs]
+        results = [future.result() for future in futures]
+        self.log_summary(results, time.monotonic() - start)
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def log_summary(self, results: List[RunResult], elapsed: float):
+        failed = [result for result in results if not result.success]
+        skipped = [result for result in results if result.summary.get('status') in SKIPPED_STATUSES]
+        slowest = max(results, key=lambda result: result.duration)
+        logging.info(
+            f"Sweep finished: {len(results)} sites in {elapsed:.1f}s, "
+            f"{len(skipped)} unchanged, {len(failed)} failed, "
+            f"slowest {slowest.url} ({slowest.duration:.1f}s)"
+        )
+        for result in failed:
+            logging.info(f"Failed site {result.url}: {result.error}")
@@ -0,0 +1,175 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from monitoring.run_engine import site_host
+from monitoring.site_monitor import site_key
+
+
+class MonitorScheduler:
+    """Runs each site monitor every ``check_interval`` seconds on a RunEngine.
+
+    Next run times are kept in a min-heap and the scheduler thread sleeps
+    exactly until the earliest one, so runs start on time without polling and
+    ``trigger``/``stop`` take effect immediately. Each run is pushed back by
+    up to ``jitter`` of its interval to spread load, and runs on the same host
+    start at least ``host_spacing`` seconds apart. A site is never run again
+    while its previous run is still going.
+
+    With a state store, a site whose last recorded run is more than one
+    interval ago runs right away after startup, once, however many runs were
+    missed; other sites wait out the rest of their interval.
+    """
+
+    def __init__(self, engine, site_configs: List[dict], default_interval: float = 3600, jitter: float = 0.1,
+                 host_spacing: float = 0, state=None, on_idle: Optional[Callable[[], None]] = None):
+        self.engine = engine
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.host_spacing = host_spacing
+        self.state = state
+        self.on_idle = on_idle
+        self.sites: Dict[str, dict] = {site_config['entry_site']['url']: site_config for site_config in site_configs}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._scheduled: Dict[str, float] = {}
+        self._running = set()
+        self._last_started: Dict[str, float] = {}
+        self._host_free_at: Dict[str, float] = {}
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+        now = time.time()
+        for url, site_config in self.sites.items():
+            self._schedule(url, self._first_run_at(site_config, now))
+
+    def interval(self, site_config: dict) -> float:
+        return site_config.get('check_interval', self.default_interval)
+
+    def _first_run_at(self, site_config: dict, now: float) -> float:
+        last_run = self.state.last_run_at(site_key(site_config['entry_site']['url'])) if self.state else None
+        if last_run is None:
+            return now
+        # Missed runs collapse into a single run now
+        return max(now, last_run + self.interval(site_config))
+
+    def _jittered(self, due: float, interval: float) -> float:
+        return due + random.uniform(0, self.jitter * interval)
+
+    def _schedule(self, url: str, due: float):
+        # Called with the condition held, or before the thread starts
+        self._scheduled[url] = due
+        heapq.heappush(self._heap, (due, next(self._sequence), url))
+
+    def next_run_at(self, url: str) -> Optional[float]:
+        with self._condition:
+            return self._scheduled.get(url)
+
+    def trigger(self, url: str):
+        """Run a site as soon as its host allows, ahead of its schedule."""
+        with self._condition:
+            if url in self.sites and url not in self._running:
+                self._schedule(url, time.time())
+                self._condition.notify()
+
+    def update_sites(self, site_configs: List[dict]):
+        """Switch to a new set of site configs without losing the schedule.
+
+        New sites run right away, removed sites are dropped, and a site whose
+        interval changed is rescheduled from its last run.
+        """
+        sites = {site_config['entry_site']['url']: site_config for site_config in site_configs}
+        now = time.time()
+        with self._condition:
+            for url in set(self.sites) - set(sites):
+                logging.info(f"No longer monitoring {url}")
+                # Stale heap entries are skipped once the url is unscheduled
+                self._scheduled.pop(url, None)
+            for url, site_config in sites.items():
+                previous = self.sites.get(url)
+                if previous is None:
+                    logging.info(f"Now monitoring {url} every {self.interval(site_config)}s")
+                    # A site removed and re-added while its run is still going is rescheduled when the run finishes
+                    if url not in self._running:
+                        self._schedule(url, now)
+                elif self.interval(previous) != self.interval(site_config) and url in self._scheduled:
+                    last_started = self._last_started.get(url, now)
+                    self._schedule(url, max(now, self._jittered(last_started + self.interval(site_config), self.interval(site_config))))
+            self.sites = sites
+            self._condition.notify()
+
+    def _pop_due(self, now: float) -> List[dict]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            run_at, _, url = heapq.heappop(self._heap)
+            if self._scheduled.get(url) != run_at or url not in self.sites:
+                # Superseded by a later trigger or reschedule, or no longer monitored
+                continue
+            host = site_host(self.sites[url])
+            host_free_at = self._host_free_at.get(host, 0)
+            if host_free_at > now:
+                self._schedule(url, host_free_at)
+                continue
+            del self._scheduled[url]
+            self._running.add(url)
+            self._last_started[url] = now
+            self._host_free_at[host] = now + self.host_spacing
+            due.append(self.sites[url])
+        return due
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    due = self._pop_due(time.time())
+                    if due:
+                        break
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+            for site_config in due:
+                started_at = time.time()
+                logging.info(f"Starting scheduled run for {site_config['entry_site']['url']}")
+                self.engine.submit(site_config).add_done_callback(
+                    lambda _, site_config=site_config, started_at=started_at: self._finished(site_config, started_at)
+                )
+
+    def _finished(self, site_config: dict, started_at: float):
+        url = site_config['entry_site']['url']
+        with self._condition:
+            self._running.discard(url)
+            # Follow config changes made while the site was running
+            site_config = self.sites.get(url)
+            if site_config is not None and url not in self._scheduled:
+                interval = self.interval(site_config)
+                # A run that overran its interval is followed by one run, not a backlog
+                self._schedule(url, max(self._jittered(started_at + interval, interval), time.time()))
+                logging.info(f"Next run for {url} at {time.ctime(self._scheduled[url])}")
+            idle = not self._running
+            self._condition.notify()
+        if idle and self.on_idle is not None:
+            self.on_idle()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def run_forever(self):
+        self.start()
+        while self._thread.is_alive():
+            self._thread.join(1)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
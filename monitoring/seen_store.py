@@ -0,0 +1,84 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Union
+from monitoring.state_store import StateStore
+
+
+class SeenEntryStore:
+    """Ids of entries a site monitor has already handled.
+
+    Membership checks are a dict lookup, so dedup stays constant-time however
+    long the history grows. Ids are kept in last-seen order, which lets
+    ``prune`` drop expired and surplus ids from the front; ``touch_many``
+    moves ids that are still listed to the back, so they are never dropped
+    while the posting is up. ``save`` only writes the ids added, touched or
+    dropped since the last save, and prunes first.
+    """
+
+    def __init__(self, state: StateStore, site: str, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.state = state
+        self.site = site
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._seen: OrderedDict = OrderedDict()
+        self._added = []
+        self._dropped = []
+
+    def __contains__(self, entry_id: str) -> bool:
+        return entry_id in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, entry_id: str, seen_at: Optional[float] = None):
+        if entry_id not in self._seen:
+            self._seen[entry_id] = seen_at if seen_at is not None else time.time()
+            self._added.append((entry_id, self._seen[entry_id]))
+
+    def add_many(self, entries: Iterable[Union[Dict, str]]):
+        now = time.time()
+        for entry in entries:
+            self.add(entry['id'] if isinstance(entry, dict) else entry, now)
+
+    def touch_many(self, entries: Iterable[Union[Dict, str]]):
+        """Mark already stored ids as seen now; unknown ids are left alone."""
+        now = time.time()
+        for entry in entries:
+            entry_id = entry['id'] if isinstance(entry, dict) else entry
+            if entry_id in self._seen:
+                self._seen[entry_id] = now
+                self._seen.move_to_end(entry_id)
+                self._added.append((entry_id, now))
+
+    def clear(self):
+        self._dropped.extend(self._seen)
+        self._seen.clear()
+        self._added = []
+
+    def prune(self):
+        if self.ttl_seconds is not None:
+            cutoff = time.time() - self.ttl_seconds
+            while self._seen and next(iter(self._seen.values())) < cutoff:
+                self._dropped.append(self._seen.popitem(last=False)[0])
+        if self.max_entries is not None:
+            while len(self._seen) > self.max_entries:
+                self._dropped.append(self._seen.popitem(last=False)[0])
+
+    def load(self) -> 'SeenEntryStore':
+        self.state.migrate_json(self.site)
+        self._seen = OrderedDict(self.state.load_seen(self.site))
+        self._added = []
+        # Pruning waits for save, after the current listing has been touched
+        return self
+
+    def save(self):
+        self.prune()
+        dropped = {entry_id for entry_id in self._dropped if entry_id not in self._seen}
+        # An id touched more than once is written once, with its latest time
+        added = [(entry_id, self._seen[entry_id]) for entry_id in dict.fromkeys(entry_id for entry_id, _ in self._added) if entry_id in self._seen]
+        if added:
+            self.state.add_seen(self.site, added)
+        if dropped:
+            self.state.remove_seen(self.site, dropped)
+        self._added = []
+        self._dropped = []
@@ -1,148 +1,353 @@
-import requests
 import time
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
+from urllib.parse import urlparse
+import hashlib
 import json
 import os
+import re
 import shutil
+from config.site_config import SiteConfig
+from monitoring.entry_pipeline import EntryPipeline
+from monitoring.fetcher import get_default_fetcher
+from monitoring.metrics import get_default_metrics
+from monitoring.seen_store import SeenEntryStore
+from monitoring.state_store import get_default_state_store
+from monitoring.web_parser import ID_SCHEME
+
+
+def site_key(url: str) -> str:
+    """Filesystem-safe, stable name for the per-site state of a monitored url."""
+    parsed = urlparse(url)
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', f"{parsed.netloc}{parsed.path}").strip('_')[:60]
+    return f"{slug}_{hashlib.blake2b(url.encode('utf-8'), digest_size=4).hexdigest()}"
+
 
 class SiteMonitor:
-    def __init__(self, config: dict, parser, email_sender, content_generator=None, pdf_generator=None, send_starting_entries: bool = False):
-        self.config = config
+    def __init__(self, config: dict, parser, email_sender, content_generator=None, pdf_generator=None, send_starting_entries: bool = False, fetcher=None, state=None, outbox=None, metrics=None):
+        # Validated and with compiled filters; configs from ConfigManager already are
+        self.config = config if isinstance(config, SiteConfig) else SiteConfig(config)
         self.parser = parser
+        self.fetcher = fetcher or get_default_fetcher()
+        self.state = state or get_default_state_store()
         self.content_generator = content_generator
         self.pdf_generator = pdf_generator
         self.email_sender = email_sender
+        self.outbox = outbox
+        self.metrics = metrics or get_default_metrics()
+        # Seconds spent per stage in the current run, summed over entries for concurrent stages
+        self.timings: Dict[str, float] = {}
+        self.site_key = site_key(config['entry_site']['url'])
+        self.digest_scope = config.get('content_digest', 'page')
+        self.skip_known = config.get('skip_known_entries', True)
         self.known_entries = self.load_known_entries()
         self.send_props = config.get('send_props', list(self.parser.selectors.keys()))
         logging.info(f"Loaded {len(self.known_entries)} known entries")
 
+        # Ids stored under an older id scheme never match freshly parsed ids
+        self.id_migration_pending = False
+        if self.state.get_meta(self.id_scheme_key()) != ID_SCHEME:
+            if len(self.known_entries):
+                self.id_migration_pending = True
+            else:
+                self.state.set_meta(self.id_scheme_key(), ID_SCHEME)
+
         self.send_starting_entries = config['send_starting_entries']
-        if not self.send_starting_entries:
-            # add current entries to known entries
-            self.known_entries = self.parser.parse_listings(self.fetch_page(self.config['entry_site']['url']))
-            self.known_entries.extend(self.known_entries)
-            self.save_known_entries()
+        if not self.send_starting_entries and self.state.get_meta(self.seeded_key()) is None:
+            self.seed_known_entries()
+
+    def load_known_entries(self) -> SeenEntryStore:
+        ttl_days = self.config.get('known_entries_ttl_days')
+        store = SeenEntryStore(
+            self.state,
+            self.site_key,
+            ttl_seconds=ttl_days * 86400 if ttl_days else None,
+            max_entries=self.config.get('known_entries_max')
+        )
+        return store.load()
+
+    def save_known_entries(self):
+        self.known_entries.save()
+
+    def id_scheme_key(self) -> str:
+        return f"id_scheme:{self.site_key}"
+
+    def seeded_key(self) -> str:
+        return f"seeded:{self.site_key}"
 
-    def load_known_entries(self) -> List[Dict]:
+    def seed_known_entries(self):
+        """Take the listing as already sent, once per site; monitors are built for every run."""
+        result = self.fetcher.fetch(self.config['entry_site']['url'], store=False)
+        if result.error:
+            # Tried again when the next monitor is built
+            return
+        self.known_entries.add_many(self.parser.parse_listings(result.text))
+        self.save_known_entries()
+        self.state.set_meta(self.seeded_key(), ID_SCHEME)
+
+    def migrate_entry_ids(self, current_entries: List[Dict]):
+        """Replace ids from an older id scheme with the ids of the current listing.
+
+        The old ids cannot be translated, so the entries on the page right now
+        are taken as already handled instead of being processed all over again.
+        """
+        logging.info(f"Re-keying {len(self.known_entries)} known entries to id scheme {ID_SCHEME}, "
+                     f"marking {len(current_entries)} current entries as known")
+        self.known_entries.clear()
+        self.known_entries.add_many(current_entries)
+        self.save_known_entries()
+        self.state.set_meta(self.id_scheme_key(), ID_SCHEME)
+        self.id_migration_pending = False
+
+    def page_digest_path(self) -> Path:
+        return Path('data') / 'page_digests' / f"{self.site_key}.txt"
+
+    def load_page_digest(self) -> Optional[str]:
         try:
-            with open('data/known_entries.json', 'r') as f:
-                return json.load(f)
+            return self.page_digest_path().read_text().strip()
         except FileNotFoundError:
-            Path('data').mkdir(exist_ok=True)
-            return []
+            return None
 
-    def save_known_entries(self):
-        with open('data/known_entries.json', 'w') as f:
-            json.dump([entry['id'] for entry in self.known_entries], f)
+    def save_page_digest(self, digest: str):
+        path = self.page_digest_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(digest)
+
+    def forget_page(self, url: str):
+        # Without cached validators the next run gets the full page instead of a 304
+        if self.fetcher.cache:
+            self.fetcher.cache.invalidate(url)
+
+    def page_digest(self, page_content: str, root=None) -> str:
+        # Include the settings that decide what a run produces, so editing a
+        # site config re-processes an otherwise unchanged page
+        settings = {key: self.config.get(key) for key in ('entry_site', 'include_filters', 'exclude_filters', 'process_entries')}
+        content_digest = self.parser.content_digest(page_content, self.digest_scope, root)
+        settings_digest = hashlib.blake2b(json.dumps(settings, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+        return f"{content_digest}-{settings_digest}"
 
     def fetch_page(self, url: str) -> str:
-        try:
-            logging.info(f"Fetching page {url}")
-            response = requests.get(
-                url,
-                headers={'User-Agent': 'Career Monitor Bot 1.0'}
-            )
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            logging.error(f"Error fetching page {url}: {e}")
-            return ""
+        return self.fetcher.fetch_page(url)
 
     def select_entries(self, current_entries: List[Dict]) -> List[Dict]:
 
-        skip_known = False
-        if skip_known:
-            new_entries = [
-            entry for entry in current_entries
-                if not any(known['id'] == entry['id'] for known in self.known_entries)
-            ]
+        if self.skip_known:
+            new_entries = [entry for entry in current_entries if entry['id'] not in self.known_entries]
         else:
             new_entries = current_entries
 
-        # Additional filters
-        include_filters = self.config.get('include_filters', {})
-        if include_filters:
-            filtered_entries = [
-                entry for entry in new_entries
-                if all(filter_value in entry.get(key, '') for key, filter_value in include_filters.items())
-            ]
-        else:
-            filtered_entries = new_entries
+        # Additional filters, one regex search per filtered field
+        return self.config.select(new_entries)
+
+    def load_stages(self, entries: List[Dict]) -> Dict[str, Tuple[str, object]]:
+        """Stages the given entries completed in earlier runs that did not finish."""
+        entry_ids = {entry['id'] for entry in entries}
+        stages = {}
+        for entry_id, (stage, payload) in self.state.load_stages(self.site_key).items():
+            if entry_id not in entry_ids:
+                continue
+            if stage == 'compiled' and not all(path and os.path.exists(path) for path in payload):
+                # The files are gone, so start the entry over; the letter cache still saves the LLM call
+                continue
+            stages[entry_id] = (stage, payload)
+        return stages
+
+    def checkpoint(self, entry: Dict, stage: str, payload):
+        self.state.save_stage(self.site_key, entry['id'], stage, payload)
 
-        exclude_filters = self.config.get('exclude_filters', {})
-        if exclude_filters:
-            filtered_entries = [
-                entry for entry in filtered_entries
-                if not any(filter_value in entry.get(key, '') for key, filter_value in exclude_filters.items())
-            ]
+    def prune_stages(self, current_entries: List[Dict]):
+        # Known entries are done, and entries gone from the page will not be resumed
+        current_ids = {entry['id'] for entry in current_entries}
+        self.state.remove_stages(self.site_key, [
+            entry_id for entry_id in self.state.load_stages(self.site_key)
+            if entry_id in self.known_entries or entry_id not in current_ids
+        ])
 
-        return filtered_entries
+    def stage(self, name: str):
+        return self.metrics.stage(self.config['entry_site']['url'], name, self.timings)
 
-    def process_new_entries(self, new_entries: List[Dict]):
-        generated_entries = []
-        for entry in new_entries:
+    def timed(self, name: str, function):
+        def run_timed(*args):
+            with self.stage(name):
+                return function(*args)
+        return run_timed
+
+    def timed_batch(self, generate_batch):
+        # Spans cannot follow an async generator across the event loop, so the batch is only timed
+        async def run_timed(jobs):
+            start = time.perf_counter()
             try:
-                # Fetch full job description
-                job_description = self.parser.parse_job_description(
-                    self.fetch_page(entry['url'])
-                )
+                async for item in generate_batch(jobs):
+                    yield item
+            finally:
+                self.metrics.add_stage_time(self.config['entry_site']['url'], 'llm', time.perf_counter() - start, self.timings)
+        return run_timed
+
+    def process_new_entries(self, new_entries: List[Dict], stages: Optional[Dict[str, Tuple[str, object]]] = None):
+        generate_batch = None
+        if self.config.get('llm_batch') and self.content_generator.cover_letter_mode == 'AI':
+            generate_batch = self.timed_batch(self.content_generator.generate_cover_letters_batch)
 
-                # Generate cover letter content
-                latex_content = self.content_generator.generate_cover_letter(entry, job_description)
+        pipeline = EntryPipeline(
+            fetcher=self.fetcher,
+            parse_description=self.timed('parse', self.parser.parse_job_description),
+            generate=self.timed('llm', self.content_generator.generate_cover_letter),
+            compile=self.timed('compile', self.compile_cover_letter),
+            cached_page=self.parser.cached_sub_page,
+            fetch_concurrency=self.config.get('fetch_concurrency', 8),
+            llm_concurrency=self.config.get('llm_concurrency', 4),
+            compile_concurrency=self.config.get('compile_concurrency', 2),
+            generate_batch=generate_batch,
+            batch_min_size=self.config.get('llm_batch_min_size', 5),
+            checkpoint=self.checkpoint,
+            resume=stages
+        )
+        return pipeline.run(new_entries)
 
-                # Create PDF
-                latex_content = self.pdf_generator.make_latex_compilable(latex_content)
-                pdf_path, latex_output_path = self.pdf_generator.compile_pdf(latex_content, entry)
-                generated_entries.append((entry, [pdf_path, latex_output_path]))
+    def notify(self, notifications: List[Tuple[Dict, List[str]]]) -> List[Dict]:
+        """Hand notifications to the outbox, or send them inline without one.
 
-            except Exception as e:
-                logging.error(f"Error processing entry {entry['title']}: {e}")
+        Returns the entries that could not be sent; queued ones never count.
+        """
+        if self.outbox is None:
+            return self.email_sender.send_emails(notifications, send_props=self.send_props)
+        if notifications:
+            self.outbox.enqueue(self.site_key, notifications, self.send_props)
+        return []
 
-        return generated_entries
+    def compile_cover_letter(self, entry: Dict, latex_content: str):
+        latex_content = self.pdf_generator.make_latex_compilable(latex_content)
+        return self.pdf_generator.compile_pdf(latex_content, entry, method=self.config.get('pdf_renderer', 'latex'))
+
+    def run(self) -> Dict:
+        started_at = time.time()
+        self.timings = {}
+        with self.metrics.span('sitemonitor.run', site=self.config['entry_site']['url']):
+            summary = self._run()
+        summary['timings'] = {stage: round(seconds, 3) for stage, seconds in self.timings.items()}
+        logging.info(f"Stage timings for {summary['url']}: {summary['timings']}")
+        self.metrics.record_run(summary['url'], summary, time.time() - started_at)
+        try:
+            self.state.record_run(self.site_key, started_at, summary)
+        except Exception as e:
+            logging.error(f"Error recording run for {summary['url']}: {e}")
+        return summary
 
-    def run(self):
-        logging.info(f"Starting site monitor for {self.config['entry_site']['url']}")
+    def _run(self) -> Dict:
+        url = self.config['entry_site']['url']
+        logging.info(f"Starting site monitor for {url}")
+        summary = {'url': url, 'status': 'empty', 'entries_found': 0, 'entries_selected': 0, 'entries_generated': 0}
 
         try:
-            logging.info(f"Fetching page {self.config['entry_site']['url']}")
-            page_content = self.fetch_page(self.config['entry_site']['url'])
+            logging.info(f"Fetching page {url}")
+            with self.stage('fetch'):
+                # Validators are stored once the run's results are saved, like the page digest
+                result = self.fetcher.fetch(url, store=False)
+            if result.error:
+                # Not the same as an empty listing: nothing is marked as seen and the page is retried next run
+                summary['status'] = 'error'
+                summary['error'] = result.error
+                return summary
+            # A run that died before finishing left its validators cached; its checkpointed entries still need resuming
+            unfinished = bool(self.state.load_stages(self.site_key))
+            if result.not_modified and not self.id_migration_pending and not unfinished:
+                logging.info(f"Entry page unchanged since last run, skipping {url}")
+                summary['status'] = 'not_modified'
+                return summary
+
+            page_content = result.text
+            digest = root = None
+            if page_content and self.digest_scope != 'off' and not self.id_migration_pending:
+                if self.digest_scope == 'entries':
+                    # Parsed once, for the digest and then for the listings
+                    with self.stage('parse'):
+                        root = self.parser.parse_entry_region(page_content)
+                digest = self.page_digest(page_content, root)
+                if digest == self.load_page_digest() and not unfinished:
+                    logging.info(f"Entry page content unchanged since last run, skipping {url}")
+                    self.fetcher.store_result(result)
+                    summary['status'] = 'unchanged'
+                    return summary
+
             if page_content:
-                current_entries = self.parser.parse_listings(page_content)
-                logging.info(f"Found {len(current_entries)} entries on {self.config['entry_site']['url']}")
+                with self.stage('parse'):
+                    current_entries = self.parser.parse_listings(page_content, root=root)
+                logging.info(f"Found {len(current_entries)} entries on {url}")
+                summary['entries_found'] = len(current_entries)
+                if self.id_migration_pending:
+                    self.migrate_entry_ids(current_entries)
 
-                selected_entries = self.select_entries(current_entries)
+                with self.stage('filter'):
+                    selected_entries = self.select_entries(current_entries)
                 logging.info(f"Found {len(selected_entries)} relevant entries")
 
                 if self.config['debug']['stop_after_one'] and selected_entries:
                     logging.info(f"Debug mode: stopping after one entry")
                     selected_entries = selected_entries[:1]
+                summary['entries_selected'] = len(selected_entries)
+
+                # Entries an interrupted run already took part of the way resume from their last stage
+                stages = self.load_stages(selected_entries)
+                if stages:
+                    logging.info(f"Resuming {len(stages)} entries from an earlier run")
+                    summary['entries_resumed'] = len(stages)
+                pending_entries = [entry for entry in selected_entries if stages.get(entry['id'], (None,))[0] != 'emailed']
 
                 generated_entries = []
+                unprocessed_entries = []
                 # Process entries config loop todo
                 if 'pdf' in self.config['process_entries'] or 'tex' in self.config['process_entries']:
-                    generated_entries = self.process_new_entries(selected_entries)
+                    self.content_generator.reset_usage()
+                    generated_entries = self.process_new_entries(pending_entries, stages)
+                    summary['llm_usage'] = self.content_generator.usage()
+                    logging.info(f"LLM usage for {url}: {summary['llm_usage']}")
+                    # Entries whose detail page, letter or PDF failed are not sent, and are retried next run
+                    generated_ids = {entry['id'] for entry, _ in generated_entries}
+                    unprocessed_entries = [entry for entry in pending_entries if entry['id'] not in generated_ids]
+                    summary['entries_failed'] = len(unprocessed_entries)
+                summary['entries_generated'] = len(generated_entries)
 
                 if generated_entries:
-                    self.email_sender.send_emails(generated_entries, send_props=self.send_props)
-                    if self.config['to_disk'] and generated_entries:
+                    # Copy before the sender removes the attachments
+                    if self.config['to_disk']:
+                        artifacts = []
                         for entry, file_paths in generated_entries:
                             entry_dir = os.path.join('data', entry['id'])
                             os.makedirs(entry_dir, exist_ok=True)
-                            entry_file_path = os.path.join(entry_dir, 'entry.json')
-                            with open(entry_file_path, 'w') as entry_file:
-                                json.dump(entry, entry_file, indent=4)
                             for file_path in file_paths:
                                 if file_path and os.path.exists(file_path):
-                                    shutil.copy(file_path, entry_dir)
-                else:
-                    generated_entries = [(entry, []) for entry in selected_entries]
-                    self.email_sender.send_emails(generated_entries, send_props=self.send_props)
+                                    artifacts.append((entry['id'], shutil.copy(file_path, entry_dir)))
+                        self.state.save_entries(self.site_key, [entry for entry, _ in generated_entries])
+                        self.state.save_artifacts(self.site_key, artifacts)
+                elif not unprocessed_entries:
+                    generated_entries = [(entry, []) for entry in pending_entries]
+                with self.stage('email'):
+                    failed_entries = self.notify(generated_entries)
+                summary['emails_failed'] = len(failed_entries)
 
-                self.known_entries.extend(selected_entries)
+                # Entries whose notification could not be sent are picked up again next run
+                failed_entries = failed_entries + unprocessed_entries
+                failed_ids = {entry['id'] for entry in failed_entries}
+                self.state.save_stages(self.site_key, [entry['id'] for entry, _ in generated_entries if entry['id'] not in failed_ids], 'emailed')
+                # Postings still listed stay known however long they have been up
+                self.known_entries.touch_many(current_entries)
+                self.known_entries.add_many([entry for entry in selected_entries if entry['id'] not in failed_ids])
                 self.save_known_entries()
+                self.prune_stages(current_entries)
+                if failed_entries:
+                    # Keep the page from being skipped as unchanged, or the failed entries would wait for the next edit
+                    self.forget_page(url)
+                else:
+                    if digest:
+                        self.save_page_digest(digest)
+                    self.fetcher.store_result(result)
+                summary['status'] = 'processed'
 
         except Exception as e:
             logging.error(f"Error in site monitor: {e}")
-            time.sleep(60)
+            summary['status'] = 'error'
+            # The next run must not get a 304 for a page it never finished
+            self.forget_page(url)
+
+        return summary
@@ -0,0 +1,306 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_entries (
+    site TEXT NOT NULL,
+    entry_id TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (site, entry_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS seen_entries_age ON seen_entries (site, seen_at);
+CREATE TABLE IF NOT EXISTS entries (
+    site TEXT NOT NULL,
+    entry_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (site, entry_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_site ON runs (site, started_at);
+CREATE TABLE IF NOT EXISTS artifacts (
+    site TEXT NOT NULL,
+    entry_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (site, entry_id, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    file_paths TEXT NOT NULL,
+    send_props TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS entry_stages (
+    site TEXT NOT NULL,
+    entry_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    payload TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (site, entry_id)
+) WITHOUT ROWID;
+"""
+
+
+class StateStore:
+    """SQLite state shared by all site monitors.
+
+    The database runs in WAL mode so monitors in other threads and processes
+    can read while one of them writes. Every write only touches the rows a
+    run adds, never the whole history.
+    """
+
+    def __init__(self, path: str = 'data/state.db'):
+        self.path = Path(path).resolve()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that opened them
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def load_seen(self, site: str) -> List[Tuple[str, float]]:
+        return self._connection().execute(
+            'SELECT entry_id, seen_at FROM seen_entries WHERE site = ? ORDER BY seen_at',
+            (site,)
+        ).fetchall()
+
+    def add_seen(self, site: str, seen: Iterable[Tuple[str, float]]):
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO seen_entries (site, entry_id, seen_at) VALUES (?, ?, ?)',
+                ((site, entry_id, seen_at) for entry_id, seen_at in seen)
+            )
+
+    def remove_seen(self, site: str, entry_ids: Iterable[str]):
+        with self.transaction() as conn:
+            conn.executemany(
+                'DELETE FROM seen_entries WHERE site = ? AND entry_id = ?',
+                ((site, entry_id) for entry_id in entry_ids)
+            )
+
+    def save_entries(self, site: str, entries: Iterable[Dict]):
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO entries (site, entry_id, payload, updated_at) VALUES (?, ?, ?, ?)',
+                ((site, entry['id'], json.dumps(entry), now) for entry in entries)
+            )
+
+    def load_entry(self, site: str, entry_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            'SELECT payload FROM entries WHERE site = ? AND entry_id = ?',
+            (site, entry_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_artifacts(self, site: str, artifacts: Iterable[Tuple[str, str]]):
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO artifacts (site, entry_id, path, created_at) VALUES (?, ?, ?, ?)',
+                ((site, entry_id, path, now) for entry_id, path in artifacts)
+            )
+
+    def load_artifacts(self, site: str, entry_id: str) -> List[str]:
+        rows = self._connection().execute(
+            'SELECT path FROM artifacts WHERE site = ? AND entry_id = ? ORDER BY created_at',
+            (site, entry_id)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def save_stage(self, site: str, entry_id: str, stage: str, payload=None):
+        with self.transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entry_stages (site, entry_id, stage, payload, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (site, entry_id, stage, json.dumps(payload), time.time())
+            )
+
+    def save_stages(self, site: str, entry_ids: Iterable[str], stage: str):
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO entry_stages (site, entry_id, stage, payload, updated_at) VALUES (?, ?, ?, NULL, ?)',
+                ((site, entry_id, stage, now) for entry_id in entry_ids)
+            )
+
+    def load_stages(self, site: str) -> Dict[str, Tuple[str, object]]:
+        rows = self._connection().execute(
+            'SELECT entry_id, stage, payload FROM entry_stages WHERE site = ?', (site,)
+        ).fetchall()
+        return {entry_id: (stage, json.loads(payload) if payload is not None else None) for entry_id, stage, payload in rows}
+
+    def remove_stages(self, site: str, entry_ids: Iterable[str]):
+        with self.transaction() as conn:
+            conn.executemany(
+                'DELETE FROM entry_stages WHERE site = ? AND entry_id = ?',
+                ((site, entry_id) for entry_id in entry_ids)
+            )
+
+    def record_run(self, site: str, started_at: float, summary: Dict):
+        with self.transaction() as conn:
+            conn.execute(
+                'INSERT INTO runs (site, started_at, finished_at, status, summary) VALUES (?, ?, ?, ?, ?)',
+                (site, started_at, time.time(), summary.get('status', ''), json.dumps(summary))
+            )
+
+    def recent_runs(self, site: str, limit: int = 10) -> List[Dict]:
+        rows = self._connection().execute(
+            'SELECT summary FROM runs WHERE site = ? ORDER BY id DESC LIMIT ?',
+            (site, limit)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def last_run_at(self, site: str) -> Optional[float]:
+        row = self._connection().execute('SELECT MAX(started_at) FROM runs WHERE site = ?', (site,)).fetchone()
+        return row[0]
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._connection().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self.transaction() as conn:
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def enqueue_notifications(self, site: str, notifications: Iterable[Tuple[Dict, List[str]]], send_props: List[str]):
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO outbox (site, entry, file_paths, send_props, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?, ?)',
+                ((site, json.dumps(entry), json.dumps(file_paths), json.dumps(send_props), now, now) for entry, file_paths in notifications)
+            )
+
+    def due_notifications(self, now: float, limit: int = 100, retries_only: bool = False) -> List[Dict]:
+        rows = self._connection().execute(
+            "SELECT id, site, entry, file_paths, send_props, attempts FROM outbox "
+            "WHERE status = 'pending' AND next_attempt_at <= ? AND attempts >= ? ORDER BY id LIMIT ?",
+            (now, 1 if retries_only else 0, limit)
+        ).fetchall()
+        return [
+            {'id': row[0], 'site': row[1], 'entry': json.loads(row[2]), 'file_paths': json.loads(row[3]), 'send_props': json.loads(row[4]), 'attempts': row[5]}
+            for row in rows
+        ]
+
+    def pending_notification_count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def remove_notifications(self, notification_ids: Iterable[int]):
+        with self.transaction() as conn:
+            conn.executemany('DELETE FROM outbox WHERE id = ?', ((notification_id,) for notification_id in notification_ids))
+
+    def retry_notification(self, notification_id: int, error: str, next_attempt_at: Optional[float]):
+        """Record a failed delivery; without ``next_attempt_at`` the notification is given up on."""
+        with self.transaction() as conn:
+            conn.execute(
+                'UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = COALESCE(?, next_attempt_at), status = ? WHERE id = ?',
+                (error, next_attempt_at, 'pending' if next_attempt_at is not None else 'failed', notification_id)
+            )
+
+    def migrate_json(self, site: str, data_dir: str = 'data'):
+        """Import a site's JSON state from earlier versions, once per site.
+
+        Seeds the site with its data/known_entries/<site>.json ids, or else the
+        shared data/known_entries.json list, and imports data/<id>/entry.json
+        payloads for the ids it knows. The shared list is from the single-site
+        days and goes to the first site migrated only; sites added later
+        start empty instead of inheriting its ids.
+        """
+        marker = f"json_migrated:{site}"
+        legacy_marker = 'json_migrated:known_entries.json'
+        if self.get_meta(marker):
+            return
+
+        data_dir = Path(data_dir)
+        now = time.time()
+        seen = []
+        markers = [marker]
+        site_path = data_dir / 'known_entries' / f"{site}.json"
+        legacy_path = data_dir / 'known_entries.json'
+        try:
+            if site_path.exists():
+                with open(site_path, 'r') as f:
+                    seen = [(entry_id, seen_at) for entry_id, seen_at in json.load(f)]
+            elif legacy_path.exists() and not self.get_meta(legacy_marker):
+                with open(legacy_path, 'r') as f:
+                    seen = [(entry_id, now) for entry_id in json.load(f)]
+                markers.append(legacy_marker)
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read known entries to migrate for {site}: {e}")
+
+        entries = []
+        for entry_id, _ in seen:
+            entry_path = data_dir / entry_id / 'entry.json'
+            if entry_path.exists():
+                try:
+                    with open(entry_path, 'r') as f:
+                        entries.append(json.load(f))
+                except (OSError, ValueError) as e:
+                    logging.warning(f"Skipping unreadable {entry_path}: {e}")
+
+        with self.transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO seen_entries (site, entry_id, seen_at) VALUES (?, ?, ?)',
+                ((site, entry_id, seen_at) for entry_id, seen_at in seen)
+            )
+            conn.executemany(
+                'INSERT OR IGNORE INTO entries (site, entry_id, payload, updated_at) VALUES (?, ?, ?, ?)',
+                ((site, entry['id'], json.dumps(entry), now) for entry in entries if 'id' in entry)
+            )
+            conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', ((key, str(now)) for key in markers))
+        if seen:
+            logging.info(f"Migrated {len(seen)} known entries and {len(entries)} entry files for {site}")
+
+
+_default_state_store = None
+_default_state_store_lock = threading.Lock()
+
+
+def get_default_state_store() -> StateStore:
+    global _default_state_store
+    with _default_state_store_lock:
+        if _default_state_store is None:
+            _default_state_store = StateStore()
+        return _default_state_store
@@ -1,15 +1,52 @@
 from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime
+import hashlib
+import json
 import logging
+import re
 from copy import deepcopy
-import requests
+from monitoring.fetcher import get_default_fetcher
+from monitoring.parser_backends import create_backend
+
+# Markup that changes between requests without the listings changing
+VOLATILE_MARKUP = re.compile(r'<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->', re.DOTALL | re.IGNORECASE)
+WHITESPACE = re.compile(r'\s+')
+
+# Bump when entry_id changes how ids are derived, so stored ids get migrated
+ID_SCHEME = 'blake2b-v2'
 
 class WebPageParser:
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, fetcher=None):
+        self.fetcher = fetcher or get_default_fetcher()
         self.links = config['entry_site']['links']
         self.entry_selector = config['entry_site']['entry_selector']
         self.selectors = config['entry_site']['selectors']
+        # Fields that identify an entry; defaults to every field taken from the listing page
+        self.id_fields = config['entry_site'].get('id_fields')
+
+        # Compile every selector once; a bad selector fails here instead of on every run
+        self.backend = create_backend(config.get('parser_backend', 'html.parser'))
+        self._entry_selector = self.backend.compile(self.entry_selector)
+        self._field_selectors = {
+            key: self.backend.compile(selector['selector'] if isinstance(selector, dict) else selector)
+            for key, selector in self.selectors.items()
+        }
+        self.link_key, link_selector = next(iter(self.links.items()))
+        self._link_selector = self.backend.compile(link_selector) if link_selector != self.entry_selector else None
+        self._description_selector = self.backend.compile('.entry-content')
+        self._sub_page_keys = [key for key, selector in self.selectors.items() if isinstance(selector, dict)]
+        # Sub-pages fetched by the last parse_listings call, keyed by url
+        self.sub_pages = {}
+
+        # parse_scope 'entries' only builds the tree for the regions entry_selector can match
+        self.region_filter = None
+        if config.get('parse_scope') == 'entries' and self.backend.scoped_parsing:
+            # Imported here so lxml is only loaded for scoped parsing
+            from monitoring.region_filter import RegionFilter
+            self.region_filter = RegionFilter.from_selector(self.entry_selector)
+            if self.region_filter is None:
+                logging.warning(f"Cannot scope parsing to entry selector {self.entry_selector}, parsing whole pages")
 
     def parse_listings_old(self, page_content: str) -> List[Dict]:
         entries = []
@@ -39,11 +76,42 @@ class WebPageParser:
             
         return entries
 
+    def parse_entry_region(self, page_content: str):
+        if self.region_filter:
+            return self.backend.adopt(self.region_filter.extract(page_content))
+        return self.backend.parse(page_content)
+
+    def entry_id(self, entry_values: Dict) -> str:
+        """Content-addressed id that is the same in every process and deploy."""
+        # Sub-page values change when a detail page fails or is edited, which would re-process the posting
+        fields = self.id_fields or [key for key in entry_values if key not in self._sub_page_keys]
+        components = [[key, WHITESPACE.sub(' ', str(entry_values.get(key, ''))).strip()] for key in fields]
+        payload = json.dumps(components, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=10).hexdigest()
+
+    def content_digest(self, page_content: str, scope: str = 'page', root=None) -> str:
+        """Digest of the listing content, ignoring whitespace, scripts and comments.
+
+        Scope 'page' hashes the page text without parsing it. With scope
+        'entries' only the elements matched by entry_selector count, so
+        banners and other page chrome can change without a re-process, at the
+        cost of a parse; pass the tree on to ``parse_listings`` as ``root``.
+        """
+        if scope == 'entries':
+            if root is None:
+                root = self.parse_entry_region(page_content)
+            content = "\n".join(self.backend.markup(element) for element in self.backend.select(root, self._entry_selector))
+        else:
+            content = page_content
+        content = VOLATILE_MARKUP.sub('', content)
+        content = WHITESPACE.sub(' ', content).strip()
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
     def parse_job_description(self, page_content: str) -> str:
         try:
-            soup = BeautifulSoup(page_content, 'html.parser')
-            description = soup.select_one('.entry-content')
-            return description.text.strip() if description else ""
+            root = self.backend.parse(page_content)
+            description = self.backend.select_one(root, self._description_selector)
+            return self.backend.raw_text(description).strip() if description is not None else ""
         except Exception as e:
             logging.error(f"Error parsing job description: {e}")
             return ""
@@ -51,22 +119,23 @@ class WebPageParser:
     def parse_job_listings_from_config(self, page_content: str) -> List[Dict]:
         entries = []
         try:
-            soup = BeautifulSoup(page_content, 'html.parser')
-            job_listings = soup.select(self.entry_selector)
+            backend = self.backend
+            root = backend.parse(page_content)
+            job_listings = backend.select(root, self._entry_selector)
 
             for job in job_listings:
-                title_element = job.select_one(self.selectors['title'])
-                location_element = job.select_one(self.selectors['location'])
-                age_element = job.select_one(self.selectors['age'])
-                url_element = job.get('href')
+                title_element = backend.select_one(job, self._field_selectors['title'])
+                location_element = backend.select_one(job, self._field_selectors['location'])
+                age_element = backend.select_one(job, self._field_selectors['age'])
+                url_element = backend.attr(job, 'href')
 
                 entry = {
-                    'title': title_element.text.strip() if title_element else '',
-                    'location': location_element.text.strip() if location_element else '',
+                    'title': backend.raw_text(title_element).strip() if title_element is not None else '',
+                    'location': backend.raw_text(location_element).strip() if location_element is not None else '',
                     'url': url_element if url_element else '',
-                    'id': f"{title_element.text.strip()}_{location_element.text.strip()}_{age_element.text}",
+                    'id': f"{backend.raw_text(title_element).strip()}_{backend.raw_text(location_element).strip()}_{backend.raw_text(age_element)}",
                     'timestamp': datetime.now().isoformat(),
-                    'age': age_element.text if age_element else ''
+                    'age': backend.raw_text(age_element) if age_element is not None else ''
                 }
                 entries.append(entry)
                 
@@ -76,52 +145,57 @@ class WebPageParser:
         return entries
 
     def fetch_page(self, url: str) -> str:
-        try:
-            logging.info(f"Fetching page {url}")
-            response = requests.get(
-                url,
-                headers={'User-Agent': 'Career Monitor Bot 1.0'}
-            )
-            response.raise_for_status()
-            return response.text
-        except requests.RequestException as e:
-            logging.error(f"Error fetching page {url}: {e}")
-            return ""
-
-    def parse_listings(self, page_content: str) -> List[Dict]:
+        return self.fetcher.fetch_page(url)
+
+    def cached_sub_page(self, url: str) -> Optional[str]:
+        # fetch_pages maps failed fetches to "", which must not count as a cached page
+        return self.sub_pages.get(url) or None
+
+    def parse_sub_pages(self, urls: List[str]) -> Dict[str, Dict[str, str]]:
+        """Fetch each unique sub-page once, concurrently, and apply every dict selector to it."""
+        self.sub_pages = self.fetcher.fetch_pages(urls) if urls else {}
+        sub_values = {}
+        for url, sub_page_content in self.sub_pages.items():
+            sub_root = self.backend.parse(sub_page_content)
+            values = {}
+            for key in self._sub_page_keys:
+                element = self.backend.select_one(sub_root, self._field_selectors[key])
+                values[key] = self.backend.text(element) if element is not None else ''
+            sub_values[url] = values
+        return sub_values
+
+    def parse_listings(self, page_content: str, root=None) -> List[Dict]:
+        """Entries on a listing page; ``root`` is the page's tree from parse_entry_region, if already built."""
         entries = []
         try:
-            soup = BeautifulSoup(page_content, 'html.parser')
-            entry_listings = soup.select(self.entry_selector)
+            backend = self.backend
+            if root is None:
+                root = self.parse_entry_region(page_content)
+            entry_listings = backend.select(root, self._entry_selector)
+
+            sub_values = {}
+            if self._sub_page_keys:
+                sub_values = self.parse_sub_pages([backend.attr(entry, 'href') for entry in entry_listings if backend.attr(entry, 'href') is not None])
 
             for entry in entry_listings:
                 entry_values = {}
+                href = backend.attr(entry, 'href')
                 for key, selector in self.selectors.items():
                     if isinstance(selector, dict):
+                        if href is not None:
+                            entry_values[key] = sub_values.get(href, {}).get(key, '')
+                            continue
                         element = entry
-                        if element and element.has_attr('href'):
-                            sub_page_content = self.fetch_page(element['href'])
-                            sub_soup = BeautifulSoup(sub_page_content, 'html.parser')
-                            element = sub_soup.select_one(selector['selector'])
-
-                        else:
-                            logging.warning(f"No <a> tag with href found for selector: {selector['url']}")
+                        logging.warning(f"No <a> tag with href found for selector: {selector['url']}")
                     else:
-                        element = entry.select_one(selector)
+                        element = backend.select_one(entry, self._field_selectors[key])
                         
-                    entry_values[key] = element.get_text(strip=True) if element else ''
+                    entry_values[key] = backend.text(element) if element is not None else ''
 
                 # Get links
-                key, selector = next(iter(self.links.items()))
-                link_element = entry.select_one(selector) if selector != self.entry_selector else entry
-                entry_values[key] = link_element.get('href') if link_element and link_element.get('href') else ''
-                # Construct the id as a number using a hash of available keys
-                id_components = []
-                for key, element in entry_values.items():
-                    if element:
-                        id_components.append(element)
-                        
-                entry_values['id'] = str(abs(hash("_".join(id_components))) % (10 ** 8))  # Limiting the hash to 8 digits
+                link_element = backend.select_one(entry, self._link_selector) if self._link_selector else entry
+                entry_values[self.link_key] = backend.attr(link_element, 'href') if link_element is not None and backend.attr(link_element, 'href') else ''
+                entry_values['id'] = self.entry_id(entry_values)
 
                 #title_element = entry.select_one(self.selectors['title'])
                 #deadline_element = entry.select_one(self.selectors['deadline'])
@@ -0,0 +1,57 @@
+import socket
+from email import message_from_bytes
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+
+class LocalSmtpServer:
+    """aiosmtpd stand-in for the mail provider, with plain-text AUTH.
+
+    ``replies`` is a list of SMTP replies for the next DATA commands, e.g.
+    ['451 Try again later', None]; None and an empty list accept the message.
+    Counts connections and logins and keeps the accepted messages.
+    """
+
+    def __init__(self, replies=None):
+        self.replies = list(replies or [])
+        self.connections = 0
+        self.messages = []
+        self.logins = 0
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        self.controller = Controller(
+            self, hostname='127.0.0.1', port=self.port,
+            auth_require_tls=False, authenticator=self.authenticate
+        )
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        self.logins += 1
+        return AuthResult(success=True)
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        reply = self.replies.pop(0) if self.replies else None
+        if reply:
+            return reply
+        self.messages.append(message_from_bytes(envelope.original_content))
+        return '250 Message accepted for delivery'
+
+    def email_config(self, **overrides):
+        config = {
+            'sender': 'monitor@example.com', 'recipient': 'me@example.com', 'smtp_url': '127.0.0.1',
+            'app_password': 'secret', 'smtp_security': 'none', 'smtp_port': self.port, 'retry_delay': 0,
+        }
+        config.update(overrides)
+        return config
+
+    def __enter__(self):
+        self.controller.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.controller.stop()
@@ -0,0 +1,39 @@
+import os
+from generators.content_generator import ContentGenerator
+from generators.fake_anthropic import FakeAnthropic
+
+PROFILE = {
+    'name': 'Jane Doe', 'skills': ['Python'], 'background': ['Data'], 'experience': 'Acme',
+    'achievements': 'Shipped things', 'personal_traits': ['Curious'], 'interests': ['Hiking'],
+}
+
+
+def test_static_prompt_prefix_is_cached_across_jobs():
+    client = FakeAnthropic()
+    generator = ContentGenerator('key', PROFILE, 'templates/cover_letter_template.tex', cover_letter_mode='AI', client=client)
+
+    generator.generate_cover_letter({'title': 'Job 1'}, 'Backend developer in Lund')
+    generator.generate_cover_letter({'title': 'Job 2'}, 'Data engineer in Malmö')
+
+    prefix, variable = client.messages.calls[1]['messages'][0]['content']
+    assert prefix['cache_control'] == {'type': 'ephemeral'}
+    assert 'Jane Doe' in prefix['text'] and 'Data engineer' not in prefix['text']
+    assert variable['text'].startswith('Data engineer in Malmö')
+    assert prefix['text'] + variable['text'] == generator.build_prompt('Data engineer in Malmö')
+
+    usage = generator.usage()
+    assert usage['requests'] == 2
+    assert usage['cache_hits'] == 1
+    assert usage['cache_read_input_tokens'] == usage['cache_creation_input_tokens'] > 0
+
+
+def test_templates_are_reloaded_when_changed(tmp_path):
+    template = tmp_path / 'default.tex'
+    template.write_text('first version')
+    generator = ContentGenerator('key', PROFILE, str(template), client=FakeAnthropic())
+    assert generator.generate_cover_letter({}, '') == 'first version'
+
+    template.write_text('second version')
+    stat = template.stat()
+    os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert generator.generate_cover_letter({}, '') == 'second version'
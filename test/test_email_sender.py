@@ -0,0 +1,79 @@
+import pytest
+
+pytest.importorskip('aiosmtpd')
+
+from test.local_smtp import LocalSmtpServer
+from utils.email_sender import EmailSender
+
+
+def make_entries(tmp_path, count):
+    entries = []
+    for i in range(count):
+        pdf = tmp_path / f"Cover_Letter_{i}.pdf"
+        pdf.write_bytes(b'%PDF-1.4 letter')
+        entries.append(({'id': f"e{i}", 'title': f"Job {i}"}, [str(pdf)]))
+    return entries
+
+
+def test_batch_shares_one_connection_and_isolates_failures(tmp_path):
+    # The first message gets a temporary failure, the third a permanent one
+    with LocalSmtpServer(replies=['451 Try again later', None, None, '550 Mailbox unavailable']) as server:
+        sender = EmailSender(server.email_config())
+        entries = make_entries(tmp_path, 4)
+        failed = sender.send_emails(entries, send_props=['title'])
+
+    assert [entry['id'] for entry in failed] == ['e2']
+    assert server.connections == 1
+    assert server.logins == 1
+    assert [message['Subject'] for message in server.messages] == ['New entry: e0', 'New entry: e1', 'New entry: e3']
+    # Files are only removed once their email is out
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['Cover_Letter_2.pdf']
+
+
+def test_dropped_connection_is_reopened(tmp_path):
+    with LocalSmtpServer(replies=['421 Service closing']) as server:
+        failed = EmailSender(server.email_config()).send_emails(make_entries(tmp_path, 2), send_props=['title'])
+
+    assert failed == []
+    assert server.connections == 2
+    assert len(server.messages) == 2
+
+
+def test_digest_sends_one_email_with_every_attachment(tmp_path):
+    with LocalSmtpServer() as server:
+        failed = EmailSender(server.email_config(digest=True)).send_emails(make_entries(tmp_path, 3), send_props=['title'])
+
+    assert failed == []
+    [message] = server.messages
+    assert message['Subject'] == '3 new entries'
+    assert [part.get_filename() for part in message.walk() if part.get_filename()] == [f"Cover_Letter_{i}.pdf" for i in range(3)]
+
+
+def test_attachments_are_streamed_with_their_content_types(tmp_path):
+    import tracemalloc
+    from utils.streaming_message import StreamingMessage
+
+    pdf = tmp_path / 'Cover_Letter.pdf'
+    pdf.write_bytes(bytes(range(256)) * 40_000)
+    tex = tmp_path / 'Cover_Letter.tex'
+    tex.write_text('\\documentclass{article}')
+
+    # A 10 MB attachment never needs more than a couple of chunks in memory
+    message = StreamingMessage('a@example.com', 'b@example.com', 'Large', 'Body', [str(pdf)])
+    tracemalloc.start()
+    size = sum(len(chunk) for chunk in message.iter_bytes())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert size > 13_000_000
+    assert peak < 1_000_000
+
+    with LocalSmtpServer() as server:
+        failed = EmailSender(server.email_config()).send_emails([({'id': 'e1', 'title': 'Jobb i Malmö'}, [str(pdf), str(tex)])], send_props=['title'])
+
+    assert failed == []
+    parts = {part.get_filename(): part for part in server.messages[0].walk() if part.get_filename()}
+    assert parts['Cover_Letter.pdf'].get_content_type() == 'application/pdf'
+    assert parts['Cover_Letter.pdf'].get_payload(decode=True) == bytes(range(256)) * 40_000
+    assert parts['Cover_Letter.tex'].get_content_type() == 'text/x-tex'
+    body = server.messages[0].get_payload()[0]
+    assert 'Title: Jobb i Malmö' in body.get_payload(decode=True).decode('utf-8')
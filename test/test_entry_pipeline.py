@@ -0,0 +1,95 @@
+import time
+from monitoring.entry_pipeline import EntryPipeline
+from monitoring.fetcher import PageFetcher
+from test.local_server import LocalServer
+
+
+def test_pipeline_overlaps_stages_and_isolates_failures():
+    # /jobs/8 is missing, so its page comes back empty
+    routes = {f"/jobs/{i}": (lambda handler, i=i: (200, {}, f"description {i}")) for i in range(8)}
+    checkpoints = []
+
+    def generate(entry, job_description):
+        time.sleep(0.1)
+        if entry['title'] == 'Job 3':
+            raise RuntimeError("LLM error")
+        return f"letter for {job_description}"
+
+    def compile(entry, latex_content):
+        time.sleep(0.1)
+        return f"{entry['id']}.pdf", f"{entry['id']}.tex"
+
+    with LocalServer(routes, delay=0.05) as server:
+        entries = [{'id': str(i), 'title': f"Job {i}", 'url': f"{server.url}/jobs/{i}"} for i in range(9)]
+        pipeline = EntryPipeline(
+            fetcher=PageFetcher(),
+            parse_description=lambda page: page,
+            generate=generate,
+            compile=compile,
+            cached_page=lambda url: "cached description" if url.endswith('/jobs/0') else None,
+            llm_concurrency=4,
+            compile_concurrency=2,
+            checkpoint=lambda entry, stage, payload: checkpoints.append((entry['id'], stage))
+        )
+        start = time.monotonic()
+        results = pipeline.run(entries)
+        elapsed = time.monotonic() - start
+
+    assert [entry['id'] for entry, _ in results] == ['0', '1', '2', '4', '5', '6', '7']
+    assert ('8', 'fetched') not in checkpoints and ('7', 'fetched') in checkpoints
+    assert results[0][1] == ['0.pdf', '0.tex']
+    assert '/jobs/0' not in [path for path, _ in server.requests]
+    # Serially this is 8 * (0.05 + 0.1 + 0.1) = 2s
+    assert elapsed < 1.2
+
+
+def make_generator(client):
+    from generators.content_generator import ContentGenerator
+    profile = {
+        'name': 'Jane Doe', 'skills': ['Python'], 'background': ['Data'], 'experience': 'Acme',
+        'achievements': 'Shipped things', 'personal_traits': ['Curious'], 'interests': ['Hiking'],
+    }
+    return ContentGenerator('key', profile, 'templates/default.tex', cover_letter_mode='AI', client=client, batch_poll_interval=0.01)
+
+
+def make_batch_pipeline(generator, compiled):
+    def compile(entry, latex_content):
+        compiled.append(entry['id'])
+        return f"{entry['id']}.pdf", f"{entry['id']}.tex"
+
+    return EntryPipeline(
+        fetcher=PageFetcher(),
+        parse_description=lambda page: page,
+        generate=generator.generate_cover_letter,
+        compile=compile,
+        cached_page=lambda url: f"Description of {url}",
+        generate_batch=generator.generate_cover_letters_batch,
+        batch_min_size=3
+    )
+
+
+def test_batch_mode_generates_all_letters_in_one_batch():
+    from generators.fake_anthropic import FakeAnthropic
+
+    client = FakeAnthropic(batch_latency=0.05)
+    compiled = []
+    entries = [{'id': str(i), 'title': f"Job {i}", 'url': f"https://jobs.example/{i}"} for i in range(5)]
+    results = make_batch_pipeline(make_generator(client), compiled).run(entries)
+
+    assert [entry['id'] for entry, _ in results] == ['0', '1', '2', '3', '4']
+    assert sorted(compiled) == ['0', '1', '2', '3', '4']
+    assert client.messages.calls == []
+    assert len(client.messages.batches._batches) == 1
+
+
+def test_small_runs_fall_back_to_single_requests():
+    from generators.fake_anthropic import FakeAnthropic
+
+    client = FakeAnthropic()
+    compiled = []
+    entries = [{'id': str(i), 'title': f"Job {i}", 'url': f"https://jobs.example/{i}"} for i in range(2)]
+    results = make_batch_pipeline(make_generator(client), compiled).run(entries)
+
+    assert len(results) == 2
+    assert len(client.messages.calls) == 2
+    assert client.messages.batches._batches == {}
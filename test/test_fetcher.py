@@ -0,0 +1,112 @@
+import time
+from urllib.parse import urlparse
+import pytest
+from monitoring.fetch_policy import FetchPolicy, TokenBucket, parse_retry_after
+from monitoring.fetcher import PageFetcher
+from test.local_server import LocalServer
+
+
+def page(body):
+    return lambda handler: (200, {}, body)
+
+
+def test_fetch_page_reuses_connections():
+    routes = {f"/job/{i}": page(f"<p>job {i}</p>") for i in range(10)}
+    with LocalServer(routes) as server:
+        fetcher = PageFetcher()
+        pages = [fetcher.fetch_page(f"{server.url}/job/{i}") for i in range(10)]
+
+    assert pages == [f"<p>job {i}</p>" for i in range(10)]
+    assert server.connections == 1
+
+
+def test_fetch_page_returns_empty_on_error():
+    with LocalServer({}) as server:
+        assert PageFetcher().fetch_page(f"{server.url}/missing") == ""
+
+
+def test_fetch_pages_runs_concurrently_and_deduplicates():
+    routes = {f"/job/{i}": page(f"job {i}") for i in range(10)}
+    urls = []
+    with LocalServer(routes, delay=0.1) as server:
+        urls = [f"{server.url}/job/{i}" for i in range(10)] * 2
+        start = time.monotonic()
+        pages = PageFetcher(max_in_flight=10).fetch_pages(urls)
+        elapsed = time.monotonic() - start
+
+    assert len(server.requests) == 10
+    assert pages[urls[3]] == "job 3"
+    # Serial fetching would take at least 10 * 0.1s
+    assert elapsed < 10 * 0.1
+
+
+def flaky(failures, status=503, headers=None):
+    state = {'left': failures}
+
+    def route(handler):
+        if state['left']:
+            state['left'] -= 1
+            return status, headers or {}, 'busy'
+        return 200, {}, 'ok'
+    return route
+
+
+def test_retries_honour_retry_after_on_both_paths():
+    policy = FetchPolicy(backoff=0.01, max_retries=2)
+    routes = {'/sync': flaky(2, 429, {'Retry-After': '0.2'}), '/async': flaky(1), '/down': flaky(10)}
+    with LocalServer(routes) as server:
+        fetcher = PageFetcher(policy=policy)
+        start = time.monotonic()
+        assert fetcher.fetch_page(f"{server.url}/sync") == 'ok'
+        assert time.monotonic() - start >= 0.4
+        assert fetcher.fetch_pages([f"{server.url}/async"]) == {f"{server.url}/async": 'ok'}
+
+        result = fetcher.fetch(f"{server.url}/down")
+    assert result.text == '' and '503' in result.error
+    assert [path for path, _ in server.requests].count('/down') == 3
+
+
+def test_circuit_breaker_stops_hitting_a_failing_host():
+    policy = FetchPolicy(max_retries=0, failure_threshold=2, cooldown=0.3)
+    routes = {'/': flaky(2, 500)}
+    with LocalServer(routes) as server:
+        fetcher = PageFetcher(policy=policy)
+        assert fetcher.fetch_page(server.url + '/') == ''
+        assert fetcher.fetch_page(server.url + '/') == ''
+        # Open: no request reaches the host until the cooldown is over
+        assert 'failing' in fetcher.fetch(server.url + '/').error
+        assert fetcher.fetch_pages([server.url + '/']) == {server.url + '/': ''}
+        assert len(server.requests) == 2
+
+        time.sleep(0.3)
+        assert fetcher.fetch_page(server.url + '/') == 'ok'
+        assert not policy.breaker(urlparse(server.url).netloc).open
+
+
+def test_any_error_during_the_trial_request_reopens_the_circuit():
+    policy = FetchPolicy(max_retries=0, failure_threshold=1, cooldown=0.1)
+    # Redirects to itself, so the fetch fails without a connection error
+    routes = {'/down': lambda handler: (503, {}, 'busy'), '/loop': lambda handler: (302, {'Location': '/loop'}, ''), '/': page('ok')}
+    with LocalServer(routes) as server:
+        fetcher = PageFetcher(policy=policy)
+        breaker = policy.breaker(urlparse(server.url).netloc)
+        for fetch_loop in (fetcher.fetch_page, lambda url: fetcher.fetch_pages([url])[url]):
+            assert fetcher.fetch_page(server.url + '/down') == ''
+            assert breaker.open
+
+            time.sleep(0.1)
+            assert fetch_loop(server.url + '/loop') == ''
+            assert breaker.open
+
+            time.sleep(0.1)
+            assert fetcher.fetch_page(server.url + '/') == 'ok'
+            assert not breaker.open
+
+
+def test_rate_limit_spaces_requests_per_host():
+    bucket = TokenBucket(rate=20, burst=2)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == pytest.approx([0.05, 0.1, 0.15], abs=0.01)
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
@@ -0,0 +1,54 @@
+from monitoring.fetcher import PageFetcher
+from monitoring.http_cache import HttpCache
+from test.local_server import LocalServer
+
+
+def etag_page(body, etag):
+    def route(handler):
+        if handler.headers.get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, ''
+        return 200, {'ETag': etag}, body
+    return route
+
+
+def test_conditional_get_returns_cached_body(tmp_path):
+    with LocalServer({'/jobs': etag_page('<ul>jobs</ul>', '"v1"')}) as server:
+        fetcher = PageFetcher(cache=HttpCache(str(tmp_path)))
+        first = fetcher.fetch(f"{server.url}/jobs")
+        second = fetcher.fetch(f"{server.url}/jobs")
+
+    assert first.status == 200 and not first.not_modified
+    assert second.status == 304 and second.not_modified
+    assert second.text == '<ul>jobs</ul>'
+    assert server.requests[1][1]['If-None-Match'] == '"v1"'
+
+
+def test_fetch_pages_revalidates_detail_pages(tmp_path):
+    with LocalServer({'/job/1': etag_page('detail', '"d1"')}) as server:
+        fetcher = PageFetcher(cache=HttpCache(str(tmp_path)))
+        fetcher.fetch_pages([f"{server.url}/job/1"])
+        pages = fetcher.fetch_pages([f"{server.url}/job/1"])
+
+    assert pages[f"{server.url}/job/1"] == 'detail'
+    assert server.requests[1][1]['If-None-Match'] == '"d1"'
+
+
+def test_responses_without_validators_are_not_cached(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    cache.store('https://example.com/', {}, 'body')
+    assert cache.get('https://example.com/') is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=600)
+    body = 'x' * 200
+    cache.store('https://example.com/a', {'ETag': 'a'}, body)
+    cache.store('https://example.com/b', {'ETag': 'b'}, body)
+    cache.get('https://example.com/a')
+    cache.store('https://example.com/c', {'ETag': 'c'}, body)
+
+    assert cache.get('https://example.com/a') == body
+    assert cache.get('https://example.com/b') is None
+    assert cache.get('https://example.com/c') == body
+    # The index survives a restart
+    assert HttpCache(str(tmp_path), max_bytes=600).get('https://example.com/c') == body
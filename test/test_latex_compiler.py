@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+from generators.latex_compiler import LatexCompiler, split_static_preamble
+
+# Stands in for pdflatex: "compiles" by copying the source, and checks -fmt names a dumped format
+FAKE_PDFLATEX = f"""#!{sys.executable}
+import os, sys
+args = sys.argv[1:]
+with open(os.environ['FAKE_PDFLATEX_LOG'], 'a') as log:
+    log.write(' '.join(args) + '\\n')
+if args == ['--version']:
+    print('pdfTeX 3.141592653-2.6-1.40.25 (fake)')
+    sys.exit(0)
+for arg in args:
+    if arg.startswith('-fmt='):
+        format_dir = os.environ['TEXFORMATS'].split(os.pathsep)[0]
+        if not os.path.exists(os.path.join(format_dir, arg[5:] + '.fmt')):
+            sys.exit(1)
+job = next((arg[9:] for arg in args if arg.startswith('-jobname=')), os.path.splitext(args[-1])[0])
+with open(args[-1]) as source, open(job + ('.fmt' if '-ini' in args else '.pdf'), 'w') as output:
+    output.write(source.read())
+"""
+
+
+def test_split_static_preamble_keeps_per_letter_lines_in_the_body():
+    template = Path('templates/cover_letter_template.tex').read_text(encoding='utf-8')
+    preamble, body = split_static_preamble(template)
+
+    assert preamble == '\\documentclass{article}\n\\usepackage[utf8]{inputenc}\n\n\n'
+    assert body.startswith('\\title{{{TITLE}}}')
+    assert split_static_preamble('Hello') == ('', 'Hello')
+
+
+def test_letters_sharing_a_preamble_build_one_format(tmp_path, monkeypatch):
+    pdflatex = tmp_path / 'pdflatex'
+    pdflatex.write_text(FAKE_PDFLATEX)
+    pdflatex.chmod(0o755)
+    log = tmp_path / 'calls.log'
+    monkeypatch.setenv('FAKE_PDFLATEX_LOG', str(log))
+
+    compiler = LatexCompiler(workers=3, format_dir=str(tmp_path / 'formats'), pdflatex=str(pdflatex))
+    out = tmp_path / 'cover_letters'
+    futures = [
+        compiler.submit(f"\\documentclass{{article}}\n\\usepackage{{geometry}}\n\\begin{{document}}Letter {i}\\end{{document}}", out / f"letter_{i}.pdf")
+        for i in range(4)
+    ]
+    for future in futures:
+        future.result()
+    compiler.shutdown()
+
+    calls = log.read_text().splitlines()
+    assert sum('-ini' in call for call in calls) == 1
+    assert sorted(path.name for path in out.iterdir()) == [f"letter_{i}.pdf" for i in range(4)]
+    assert (out / 'letter_2.pdf').read_text() == '\\begin{document}Letter 2\\end{document}'
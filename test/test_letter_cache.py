@@ -0,0 +1,65 @@
+import asyncio
+from pathlib import Path
+from generators.content_generator import ContentGenerator
+from generators.fake_anthropic import FakeAnthropic
+from generators.letter_cache import LetterCache
+from generators.pdf_generator import PDFGenerator
+from test.test_content_generator import PROFILE
+
+
+def test_repeated_postings_reuse_the_generated_letter(tmp_path):
+    cache = LetterCache(str(tmp_path / 'cache'))
+    client = FakeAnthropic()
+    generator = ContentGenerator('key', PROFILE, 'unused.tex', cover_letter_mode='AI', client=client, letter_cache=cache)
+
+    first = generator.generate_cover_letter({}, 'Backend developer\n\nin Lund')
+    second = generator.generate_cover_letter({}, '  Backend developer in   Lund ')
+    assert first == second
+    assert len(client.messages.calls) == 1
+    assert generator.usage()['letter_cache_hits'] == 1
+
+    other_profile = dict(PROFILE, name='John Roe')
+    other = ContentGenerator('key', other_profile, 'unused.tex', cover_letter_mode='AI', client=client, letter_cache=cache)
+    other.generate_cover_letter({}, 'Backend developer in Lund')
+    assert len(client.messages.calls) == 2
+
+    async def collect():
+        return [item async for item in generator.generate_cover_letters_batch([('a', {}, 'Backend developer in Lund')])]
+
+    assert asyncio.run(collect()) == [('a', first)]
+    assert client.messages.batches._batches == {}
+
+
+class FakeCompiler:
+    def __init__(self):
+        self.compiles = []
+
+    def compile(self, source, pdf_output_path):
+        self.compiles.append(source)
+        Path(pdf_output_path).write_bytes(b'%PDF-1.4 fake')
+
+
+def test_identical_latex_is_compiled_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    compiler = FakeCompiler()
+    generator = PDFGenerator('unused.tex', PROFILE, letter_cache=LetterCache('letter_cache'), latex_compiler=compiler)
+
+    first_pdf, _ = generator.compile_pdf('\\documentclass{article}', {'organization': 'Acme', 'title': 'Dev', 'id': 'a1'})
+    second_pdf, second_tex = generator.compile_pdf('\\documentclass{article}', {'organization': 'Initech', 'title': 'Dev', 'id': 'b2'})
+
+    assert len(compiler.compiles) == 1
+    assert first_pdf != second_pdf
+    assert Path(second_pdf).read_bytes() == b'%PDF-1.4 fake'
+    assert Path(second_tex).read_text() == '\\documentclass{article}'
+
+
+def test_least_recently_used_letters_are_evicted(tmp_path):
+    cache = LetterCache(str(tmp_path), max_bytes=2500)
+    for key in ('a', 'b'):
+        cache.store_letter(key, key * 1000)
+    assert cache.get_letter('a') == 'a' * 1000
+    cache.store_letter('c', 'c' * 1000)
+
+    assert cache.get_letter('b') is None
+    assert cache.get_letter('a') is not None
+    assert sorted(LetterCache(str(tmp_path))._index) == ['a', 'c']
@@ -0,0 +1,44 @@
+from pathlib import Path
+from generators.letter_renderer import latex_to_paragraphs
+from generators.pdf_generator import PDFGenerator
+from test.test_content_generator import PROFILE
+
+LETTER = r"""\documentclass{article}
+\title{Cover Letter}
+\begin{document}
+\maketitle
+Dear Hiring Manager,
+
+\bigskip
+\noindent
+I would like to join \textbf{Acme \& Sons} as a developer --- 100\% remote. % not in the letter
+My skills:\\ Python, \emph{SQL}.
+
+\bigskip
+\noindent
+Sincerely,
+
+Jane Doe
+\end{document}"""
+
+
+def test_latex_letter_is_reduced_to_body_paragraphs():
+    assert latex_to_paragraphs(LETTER, 'Sincerely,') == [
+        'Dear Hiring Manager,',
+        'I would like to join <b>Acme &amp; Sons</b> as a developer — 100% remote. My skills:<br/> Python, <i>SQL</i>.',
+    ]
+    assert latex_to_paragraphs('First paragraph.\n\nSecond & last.') == ['First paragraph.', 'Second &amp; last.']
+
+
+def test_reportlab_renderer_lays_out_swedish_letters_without_tex(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = PDFGenerator('unused.tex', dict(PROFILE, address='Storgatan 1', city='Lund', email='jane@example.se'), latex_compiler=object())
+    job = {'organization': 'Acme AB', 'title': 'Utvecklare', 'id': 'a1', 'language': 'sve'}
+
+    fields = generator.letter_fields('', job)
+    assert fields['TITLE'] == 'Personligt Brev'
+    assert fields['CLOSING_SALUTATION'] == 'Med vänliga hälsningar,'
+
+    pdf_path, tex_path = generator.compile_pdf(LETTER, job, method='reportlab')
+    assert Path(pdf_path).read_bytes().startswith(b'%PDF')
+    assert Path(tex_path).read_text(encoding='utf-8') == LETTER
@@ -0,0 +1,82 @@
+import logging
+from monitoring.fetcher import PageFetcher
+from monitoring.metrics import Metrics
+from monitoring.site_monitor import SiteMonitor
+from monitoring.state_store import StateStore
+from monitoring.web_parser import WebPageParser
+from test.local_server import LocalServer
+from test.test_site_monitor import PAGE, SITE_CONFIG, FakeFetcher, RecordingEmailSender
+from utils.logger import setup_logger
+
+
+def test_render_uses_the_prometheus_text_format():
+    metrics = Metrics()
+    metrics.inc('sitemonitor_fetch_bytes_total', 1234567, host='jobs.example')
+    metrics.inc('sitemonitor_runs_total', site='https://jobs.example/"a"', status='processed')
+    metrics.observe('sitemonitor_stage_seconds', 0.2, site='s', stage='fetch')
+    metrics.observe('sitemonitor_stage_seconds', 3, site='s', stage='fetch')
+    lines = metrics.render().splitlines()
+
+    assert '# TYPE sitemonitor_fetch_bytes_total counter' in lines
+    assert 'sitemonitor_fetch_bytes_total{host="jobs.example"} 1234567' in lines
+    assert 'sitemonitor_runs_total{site="https://jobs.example/\\"a\\"",status="processed"} 1' in lines
+    assert '# TYPE sitemonitor_stage_seconds histogram' in lines
+    assert 'sitemonitor_stage_seconds_bucket{site="s",stage="fetch",le="0.1"} 0' in lines
+    assert 'sitemonitor_stage_seconds_bucket{site="s",stage="fetch",le="0.25"} 1' in lines
+    assert 'sitemonitor_stage_seconds_bucket{site="s",stage="fetch",le="+Inf"} 2' in lines
+    assert 'sitemonitor_stage_seconds_count{site="s",stage="fetch"} 2' in lines
+    assert 'sitemonitor_stage_seconds_sum{site="s",stage="fetch"} 3.200000' in lines
+
+
+def test_site_monitor_runs_report_stage_timings_and_counts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    metrics = Metrics()
+    fetcher = FakeFetcher({'https://jobs.example/': PAGE.format(banner='Monday')})
+    monitor = SiteMonitor(SITE_CONFIG, WebPageParser(SITE_CONFIG, fetcher=fetcher), RecordingEmailSender(),
+                          fetcher=fetcher, state=StateStore('data/state.db'), metrics=metrics)
+    summary = monitor.run()
+
+    assert {'fetch', 'parse', 'filter', 'email'} <= set(summary['timings'])
+    rendered = metrics.render()
+    site = 'site="https://jobs.example/"'
+    assert f'sitemonitor_runs_total{{{site},status="processed"}} 1' in rendered
+    assert f'sitemonitor_entries_seen_total{{{site}}} 2' in rendered
+    assert f'sitemonitor_stage_seconds_count{{{site},stage="email"}} 1' in rendered
+
+
+def test_fetches_are_counted_on_both_paths():
+    metrics = Metrics()
+    routes = {'/job': lambda handler: (200, {}, 'x' * 100), '/other': lambda handler: (200, {}, 'y' * 50)}
+    with LocalServer(routes) as server:
+        fetcher = PageFetcher(metrics=metrics)
+        fetcher.fetch_page(f"{server.url}/job")
+        fetcher.fetch_pages([f"{server.url}/job", f"{server.url}/other"])
+        host = server.url.split('//')[1]
+
+    lines = metrics.render().splitlines()
+    assert f'sitemonitor_fetch_requests_total{{host="{host}",status="200"}} 3' in lines
+    assert f'sitemonitor_fetch_bytes_total{{host="{host}"}} 250' in lines
+    assert f'sitemonitor_fetch_seconds_count{{host="{host}"}} 3' in lines
+
+
+def test_setup_logger_adds_handlers_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    logger = logging.getLogger()
+    handlers = list(logger.handlers)
+    try:
+        setup_logger()
+        added = len(logger.handlers) - len(handlers)
+        setup_logger()
+        assert len(logger.handlers) - len(handlers) == added
+    finally:
+        for handler in logger.handlers[len(handlers):]:
+            handler.close()
+        logger.handlers = handlers
+
+
+def test_metrics_endpoint_serves_the_default_registry():
+    from main import create_app
+
+    response = create_app().test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
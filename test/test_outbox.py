@@ -0,0 +1,80 @@
+import time
+import pytest
+
+pytest.importorskip('aiosmtpd')
+
+from monitoring.outbox import NotificationOutbox
+from monitoring.site_monitor import SiteMonitor
+from monitoring.state_store import StateStore
+from monitoring.web_parser import WebPageParser
+from test.local_smtp import LocalSmtpServer
+from test.test_site_monitor import PAGE, SITE_CONFIG, FakeFetcher
+from utils.email_sender import EmailSender
+
+
+def make_outbox(tmp_path, server, **email_overrides):
+    sender = EmailSender(server.email_config(max_retries=0, **email_overrides))
+    return NotificationOutbox(StateStore(str(tmp_path / 'state.db')), sender, base_delay=0)
+
+
+def test_notifications_survive_an_smtp_outage(tmp_path):
+    letter = tmp_path / 'Cover_Letter_1.pdf'
+    letter.write_bytes(b'%PDF-1.4 letter')
+    server = LocalSmtpServer()
+    outbox = make_outbox(tmp_path, server)
+
+    # The server is not listening yet
+    outbox.enqueue('site', [({'id': 'e1', 'title': 'Job 1'}, [str(letter)])], ['title'])
+    assert outbox.drain() == 0
+    assert outbox.state.pending_notification_count() == 1
+    assert letter.exists()
+
+    with server:
+        assert outbox.drain() == 1
+    assert outbox.state.pending_notification_count() == 0
+    assert not letter.exists()
+    assert server.messages[0]['Subject'] == 'New entry: e1'
+
+
+def test_digest_covers_every_site_in_the_sweep(tmp_path):
+    with LocalSmtpServer() as server:
+        outbox = make_outbox(tmp_path, server, digest=True)
+        outbox.enqueue('site-a', [({'id': 'a1', 'title': 'Job A'}, [])], ['title'])
+        outbox.enqueue('site-b', [({'id': 'b1', 'title': 'Job B'}, []), ({'id': 'b2', 'title': 'Job C'}, [])], ['title'])
+        assert outbox.drain() == 3
+
+    [message] = server.messages
+    assert message['Subject'] == '3 new entries'
+
+
+def test_digest_waits_for_the_end_of_the_sweep(tmp_path):
+    with LocalSmtpServer() as server:
+        outbox = make_outbox(tmp_path, server, digest=True)
+        outbox.poll_interval = 0.05
+        outbox.start()
+        outbox.enqueue('site-a', [({'id': 'a1', 'title': 'Job A'}, [])], ['title'])
+        # Several polls pass while the sweep is still running
+        time.sleep(0.3)
+        outbox.enqueue('site-b', [({'id': 'b1', 'title': 'Job B'}, [])], ['title'])
+        assert server.messages == []
+
+        outbox.wake()
+        outbox.close()
+
+    [message] = server.messages
+    assert message['Subject'] == '2 new entries'
+
+
+def test_monitor_run_does_not_wait_for_mail(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = LocalSmtpServer()
+    outbox = make_outbox(tmp_path, server)
+    fetcher = FakeFetcher({'https://jobs.example/': PAGE.format(banner='Monday')})
+    state = StateStore('data/state.db')
+    monitor = SiteMonitor(SITE_CONFIG, WebPageParser(SITE_CONFIG, fetcher=fetcher), outbox.email_sender, fetcher=fetcher, state=state, outbox=outbox)
+
+    summary = monitor.run()
+    assert summary['status'] == 'processed'
+    assert summary['emails_failed'] == 0
+    assert len(monitor.known_entries) == 2
+    assert outbox.state.pending_notification_count() == 2
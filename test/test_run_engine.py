@@ -0,0 +1,53 @@
+import threading
+import time
+from monitoring.run_engine import RunEngine
+
+
+def make_site(url):
+    return {'entry_site': {'url': url}}
+
+
+def test_run_engine_respects_limits():
+    lock = threading.Lock()
+    active = {'total': 0, 'max_total': 0, 'per_host': {}, 'max_per_host': {}}
+
+    def run_site(site_config):
+        host = site_config['entry_site']['url'].split('/')[2]
+        with lock:
+            active['total'] += 1
+            active['max_total'] = max(active['max_total'], active['total'])
+            active['per_host'][host] = active['per_host'].get(host, 0) + 1
+            active['max_per_host'][host] = max(active['max_per_host'].get(host, 0), active['per_host'][host])
+        time.sleep(0.05)
+        with lock:
+            active['total'] -= 1
+            active['per_host'][host] -= 1
+        return {'url': site_config['entry_site']['url']}
+
+    sites = [make_site(f"https://a.example/{i}") for i in range(6)] + \
+            [make_site(f"https://b{i}.example/") for i in range(6)]
+    engine = RunEngine(run_site, max_workers=4, max_per_host=1)
+
+    start = time.monotonic()
+    results = engine.run_all(sites)
+    elapsed = time.monotonic() - start
+
+    assert len(results) == len(sites)
+    assert all(result.success for result in results)
+    assert active['max_total'] <= 4
+    assert active['max_per_host']['a.example'] == 1
+    # Six serial runs on a.example bound the sweep, not twelve
+    assert elapsed < 12 * 0.05
+
+
+def test_run_engine_isolates_failures():
+    def run_site(site_config):
+        if 'bad' in site_config['entry_site']['url']:
+            raise RuntimeError("boom")
+
+    results = RunEngine(run_site).run_all([make_site("https://bad.example/"), make_site("https://good.example/")])
+
+    by_url = {result.url: result for result in results}
+    assert not by_url["https://bad.example/"].success
+    assert by_url["https://bad.example/"].error == "boom"
+    assert by_url["https://good.example/"].success
@@ -0,0 +1,117 @@
+import threading
+import time
+from monitoring.run_engine import RunEngine
+from monitoring.scheduler import MonitorScheduler
+from monitoring.site_monitor import site_key
+from monitoring.state_store import StateStore
+
+
+def make_site(url, interval):
+    return {'entry_site': {'url': url}, 'check_interval': interval}
+
+
+class RecordingEngine(RunEngine):
+    def __init__(self, run_time=0.02):
+        self.run_time = run_time
+        self.starts = []
+        self._starts_lock = threading.Lock()
+        super().__init__(self.record, max_workers=4, max_per_host=4)
+
+    def record(self, site_config):
+        with self._starts_lock:
+            self.starts.append((site_config['entry_site']['url'], time.time()))
+        time.sleep(self.run_time)
+
+    def runs(self, url):
+        return [started for run_url, started in self.starts if run_url == url]
+
+
+def run_for(scheduler, seconds):
+    scheduler.start()
+    time.sleep(seconds)
+    scheduler.stop()
+    scheduler.engine.shutdown()
+
+
+def test_sites_run_on_their_own_intervals():
+    engine = RecordingEngine()
+    fast, slow = 'https://a.example/fast', 'https://b.example/slow'
+    scheduler = MonitorScheduler(engine, [make_site(fast, 0.1), make_site(slow, 10)], jitter=0)
+    run_for(scheduler, 0.55)
+
+    assert 4 <= len(engine.runs(fast)) <= 6
+    assert len(engine.runs(slow)) == 1
+
+
+def test_runs_on_one_host_are_spaced_out():
+    engine = RecordingEngine()
+    sites = [make_site(f"https://a.example/{i}", 10) for i in range(3)]
+    scheduler = MonitorScheduler(engine, sites, jitter=0, host_spacing=0.1)
+    run_for(scheduler, 0.35)
+
+    starts = sorted(started for _, started in engine.starts)
+    assert len(starts) == 3
+    assert all(later - earlier >= 0.09 for earlier, later in zip(starts, starts[1:]))
+
+
+def test_missed_runs_are_caught_up_once(tmp_path):
+    state = StateStore(str(tmp_path / 'state.db'))
+    overdue, recent = 'https://a.example/overdue', 'https://b.example/recent'
+    # Down for ten intervals on one site, half an interval on the other
+    state.record_run(site_key(overdue), time.time() - 10 * 60, {'status': 'processed'})
+    state.record_run(site_key(recent), time.time() - 30, {'status': 'processed'})
+
+    engine = RecordingEngine()
+    scheduler = MonitorScheduler(engine, [make_site(overdue, 60), make_site(recent, 60)], jitter=0, state=state)
+    assert scheduler.next_run_at(recent) > time.time() + 25
+    run_for(scheduler, 0.2)
+
+    assert len(engine.runs(overdue)) == 1
+    assert engine.runs(recent) == []
+
+
+def test_trigger_wakes_the_scheduler_immediately():
+    engine = RecordingEngine()
+    url = 'https://a.example/'
+    idle = threading.Event()
+    scheduler = MonitorScheduler(engine, [make_site(url, 3600)], jitter=0, on_idle=idle.set)
+    scheduler.start()
+    assert idle.wait(1)
+    idle.clear()
+
+    triggered_at = time.time()
+    scheduler.trigger(url)
+    assert idle.wait(1)
+    run_for(scheduler, 0)
+
+    assert len(engine.runs(url)) == 2
+    assert engine.runs(url)[1] - triggered_at < 0.05
+
+
+def test_config_changes_apply_to_a_running_scheduler():
+    engine = RecordingEngine()
+    kept, removed, added = 'https://a.example/', 'https://b.example/', 'https://c.example/'
+    scheduler = MonitorScheduler(engine, [make_site(kept, 10), make_site(removed, 0.1)], jitter=0)
+    scheduler.start()
+    time.sleep(0.05)
+
+    scheduler.update_sites([make_site(kept, 0.1), make_site(added, 10)])
+    run_for(scheduler, 0.3)
+
+    assert len(engine.runs(kept)) >= 3
+    assert len(engine.runs(removed)) == 1
+    assert len(engine.runs(added)) == 1
+
+
+def test_site_removed_and_re_added_during_its_run_stays_scheduled():
+    engine = RecordingEngine(run_time=0.2)
+    url = 'https://a.example/'
+    scheduler = MonitorScheduler(engine, [make_site(url, 0.1)], jitter=0)
+    scheduler.start()
+    time.sleep(0.05)
+
+    scheduler.update_sites([])
+    scheduler.update_sites([make_site(url, 0.1)])
+    run_for(scheduler, 0.4)
+
+    assert len(engine.runs(url)) >= 2
@@ -0,0 +1,55 @@
+import json
+from monitoring.seen_store import SeenEntryStore
+from monitoring.state_store import StateStore
+
+
+def test_store_round_trip(tmp_path):
+    state = StateStore(tmp_path / 'state.db')
+    store = SeenEntryStore(state, 'site').load()
+    store.add_many([{'id': 'a'}, {'id': 'b'}, 'c'])
+    store.save()
+
+    loaded = SeenEntryStore(state, 'site').load()
+    assert 'a' in loaded and 'c' in loaded and 'z' not in loaded
+    assert len(loaded) == 3
+    assert len(SeenEntryStore(state, 'other_site').load()) == 0
+
+
+def test_store_caps_size_and_expires_old_ids(tmp_path):
+    state = StateStore(tmp_path / 'state.db')
+    store = SeenEntryStore(state, 'site', ttl_seconds=60, max_entries=2).load()
+    store.add('old', seen_at=0)
+    store.add_many(['a', 'b', 'c'])
+    store.save()
+
+    assert 'old' not in store and 'a' not in store
+    assert 'b' in store and 'c' in store
+    assert [entry_id for entry_id, _ in state.load_seen('site')] == ['b', 'c']
+
+
+def test_store_migrates_json_state_once(tmp_path):
+    data_dir = tmp_path / 'data'
+    (data_dir / '12345678').mkdir(parents=True)
+    (data_dir / 'known_entries.json').write_text(json.dumps(['12345678', '87654321']))
+    (data_dir / '12345678' / 'entry.json').write_text(json.dumps({'id': '12345678', 'title': 'Engineer'}))
+
+    state = StateStore(data_dir / 'state.db')
+    state.migrate_json('site', data_dir=str(data_dir))
+    state.remove_seen('site', ['87654321'])
+    state.migrate_json('site', data_dir=str(data_dir))
+
+    assert [entry_id for entry_id, _ in state.load_seen('site')] == ['12345678']
+    assert state.load_entry('site', '12345678')['title'] == 'Engineer'
+
+
+def test_shared_json_state_goes_to_the_first_site_only(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    (data_dir / 'known_entries.json').write_text(json.dumps(['12345678']))
+
+    state = StateStore(data_dir / 'state.db')
+    state.migrate_json('site', data_dir=str(data_dir))
+    state.migrate_json('added_later', data_dir=str(data_dir))
+
+    assert [entry_id for entry_id, _ in state.load_seen('site')] == ['12345678']
+    assert state.load_seen('added_later') == []
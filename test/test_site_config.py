@@ -0,0 +1,90 @@
+import json
+import os
+import pickle
+import random
+import pytest
+from config.config_manager import ConfigManager
+from config.site_config import ConfigError, SiteConfig, compile_filter
+
+
+def make_site(**overrides):
+    return dict({'entry_site': {'url': 'https://jobs.example/', 'selectors': {'title': 'h3'}}}, **overrides)
+
+
+def test_plain_terms_keep_substring_semantics():
+    config = SiteConfig(make_site(include_filters={'title': 'Engineer'}, exclude_filters={'location': 'Remote'}))
+    entries = [
+        {'title': 'Software Engineer', 'location': 'Malmö'},
+        {'title': 'Engineering Manager', 'location': 'Remote'},
+        {'title': 'software engineer', 'location': 'Lund'},
+        {'title': 'Designer', 'location': 'Malmö'},
+    ]
+    assert config.select(entries) == entries[:1]
+
+
+def test_filter_options():
+    entry_filter = compile_filter('title', {'terms': ['data', 'ML'], 'case_sensitive': False, 'whole_words': True})
+    assert entry_filter.matches({'title': 'Senior Data Scientist'})
+    assert entry_filter.matches({'title': 'ml-engineer'})
+    assert not entry_filter.matches({'title': 'Database administrator'})
+    assert not entry_filter.matches({})
+
+
+def test_merged_pattern_agrees_with_term_by_term_matching():
+    rng = random.Random(1)
+    words = [''.join(rng.choices('abcdeåäö', k=rng.randint(2, 6))) for _ in range(300)]
+    terms = rng.sample(words, 40) + ['ab', 'abc', 'a.c']
+    titles = [' '.join(rng.choices(words + ['a.c'], k=6)) for _ in range(2000)]
+    entry_filter = compile_filter('title', {'terms': terms, 'case_sensitive': False})
+
+    expected = [title for title in titles if any(term.casefold() in title.casefold() for term in terms)]
+    assert [title for title in titles if entry_filter.matches({'title': title})] == expected
+
+
+def test_site_configs_are_validated_and_read_only():
+    with pytest.raises(ConfigError, match='entry_site.url'):
+        SiteConfig({'entry_site': {}})
+    with pytest.raises(ConfigError, match='check_interval'):
+        SiteConfig(make_site(check_interval=-5))
+    with pytest.raises(ConfigError, match="Filter 'title'"):
+        SiteConfig(make_site(include_filters={'title': []}))
+
+    config = SiteConfig(make_site(process_entries=['pdf'], user_profile={'experience': ['A', 'B']}))
+    with pytest.raises(TypeError):
+        config['to_disk'] = True
+    with pytest.raises(TypeError):
+        config['entry_site']['url'] = 'https://other.example/'
+    with pytest.raises(TypeError):
+        config['process_entries'].append('tex')
+    assert config.url == 'https://jobs.example/'
+    assert config['process_entries'] == ['pdf']
+    # Lists still render as lists where they are interpolated into the prompt
+    assert f"{config['user_profile']['experience']}" == "['A', 'B']"
+    assert json.loads(json.dumps(config))['process_entries'] == ['pdf']
+    assert pickle.loads(pickle.dumps(config)).url == config.url
+
+
+def test_reload_picks_up_changed_files_only(tmp_path):
+    site_dir = tmp_path / 'sites'
+    site_dir.mkdir()
+    (tmp_path / 'config.json').write_text(json.dumps({'anthropic_api_key': 'key'}))
+    (site_dir / 'a.json').write_text(json.dumps(make_site()))
+    manager = ConfigManager(str(tmp_path / 'config.json'), str(site_dir))
+    [site_a] = manager.site_configs
+    assert site_a['anthropic_api_key'] == 'key'
+    assert not manager.reload()
+
+    (site_dir / 'b.json').write_text(json.dumps(make_site(entry_site={'url': 'https://b.example/'})))
+    assert manager.reload()
+    assert manager.site_configs[0] is site_a
+    assert [config.url for config in manager.site_configs] == ['https://jobs.example/', 'https://b.example/']
+
+    # A broken edit keeps the last good version
+    (site_dir / 'a.json').write_text('{"entry_site": ')
+    os.utime(site_dir / 'a.json', ns=(1, 1))
+    assert not manager.reload()
+    assert manager.site_configs[0] is site_a
+
+    (site_dir / 'b.json').unlink()
+    assert manager.reload()
+    assert manager.site_configs == [site_a]
@@ -0,0 +1,356 @@
+import contextlib
+import os
+import time
+import pytest
+from monitoring.fetcher import FetchResult
+from monitoring.site_monitor import SiteMonitor
+from monitoring.state_store import StateStore
+from monitoring.web_parser import WebPageParser
+
+PAGE = """
+<html><body>
+<div class="banner">{banner}</div>
+<a class="job" href="https://jobs.example/1"><h3>Data Engineer</h3></a>
+<a class="job" href="https://jobs.example/2"><h3>Backend Developer</h3></a>
+</body></html>
+"""
+
+SITE_CONFIG = {
+    'entry_site': {
+        'url': 'https://jobs.example/',
+        'entry_selector': 'a.job',
+        'selectors': {'title': 'h3'},
+        'links': {'url': 'a.job'},
+    },
+    'send_starting_entries': True,
+    'process_entries': [],
+    'to_disk': False,
+    'debug': {'stop_after_one': False},
+}
+
+
+class FakeFetcher:
+    cache = None
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def fetch(self, url, store=True):
+        return FetchResult(url=url, text=self.pages[url], status=200)
+
+    def store_result(self, result):
+        pass
+
+    def fetch_page(self, url):
+        return self.pages[url]
+
+
+class RecordingEmailSender:
+    def __init__(self):
+        self.sent = []
+
+    def send_emails(self, entries, send_props):
+        self.sent.extend(entries)
+        return []
+
+
+def make_monitor(pages, config=SITE_CONFIG):
+    fetcher = FakeFetcher(pages)
+    email_sender = RecordingEmailSender()
+    state = StateStore('data/state.db')
+    monitor = SiteMonitor(config, WebPageParser(config, fetcher=fetcher), email_sender, fetcher=fetcher, state=state)
+    return monitor, email_sender
+
+
+def count_parses(monitor):
+    parses = []
+    parse_entry_region = monitor.parser.parse_entry_region
+    monitor.parser.parse_entry_region = lambda page_content: parses.append(1) or parse_entry_region(page_content)
+    return parses
+
+
+def test_unchanged_pages_skip_the_run_without_parsing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pages = {'https://jobs.example/': PAGE.format(banner='Monday')}
+    monitor, email_sender = make_monitor(pages)
+    assert monitor.run()['status'] == 'processed'
+    assert len(email_sender.sent) == 2
+
+    monitor, email_sender = make_monitor(pages)
+    parses = count_parses(monitor)
+    assert monitor.run()['status'] == 'unchanged'
+    assert parses == [] and email_sender.sent == []
+
+
+def test_entries_digest_ignores_page_chrome_and_parses_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = dict(SITE_CONFIG, content_digest='entries')
+    monitor, email_sender = make_monitor({'https://jobs.example/': PAGE.format(banner='Monday')}, config)
+    parses = count_parses(monitor)
+    assert monitor.run()['status'] == 'processed'
+    assert len(email_sender.sent) == 2
+    assert len(parses) == 1
+
+    # Only page chrome outside entry_selector changed
+    monitor, email_sender = make_monitor({'https://jobs.example/': PAGE.format(banner='Tuesday')}, config)
+    summary = monitor.run()
+    assert summary['status'] == 'unchanged'
+    assert email_sender.sent == []
+    assert [run['status'] for run in monitor.state.recent_runs(monitor.site_key)] == ['unchanged', 'processed']
+
+
+def test_known_entries_are_not_sent_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pages = {'https://jobs.example/': PAGE.format(banner='Monday')}
+    config = dict(SITE_CONFIG, exclude_filters={'title': 'Backend'})
+    monitor, email_sender = make_monitor(pages, config)
+    monitor.run()
+    assert [entry['title'] for entry, _ in email_sender.sent] == ['Data Engineer']
+
+    # Dropping the filter re-processes the page but only the unseen entry goes out
+    monitor, email_sender = make_monitor(pages)
+    assert monitor.run()['status'] == 'processed'
+    assert [entry['title'] for entry, _ in email_sender.sent] == ['Backend Developer']
+
+
+def test_starting_entries_are_skipped_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = dict(SITE_CONFIG, send_starting_entries=False)
+    monitor, email_sender = make_monitor({'https://jobs.example/': PAGE.format(banner='Monday')}, config)
+    monitor.run()
+    assert email_sender.sent == []
+
+    # Every run builds a new monitor; only the first one takes the listing as sent
+    page = PAGE.format(banner='Monday').replace('</body>', '<a class="job" href="https://jobs.example/3"><h3>Data Analyst</h3></a></body>')
+    monitor, email_sender = make_monitor({'https://jobs.example/': page}, config)
+    assert monitor.run()['entries_selected'] == 1
+    assert [entry['title'] for entry, _ in email_sender.sent] == ['Data Analyst']
+
+
+def test_ids_from_an_older_scheme_are_rekeyed_without_processing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    state = StateStore('data/state.db')
+    pages = {'https://jobs.example/': PAGE.format(banner='Monday')}
+    monitor, email_sender = make_monitor(pages)
+    # Pretend the site was tracked with the old per-process hash ids
+    state.set_meta(monitor.id_scheme_key(), 'python-hash')
+    state.add_seen(monitor.site_key, [('12345678', 0), ('87654321', 0)])
+
+    monitor, email_sender = make_monitor(pages)
+    assert monitor.run()['status'] == 'processed'
+    assert email_sender.sent == []
+    assert '12345678' not in monitor.known_entries
+    assert len(monitor.known_entries) == 2
+
+
+def test_entries_still_listed_outlive_the_ttl(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = dict(SITE_CONFIG, known_entries_ttl_days=1)
+    monitor, email_sender = make_monitor({'https://jobs.example/': PAGE.format(banner='Monday')}, config)
+    monitor.run()
+    assert len(email_sender.sent) == 2
+    # Both postings were first seen two days ago and are still up
+    two_days_ago = time.time() - 2 * 86400
+    seen_ids = [entry_id for entry_id, _ in monitor.state.load_seen(monitor.site_key)]
+    monitor.state.remove_seen(monitor.site_key, seen_ids)
+    monitor.state.add_seen(monitor.site_key, [(entry_id, two_days_ago) for entry_id in seen_ids])
+
+    page = PAGE.format(banner='Monday').replace('</body>', '<a class="job" href="https://jobs.example/3"><h3>Data Analyst</h3></a></body>')
+    monitor, email_sender = make_monitor({'https://jobs.example/': page}, config)
+    assert monitor.run()['status'] == 'processed'
+    assert [entry['title'] for entry, _ in email_sender.sent] == ['Data Analyst']
+    assert all(seen_at > two_days_ago for _, seen_at in monitor.state.load_seen(monitor.site_key))
+
+
+class RejectingEmailSender(RecordingEmailSender):
+    def send_emails(self, entries, send_props):
+        return [entry for entry, _ in entries]
+
+
+def test_failed_notifications_are_retried_on_an_unchanged_page(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pages = {'https://jobs.example/': PAGE.format(banner='Monday')}
+    monitor = SiteMonitor(SITE_CONFIG, WebPageParser(SITE_CONFIG, fetcher=FakeFetcher(pages)), RejectingEmailSender(),
+                          fetcher=FakeFetcher(pages), state=StateStore('data/state.db'))
+    assert monitor.run()['emails_failed'] == 2
+
+    monitor, email_sender = make_monitor(pages)
+    assert monitor.run()['status'] == 'processed'
+    assert sorted(entry['title'] for entry, _ in email_sender.sent) == ['Backend Developer', 'Data Engineer']
+
+
+class CountingGenerator:
+    cover_letter_mode = 'default'
+
+    def __init__(self):
+        self.letters = []
+        self.compiled = []
+
+    def reset_usage(self):
+        pass
+
+    def usage(self):
+        return {}
+
+    def generate_cover_letter(self, entry, job_description):
+        self.letters.append(entry['id'])
+        return f"Letter for {entry['title']}"
+
+    def make_latex_compilable(self, latex_content):
+        return latex_content
+
+    def compile_pdf(self, latex_content, entry, method='latex'):
+        self.compiled.append(entry['id'])
+        os.makedirs('cover_letters', exist_ok=True)
+        paths = f"cover_letters/{entry['id']}.pdf", f"cover_letters/{entry['id']}.tex"
+        for path in paths:
+            with open(path, 'w') as f:
+                f.write(latex_content)
+        return paths
+
+
+class FlakyEmailSender(RecordingEmailSender):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def send_emails(self, entries, send_props):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("SMTP server unreachable")
+        return super().send_emails(entries, send_props)
+
+
+def test_interrupted_run_resumes_each_entry_where_it_stopped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pages = {'https://jobs.example/': PAGE.format(banner='Monday')}
+    config = dict(SITE_CONFIG, process_entries=['pdf'])
+    generator = CountingGenerator()
+    email_sender = FlakyEmailSender(failures=1)
+
+    def run():
+        fetcher = FakeFetcher(pages)
+        fetcher.async_session = contextlib.nullcontext
+        parser = WebPageParser(config, fetcher=fetcher)
+        parser.cached_sub_page = lambda url: f"<p>Description of {url}</p>"
+        monitor = SiteMonitor(config, parser, email_sender, content_generator=generator, pdf_generator=generator,
+                              fetcher=fetcher, state=StateStore('data/state.db'))
+        return monitor, monitor.run()
+
+    monitor, summary = run()
+    assert summary['status'] == 'error'
+    assert sorted(generator.letters) == sorted(generator.compiled) == sorted(entry_id for entry_id in monitor.state.load_stages(monitor.site_key))
+
+    # The retry only sends; letters and PDFs from the failed run are reused
+    monitor, summary = run()
+    assert summary['status'] == 'processed'
+    assert summary['entries_resumed'] == 2
+    assert len(generator.letters) == len(generator.compiled) == 2
+    assert sorted(entry['title'] for entry, _ in email_sender.sent) == ['Backend Developer', 'Data Engineer']
+    assert monitor.state.load_stages(monitor.site_key) == {}
+
+
+def test_crashed_run_resumes_although_the_page_is_not_modified(tmp_path, monkeypatch):
+    from monitoring.fetcher import PageFetcher
+    from monitoring.http_cache import HttpCache
+    from test.local_server import LocalServer
+
+    monkeypatch.chdir(tmp_path)
+    page = PAGE.format(banner='Monday')
+
+    def listing(handler):
+        if handler.headers.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, ''
+        return 200, {'ETag': '"v1"'}, page
+
+    with LocalServer({'/': listing}) as server:
+        config = dict(SITE_CONFIG, entry_site=dict(SITE_CONFIG['entry_site'], url=f"{server.url}/"), process_entries=['pdf'])
+        fetcher = PageFetcher(cache=HttpCache(str(tmp_path / 'http_cache')))
+        parser = WebPageParser(config, fetcher=fetcher)
+        state = StateStore('data/state.db')
+        generator = CountingGenerator()
+        email_sender = RecordingEmailSender()
+        monitor = SiteMonitor(config, parser, email_sender, content_generator=generator, pdf_generator=generator,
+                              fetcher=fetcher, state=state)
+
+        # What a process killed during compile leaves behind: cached validators and generated letters
+        assert fetcher.fetch(config['entry_site']['url']).status == 200
+        for entry in parser.parse_listings(page):
+            state.save_stage(monitor.site_key, entry['id'], 'generated', f"Letter for {entry['title']}")
+
+        summary = monitor.run()
+        assert summary['status'] == 'processed'
+        assert summary['entries_resumed'] == 2
+        assert generator.letters == [] and len(generator.compiled) == 2
+        assert len(email_sender.sent) == 2
+
+        # Once finished, the 304 short-cuts the run again
+        assert monitor.run()['status'] == 'not_modified'
+
+
+def test_run_killed_before_its_first_checkpoint_fetches_the_page_again(tmp_path, monkeypatch):
+    from monitoring.fetcher import PageFetcher
+    from monitoring.http_cache import HttpCache
+    from test.local_server import LocalServer
+
+    monkeypatch.chdir(tmp_path)
+    page = PAGE.format(banner='Monday')
+
+    def listing(handler):
+        if handler.headers.get('If-None-Match') == '"v1"':
+            return 304, {'ETag': '"v1"'}, ''
+        return 200, {'ETag': '"v1"'}, page
+
+    with LocalServer({'/': listing}) as server:
+        config = dict(SITE_CONFIG, entry_site=dict(SITE_CONFIG['entry_site'], url=f"{server.url}/"))
+
+        def make():
+            fetcher = PageFetcher(cache=HttpCache(str(tmp_path / 'http_cache')))
+            email_sender = RecordingEmailSender()
+            return SiteMonitor(config, WebPageParser(config, fetcher=fetcher), email_sender, fetcher=fetcher,
+                               state=StateStore('data/state.db')), email_sender
+
+        def killed(page_content, root=None):
+            raise KeyboardInterrupt
+
+        monitor, _ = make()
+        # The process dies while parsing, before anything was saved
+        monkeypatch.setattr(monitor.parser, 'parse_listings', killed)
+        with pytest.raises(KeyboardInterrupt):
+            monitor.run()
+
+        monitor, email_sender = make()
+        assert monitor.run()['status'] == 'processed'
+        assert len(email_sender.sent) == 2
+        monitor, _ = make()
+        assert monitor.run()['status'] == 'not_modified'
+
+
+def test_entries_whose_detail_page_failed_are_retried(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pages = {'https://jobs.example/': PAGE.format(banner='Monday')}
+    config = dict(SITE_CONFIG, process_entries=['pdf'])
+    generator = CountingGenerator()
+    down = {'https://jobs.example/2'}
+
+    class DetailFetcher(FakeFetcher):
+        async_session = contextlib.nullcontext
+
+        async def fetch_async(self, session, url):
+            return "" if url in down else f"<p>Description of {url}</p>"
+
+    def run():
+        fetcher = DetailFetcher(pages)
+        email_sender = RecordingEmailSender()
+        monitor = SiteMonitor(config, WebPageParser(config, fetcher=fetcher), email_sender, content_generator=generator,
+                              pdf_generator=generator, fetcher=fetcher, state=StateStore('data/state.db'))
+        return monitor.run(), email_sender
+
+    summary, email_sender = run()
+    assert summary['entries_failed'] == 1
+    assert [entry['title'] for entry, _ in email_sender.sent] == ['Data Engineer']
+
+    down.clear()
+    summary, email_sender = run()
+    assert summary['status'] == 'processed'
+    assert [entry['title'] for entry, _ in email_sender.sent] == ['Backend Developer']
@@ -0,0 +1,24 @@
+import subprocess
+import sys
+from pathlib import Path
+from generators.content_generator import ContentGenerator
+
+HEAVY_MODULES = ['anthropic', 'flask', 'bs4', 'requests', 'aiohttp', 'reportlab']
+
+
+def test_importing_main_loads_no_heavy_dependencies():
+    code = f"import sys, main; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).parent.parent, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+
+def test_default_mode_needs_no_client_or_full_profile(tmp_path):
+    letter = tmp_path / 'letter.tex'
+    letter.write_text('Dear hiring manager')
+    generator = ContentGenerator(
+        api_key='unused', user_profile={'name': 'Jane Doe'},
+        default_cover_letter_path=str(letter), cover_letter_mode='default'
+    )
+
+    assert generator.generate_cover_letter({}, 'Job description') == 'Dear hiring manager'
+    assert generator._client is None
@@ -0,0 +1,151 @@
+import os
+import subprocess
+import sys
+from monitoring.web_parser import WebPageParser
+
+PAGE = """
+<ul>
+<li class="job"><a href="/jobs/1"><h3>Data Engineer</h3></a><span class="deadline">2026-11-01</span></li>
+<li class="job"><a href="/jobs/2"><h3>Backend Developer</h3></a><span class="deadline">2026-11-15</span></li>
+</ul>
+"""
+
+
+def make_config(**entry_site):
+    return {'entry_site': dict({
+        'url': 'https://jobs.example/',
+        'entry_selector': 'li.job',
+        'selectors': {'title': 'h3', 'deadline': '.deadline'},
+        'links': {'url': 'a'},
+    }, **entry_site)}
+
+
+def parse_ids_in_subprocess(hash_seed):
+    code = (
+        "from test.test_web_parser import PAGE, make_config\n"
+        "from monitoring.web_parser import WebPageParser\n"
+        "print([e['id'] for e in WebPageParser(make_config(), fetcher=object()).parse_listings(PAGE)])\n"
+    )
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed))
+    return subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True).stdout
+
+
+def test_entry_ids_are_stable_across_processes():
+    assert parse_ids_in_subprocess(1) == parse_ids_in_subprocess(2)
+
+
+def test_entry_ids_follow_configured_fields():
+    parser = WebPageParser(make_config(id_fields=['title', 'url']), fetcher=object())
+    relisted = PAGE.replace('2026-11-01', '2026-12-01')
+
+    before = parser.parse_listings(PAGE)
+    after = parser.parse_listings(relisted)
+
+    assert before[0]['id'] == after[0]['id']
+    assert before[0]['id'] != before[1]['id']
+    assert WebPageParser(make_config(), fetcher=object()).parse_listings(relisted)[0]['id'] != before[0]['id']
+
+
+def test_default_entry_ids_ignore_sub_page_fields():
+    class SubPageFetcher:
+        def __init__(self, pages):
+            self.pages = pages
+
+        def fetch_pages(self, urls):
+            return {url: self.pages.get(url, "") for url in urls}
+
+    listing = "<a class='job' href='/jobs/1'><h3>Data Engineer</h3></a><a class='job' href='/jobs/2'><h3>Backend Developer</h3></a>"
+    config = make_config(entry_selector='a.job', links={'url': 'a.job'},
+                         selectors={'title': 'h3', 'deadline': {'url': 'href', 'selector': '.deadline'}})
+    detail = {'/jobs/1': "<span class='deadline'>2026-11-01</span>", '/jobs/2': "<span class='deadline'>2026-11-15</span>"}
+    entries = WebPageParser(config, fetcher=SubPageFetcher(detail)).parse_listings(listing)
+    # One detail page failed to load on the next run
+    retried = WebPageParser(config, fetcher=SubPageFetcher({'/jobs/2': detail['/jobs/2']})).parse_listings(listing)
+
+    assert entries[0]['deadline'] == '2026-11-01' and retried[0]['deadline'] == ''
+    assert [entry['id'] for entry in entries] == [entry['id'] for entry in retried]
+
+    # The failed page is fetched again for the job description instead of being served empty
+    retried_parser = WebPageParser(config, fetcher=SubPageFetcher({'/jobs/2': detail['/jobs/2']}))
+    retried_parser.parse_listings(listing)
+    assert retried_parser.cached_sub_page('/jobs/1') is None
+    assert retried_parser.cached_sub_page('/jobs/2') == detail['/jobs/2']
+
+
+def test_parser_backends_agree_on_fixture_pages():
+    from pathlib import Path
+    from benchmarks.parse_benchmark import SITE_CONFIG
+    from monitoring.parser_backends import BACKENDS
+
+    fixtures = Path(__file__).parent.parent / 'benchmarks' / 'fixtures'
+    listing_page = (fixtures / 'career_listing.html').read_text(encoding='utf-8')
+    detail_page = (fixtures / 'job_detail.html').read_text(encoding='utf-8')
+
+    results = {}
+    for name in BACKENDS:
+        parser = WebPageParser(dict(SITE_CONFIG, parser_backend=name), fetcher=object())
+        results[name] = (parser.parse_listings(listing_page), parser.parse_job_description(detail_page))
+
+    reference = results['html.parser']
+    assert len(reference[0]) == 200 and reference[1]
+    for name, result in results.items():
+        assert result == reference, name
+
+
+def test_scoped_parsing_matches_full_parsing():
+    from pathlib import Path
+    from benchmarks.parse_benchmark import SITE_CONFIG
+
+    fixtures = Path(__file__).parent.parent / 'benchmarks' / 'fixtures'
+    page = (fixtures / 'large_career_page.html').read_text(encoding='utf-8')
+    full = WebPageParser(SITE_CONFIG, fetcher=object())
+    scoped = WebPageParser(dict(SITE_CONFIG, parse_scope='entries'), fetcher=object())
+
+    assert scoped.region_filter is not None
+    assert len(full.parse_listings(page)) == 25
+    assert scoped.parse_listings(page) == full.parse_listings(page)
+
+
+def test_region_filter_keeps_outermost_regions_only():
+    from monitoring.region_filter import RegionFilter
+
+    page = (
+        "<div class='menu'><ul><li>Home</li></ul></div>"
+        "<section class='jobs'><ul><li><a href='/1'>One</a></li>"
+        "<section class='jobs'><li><a href='/2'>Two</a></li></section></ul></section>"
+        "<footer><li>Contact</li></footer>"
+    )
+    config = make_config(entry_selector='section.jobs li', selectors={'title': 'a'}, links={'url': 'a'})
+    scoped = WebPageParser(dict(config, parse_scope='entries'), fetcher=object())
+
+    assert [entry['title'] for entry in scoped.parse_listings(page)] == ['One', 'Two']
+    assert RegionFilter.from_selector('li:nth-child(2) a') is None
+    assert RegionFilter.from_selector('h2 + ul li') is None
+
+
+def test_dict_selectors_fetch_each_sub_page_once():
+    from monitoring.fetcher import PageFetcher
+    from test.local_server import LocalServer
+
+    detail = "<div class='entry-content'>About job {0}</div><span class='deadline'>2026-11-0{0}</span>"
+    routes = {f"/jobs/{i}": (lambda handler, i=i: (200, {}, detail.format(i))) for i in range(1, 4)}
+    with LocalServer(routes, delay=0.1) as server:
+        listing = "".join(
+            f"<a class='job' href='{server.url}/jobs/{i}'><h3>Job {i}</h3></a>" for i in (1, 2, 3, 3)
+        )
+        config = make_config(
+            entry_selector='a.job',
+            selectors={
+                'title': 'h3',
+                'description': {'url': 'href', 'selector': '.entry-content'},
+                'deadline': {'url': 'href', 'selector': '.deadline'},
+            },
+            links={'url': 'a.job'},
+        )
+        parser = WebPageParser(config, fetcher=PageFetcher())
+        entries = parser.parse_listings(listing)
+
+    assert [entry['deadline'] for entry in entries] == ['2026-11-01', '2026-11-02', '2026-11-03', '2026-11-03']
+    assert entries[0]['description'] == 'About job 1'
+    assert sorted(path for path, _ in server.requests) == ['/jobs/1', '/jobs/2', '/jobs/3']
+    assert 'About job 2' in parser.cached_sub_page(entries[1]['url'])
@@ -0,0 +1,22 @@
+import os
+import threading
+
+
+class CachedFile:
+    """Text file kept in memory and only read again when its mtime changes."""
+
+    def __init__(self, path: str, encoding: str = 'utf-8'):
+        self.path = path
+        self.encoding = encoding
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._text = None
+
+    def read(self) -> str:
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.path, 'r', encoding=self.encoding) as file:
+                    self._text = file.read()
+                self._mtime = mtime
+            return self._text
@@ -1,61 +1,180 @@
+import re
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-from typing import List, Tuple, Dict
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple, Dict
 import logging
 import os
 import ssl
+import time
+from utils.streaming_message import StreamingMessage
 
 class EmailSender:
+    """Sends entry notifications over one SMTP connection per batch.
+
+    The connection is opened on the first message, reused for the rest and
+    re-opened if the server drops it. Each message is retried on connection
+    errors and 4xx replies; a message that still fails is logged and skipped
+    so the rest of the batch goes out. With ``digest`` set, all entries of a
+    batch are sent as one email carrying every attachment.
+    """
+
     def __init__(self, config: dict):
         self.sender = config['sender']
         self.recipient = config['recipient']
         self.smtp_url = config['smtp_url']
         self.app_password = config['app_password']
+        # 'ssl' (implicit TLS), 'starttls' or 'none'
+        self.smtp_security = config.get('smtp_security', 'ssl')
+        self.smtp_port = config.get('smtp_port', 587 if self.smtp_security == 'starttls' else 465 if self.smtp_security == 'ssl' else 25)
+        self.max_retries = config.get('max_retries', 3)
+        self.retry_delay = config.get('retry_delay', 2)
+        self.digest = config.get('digest', False)
+        self.ssl_context = ssl.create_default_context()
+        self._server = None
 
-    def send_emails(self, email_entries: List[Tuple[Dict, str]], send_props: List[str]):
-        logging.info(f"Sending {len(email_entries)} notifications")
-        
-        for entry, file_paths in email_entries:
-            email_body = "New entry:\n\n"
+    def _connect(self) -> smtplib.SMTP:
+        if self.smtp_security == 'ssl':
+            server = smtplib.SMTP_SSL(self.smtp_url, self.smtp_port, context=self.ssl_context, timeout=60)
+        else:
+            server = smtplib.SMTP(self.smtp_url, self.smtp_port, timeout=60)
+        try:
+            if self.smtp_security == 'starttls':
+                server.starttls(context=self.ssl_context)
+            if self.app_password:
+                server.login(self.sender, self.app_password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def _disconnect(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+    @contextmanager
+    def connection(self):
+        try:
+            yield
+        finally:
+            self._disconnect()
+
+    def _transmit(self, server: smtplib.SMTP, message: StreamingMessage):
+        # smtplib.sendmail needs the whole message in memory, so run the
+        # envelope commands by hand and stream the DATA section
+        server.ehlo_or_helo_if_needed()
+        code, reply = server.mail(self.sender)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, reply, self.sender)
+        code, reply = server.rcpt(self.recipient)
+        if code not in (250, 251):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused({self.recipient: (code, reply)})
+        code, reply = server.docmd('data')
+        if code != 354:
+            server.rset()
+            raise smtplib.SMTPDataError(code, reply)
+        try:
+            for chunk in message.iter_bytes():
+                server.send(re.sub(rb'(?m)^\.', b'..', chunk))
+            server.send(b'.\r\n')
+        except Exception:
+            # The server is mid-DATA; the connection cannot be reused
+            server.close()
+            raise
+        code, reply = server.getreply()
+        if code != 250:
+            if code == 421:
+                server.close()
+            else:
+                server.rset()
+            raise smtplib.SMTPDataError(code, reply)
+
+    def _send(self, message: StreamingMessage):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self._server is None:
+                    self._server = self._connect()
+                self._transmit(self._server, message)
+                return
+            except smtplib.SMTPResponseException as e:
+                # 5xx replies will not succeed on retry
+                if e.smtp_code >= 500 or attempt == self.max_retries:
+                    raise
+                logging.warning(f"SMTP server replied {e.smtp_code}, retrying: {e}")
+            except smtplib.SMTPRecipientsRefused:
+                raise
+            except OSError as e:
+                # Covers dropped connections and timeouts; reconnect on the next attempt
+                self._disconnect()
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"SMTP connection failed, reconnecting: {e}")
+            time.sleep(self.retry_delay * 2 ** attempt)
+
+    def deliver(self, messages: Iterable[StreamingMessage]) -> List[Optional[Exception]]:
+        """Send ``messages`` over one connection, returning None or the final error for each."""
+        results = []
+        with self.connection():
+            for message in messages:
+                try:
+                    self._send(message)
+                    results.append(None)
+                except Exception as e:
+                    results.append(e)
+        return results
+
+    def build_message(self, email_entries: List[Tuple[Dict, List[str]]], send_props: List[str]) -> StreamingMessage:
+        email_body = "New entry:\n\n" if len(email_entries) == 1 else f"{len(email_entries)} new entries:\n\n"
+        for entry, _ in email_entries:
             logging.info(f"Sending props: {send_props} for entry {entry['id']}")
             for key in send_props:
                 email_body += f"{key.capitalize()}: {entry[key]}\n"
             email_body += "-" * 50 + "\n"
 
-            message = MIMEMultipart()
-            message['From'] = self.sender
-            message['To'] = self.recipient
-            message['Subject'] = f"New entry: {entry['id']}"
-            message.attach(MIMEText(email_body, 'plain'))
-
-            for file_path in file_paths:
-                if file_path and os.path.exists(file_path):
-                    with open(file_path, 'rb') as f:
-                        file_data = f.read()
-                        attachment = MIMEApplication(file_data, _subtype='pdf')
-                        attachment.add_header('Content-Disposition', 'attachment', filename=os.path.basename(file_path))
-                        message.attach(attachment)
+        if len(email_entries) == 1:
+            subject = f"New entry: {email_entries[0][0]['id']}"
+        else:
+            subject = f"{len(email_entries)} new entries"
+        # Attachments are only read while the message is sent
+        attachments = [
+            file_path for _, file_paths in email_entries for file_path in file_paths
+            if file_path and os.path.exists(file_path)
+        ]
+        return StreamingMessage(self.sender, self.recipient, subject, email_body, attachments)
 
+    def remove_files(self, file_paths: List[str]):
+        for file_path in file_paths:
             try:
-                context = ssl.create_default_context()
-                with smtplib.SMTP_SSL(self.smtp_url, 465, context=context) as server:
-                    server.login(self.sender, self.app_password)
-                    server.sendmail(self.sender, self.recipient, message.as_string())
-                logging.info(f"Email sent successfully for new entry id {entry['id']}")
-                
-                for file_path in file_paths:
-                    try:
-                        directory = os.path.dirname(file_path)
-                        base_name = os.path.splitext(os.path.basename(file_path))[0]
-                        for file in os.listdir(directory):
-                            if file.startswith(base_name):
-                                os.remove(os.path.join(directory, file))
-                        logging.info(f"Deleted file: {file_path}")
-                    except Exception as e:
-                        logging.error(f"Error deleting file {file_path}: {e}")
-                
+                directory = os.path.dirname(file_path)
+                base_name = os.path.splitext(os.path.basename(file_path))[0]
+                for file in os.listdir(directory):
+                    if file.startswith(base_name):
+                        os.remove(os.path.join(directory, file))
+                logging.info(f"Deleted file: {file_path}")
             except Exception as e:
-                logging.error(f"Error sending email for job: {entry['title']}: {e}")
-                raise
+                logging.error(f"Error deleting file {file_path}: {e}")
+
+    def send_emails(self, email_entries: List[Tuple[Dict, List[str]]], send_props: List[str]) -> List[Dict]:
+        """Send notifications for ``email_entries`` and return the entries that could not be sent."""
+        logging.info(f"Sending {len(email_entries)} notifications")
+        if self.digest and email_entries:
+            batches = [email_entries]
+        else:
+            batches = [[email_entry] for email_entry in email_entries]
+
+        failed = []
+        results = self.deliver(self.build_message(batch, send_props) for batch in batches)
+        for batch, error in zip(batches, results):
+            entries = [entry for entry, _ in batch]
+            if error is not None:
+                logging.error(f"Error sending email for {', '.join(entry['title'] for entry in entries)}: {error}")
+                failed.extend(entries)
+                continue
+            logging.info(f"Email sent successfully for new entry id {', '.join(entry['id'] for entry in entries)}")
+            self.remove_files([file_path for _, file_paths in batch for file_path in file_paths])
+        return failed
@@ -10,19 +10,23 @@ def setup_logger(log_file='logs/application.log'):
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)  # Set the logging level
 
+    # Every site monitor calls this, so handlers are added once per log file;
+    # a second set would write each line twice
+    log_path = str(Path(log_file).resolve())
+    if any(getattr(handler, 'baseFilename', None) == log_path for handler in logger.handlers):
+        return
+
     # Create handlers
     file_handler = logging.FileHandler(log_file)
-    console_handler = logging.StreamHandler(sys.stdout)
-
-    # Set level for handlers
-    file_handler.setLevel(logging.INFO)
-    console_handler.setLevel(logging.INFO)
+    handlers = [file_handler]
+    if not any(getattr(handler, 'is_console', False) for handler in logger.handlers):
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.is_console = True
+        handlers.append(console_handler)
 
-    # Create formatters and add them to handlers
+    # Set level, formatter and add them to the logger
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
-
-    # Add handlers to the logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    for handler in handlers:
+        handler.setLevel(logging.INFO)
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
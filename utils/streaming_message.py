@@ -0,0 +1,78 @@
+import base64
+import mimetypes
+import os
+import uuid
+from email.header import Header
+from email.mime.text import MIMEText
+from email.policy import SMTP
+from email.utils import encode_rfc2231, formatdate, make_msgid
+from typing import Iterator, List, Tuple
+
+# 57 input bytes make one 76 character base64 line, so whole chunks encode to whole lines
+CHUNK_SIZE = 57 * 1024
+
+
+def content_type(path: str) -> Tuple[str, str]:
+    guessed, _ = mimetypes.guess_type(path)
+    if guessed is None and path.endswith('.tex'):
+        guessed = 'text/x-tex'
+    maintype, _, subtype = (guessed or 'application/octet-stream').partition('/')
+    return maintype, subtype
+
+
+def _header(value: str) -> str:
+    return value if value.isascii() else Header(value, 'utf-8').encode(linesep='\r\n')
+
+
+class StreamingMessage:
+    """multipart/mixed email whose attachments are read from disk as it is sent.
+
+    ``iter_bytes`` yields the message as CRLF-terminated lines in chunks of
+    at most ``CHUNK_SIZE`` input bytes, so memory stays flat however large
+    the attachments are. Every part is base64 encoded.
+    """
+
+    def __init__(self, sender: str, recipient: str, subject: str, body: str, attachments: List[str]):
+        self.headers = {
+            'From': sender,
+            'To': recipient,
+            'Subject': _header(subject),
+            'Date': formatdate(localtime=True),
+            'Message-ID': make_msgid(),
+            'MIME-Version': '1.0',
+        }
+        self.body = body
+        self.attachments = attachments
+        self.boundary = f"=============={uuid.uuid4().hex}=="
+
+    def __getitem__(self, name: str) -> str:
+        return self.headers[name]
+
+    def _attachment_headers(self, path: str) -> bytes:
+        maintype, subtype = content_type(path)
+        filename = os.path.basename(path)
+        disposition = f'filename="{filename}"' if filename.isascii() else f"filename*={encode_rfc2231(filename, 'utf-8')}"
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Type: {maintype}/{subtype}\r\n"
+            f"Content-Transfer-Encoding: base64\r\n"
+            f"Content-Disposition: attachment; {disposition}\r\n\r\n"
+        ).encode('ascii')
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        headers = ''.join(f"{name}: {value}\r\n" for name, value in self.headers.items())
+        yield (
+            f"{headers}Content-Type: multipart/mixed; boundary=\"{self.boundary}\"\r\n\r\n"
+            f"--{self.boundary}\r\n"
+        ).encode('ascii')
+        yield MIMEText(self.body, 'plain', 'utf-8').as_bytes(policy=SMTP)
+
+        for path in self.attachments:
+            yield b'\r\n' + self._attachment_headers(path)
+            with open(path, 'rb') as f:
+                while chunk := f.read(CHUNK_SIZE):
+                    yield base64.encodebytes(chunk).replace(b'\n', b'\r\n')
+        yield f"\r\n--{self.boundary}--\r\n".encode('ascii')
+
+    def as_bytes(self) -> bytes:
+        return b''.join(self.iter_bytes())